@@ -98,3 +98,60 @@ class CleanupFileModelMixin(models.Model):
         for item in file_paths:
             if item:  # exclude None or empty string
                 storage.delete(item)
+
+
+#------------------------------------------------
+# Optimistic Concurrency (version column)
+#------------------------------------------------
+
+class VersionConflict(Exception):
+    """The row was modified by someone else since the instance was loaded."""
+
+
+class VersionedQuerySetMixin:
+
+    def update(self, **kwargs):
+        if 'version' not in kwargs:
+            kwargs['version'] = models.F('version') + 1
+        return super().update(**kwargs)
+
+
+class VersionedModelMixin(models.Model):
+    """Optimistic concurrency: each update increments the `version` of the row, and is only
+    applied if the row still has the version of the instance, in a single statement
+    (`UPDATE ... WHERE id = ... AND version = ...`). Otherwise, `VersionConflict` is raised.
+    No row is locked.
+    Use `VersionedQuerySetMixin` in the queryset of the model, so its bulk updates increment
+    the version too.
+    """
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not update_fields:  # nothing saved
+            return super().save(*args, **kwargs)
+        if update_fields is not None and 'version' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'version']
+        self.version += 1
+        try:
+            return super().save(*args, **kwargs)
+        except Exception:
+            self.version -= 1
+            raise
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if self._state.adding:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+        updated = super()._do_update(
+            base_qs.filter(version=self.version - 1), using, pk_val, values, update_fields, forced_update
+        )
+        if not updated and base_qs.filter(pk=pk_val).exists():
+            raise VersionConflict(f"{self._meta.verbose_name} {pk_val} was modified.")
+        return updated
@@ -0,0 +1,243 @@
+"""
+Batch of API requests: several sub-requests executed in a single HTTP round trip.
+
+Each item (`method`, `path`, `body`) is resolved against the url configuration and given to
+the ninja view of its endpoint, without going through the middlewares. The sub-requests
+keep the headers of the batch request (authentication, language, ...), except the ones
+specific to a request (conditional requests, idempotency key): they are only given per item
+(`headers`). Consecutive `GET`
+items are executed concurrently in threads (`API_BATCH_MAX_WORKERS` setting), the other
+items are executed one after the other, in order. Results are returned in the order of the
+items.
+"""
+import json
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.http.response import HttpResponseBase
+from django.urls import Resolver404, resolve
+from ninja import Body, NinjaAPI, Schema
+from pydantic import Field, field_validator
+
+__all__ = [
+    "BATCH_PARENT_REQUEST_ATTR",
+    "BatchItemSchema",
+    "BatchResultSchema",
+    "add_batch_route",
+]
+
+
+# Attribute of sub-requests giving the batch request
+BATCH_PARENT_REQUEST_ATTR = "batch_parent"
+
+# Headers specific to a request: not given to the sub-requests, unless set on their item
+ITEM_HEADERS = (
+    "Idempotency-Key",
+    "If-Match",
+    "If-None-Match",
+    "If-Modified-Since",
+    "If-Unmodified-Since",
+)
+
+
+class BatchItemSchema(Schema):
+    method: t.Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(
+        ...,
+        description="Path of the endpoint with its query string, absolute or relative to "
+        "the API root (e.g. `users/?page=2`).",
+    )
+    body: t.Any = Field(None, description="JSON body of the request.")
+    headers: t.Dict[str, str] = Field(
+        default_factory=dict,
+        description="Headers specific to the request, among "
+        f"{', '.join(f'`{name}`' for name in ITEM_HEADERS)}. The other headers are the ones of "
+        "the batch request.",
+    )
+
+    @field_validator("headers")
+    @classmethod
+    def check_headers(cls, value):
+        allowed = {name.lower() for name in ITEM_HEADERS}
+        unknown = [name for name in value if name.lower() not in allowed]
+        if unknown:
+            raise ValueError(
+                f"Headers can not be given per request: {', '.join(unknown)}."
+            )
+        return value
+
+
+class BatchResultSchema(Schema):
+    status: int
+    headers: t.Dict[str, str]
+    body: t.Any = None
+
+
+def add_batch_route(
+    api: NinjaAPI,
+    path: str = "/batch/",
+    auth: t.Any = None,
+    max_items: int = 20,
+    **kwargs: t.Any,
+) -> None:
+    """Register the batch endpoint on the given API."""
+
+    def batch(
+        request: HttpRequest,
+        items: t.Annotated[
+            t.List[BatchItemSchema], Body(min_length=1, max_length=max_items)
+        ],
+    ):
+        """Execute the given requests, and return their responses in order."""
+        return execute_batch(request, items, path)
+
+    api.post(
+        path,
+        response=t.List[BatchResultSchema],
+        auth=auth,
+        operation_id="batch",
+        summary="Batch Requests",
+        tags=["Batch"],
+        **kwargs,
+    )(batch)
+
+
+def execute_batch(
+    request: HttpRequest, items: t.List[BatchItemSchema], batch_path: str
+) -> t.List[t.Dict[str, t.Any]]:
+    # Root of the API, deduced from the path of the batch request
+    api_root = request.path[: len(request.path) - len(batch_path.lstrip("/"))]
+    max_workers = getattr(settings, "API_BATCH_MAX_WORKERS", 4)
+
+    def run(index):
+        return _dispatch(request, items[index], api_root)
+
+    results = [None] * len(items)
+    start = 0
+    while start < len(items):
+        end = start + 1
+        if items[start].method == "GET":
+            while end < len(items) and items[end].method == "GET":
+                end += 1
+        group = range(start, end)
+
+        if len(group) == 1 or max_workers <= 1:
+            for index in group:
+                results[index] = run(index)
+        else:
+            workers = min(max_workers, len(group))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for index, result in zip(group, executor.map(_in_thread(run), group)):
+                    results[index] = result
+        start = end
+
+    return results
+
+
+def _in_thread(func):
+    def wrapper(*args):
+        try:
+            return func(*args)
+        finally:
+            # connections are local to the thread, which will not be reused by django
+            connections.close_all()
+
+    return wrapper
+
+
+class BatchSubRequest(HttpRequest):
+    """Request built from a batch item, sharing the headers and scheme of the batch."""
+
+    def __init__(
+        self,
+        parent: HttpRequest,
+        method: str,
+        path: str,
+        query: str,
+        body: t.Any,
+        headers: t.Optional[t.Dict[str, str]] = None,
+    ):
+        super().__init__()
+        self.method = method
+        self.path = self.path_info = path
+        excluded = {_get_meta_key(name) for name in ITEM_HEADERS}
+        self.META = {
+            **{key: value for key, value in parent.META.items() if key not in excluded},
+            **{_get_meta_key(name): value for name, value in (headers or {}).items()},
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+        }
+        self.GET = QueryDict(query)
+        self.COOKIES = parent.COOKIES
+        if hasattr(parent, "user"):
+            self.user = parent.user
+
+        self._body = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.META["CONTENT_TYPE"] = "application/json"
+        # responses are embedded in the batch response, rendered in the negotiated format
+        self.META["HTTP_ACCEPT"] = "application/json"
+        self.META["CONTENT_LENGTH"] = str(len(self._body))
+        self.content_type = "application/json"
+        self.content_params = {}
+        setattr(self, BATCH_PARENT_REQUEST_ATTR, parent)
+
+    def _get_scheme(self):
+        return getattr(self, BATCH_PARENT_REQUEST_ATTR).scheme
+
+
+def _get_meta_key(header: str) -> str:
+    return "HTTP_" + header.upper().replace("-", "_")
+
+
+def _dispatch(
+    parent: HttpRequest, item: BatchItemSchema, api_root: str
+) -> t.Dict[str, t.Any]:
+    path, dummy, query = item.path.partition("?")
+    if not path.startswith("/"):
+        path = api_root + path
+    if not path.startswith(api_root):
+        return _error(404, "Not Found")
+    if path == parent.path:
+        return _error(400, "Batch requests can not be nested.")
+
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return _error(404, "Not Found")
+
+    sub_request = BatchSubRequest(parent, item.method, path, query, item.body, item.headers)
+    sub_request.resolver_match = match
+    response = match.func(sub_request, *match.args, **match.kwargs)
+    return _to_result(response)
+
+
+def _to_result(response: HttpResponseBase) -> t.Dict[str, t.Any]:
+    if response.streaming:
+        content = b"".join(response.streaming_content)
+    else:
+        content = response.content
+
+    body = None
+    if content:
+        if response.get("Content-Type", "").startswith("application/json"):
+            body = json.loads(content)
+        else:
+            body = content.decode(response.charset)
+
+    return {
+        "status": response.status_code,
+        "headers": dict(response.items()),
+        "body": body,
+    }
+
+
+def _error(status: int, message: str) -> t.Dict[str, t.Any]:
+    return {
+        "status": status,
+        "headers": {"Content-Type": "application/json"},
+        "body": {"message": message},
+    }
@@ -0,0 +1,273 @@
+"""
+Server-side cache of rendered API responses.
+
+Entries are keyed on the route, the full path (including query parameters) and a fingerprint
+of the caller (usually derived from its access rules). Each cached model has a generation
+counter, stored in the cache backend and part of the entry keys: saving or deleting a record
+(or changing a many-to-many relation) increments it, so all entries depending on the model
+are dropped at once. Writes not emitting django signals (`QuerySet.update`, `bulk_create`)
+do not invalidate entries, they will expire with the timeout.
+
+The backend is the django cache named by the `API_RESPONSE_CACHE_ALIAS` setting (the
+`default` cache if not set).
+"""
+import hashlib
+from collections import defaultdict
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import transaction
+from django.db.models import ManyToManyField, Model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+from ninja.utils import contribute_operation_callback, is_async_callable
+
+from .renderers import get_media_type
+
+__all__ = [
+    "CachedResponse",
+    "response_cache",
+    "invalidate_response_cache",
+    "invalidate_response_cache_on_commit",
+    "get_response_cache_stats",
+    "clear_response_cache",
+]
+
+
+CACHE_KEY_PREFIX = "api_response"
+PENDING_KEY_REQUEST_ATTR = "_response_cache_key"
+
+# Hits and misses of the current process, per cache name
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+_watched_models = set()
+
+
+class CachedResponse(Exception):
+    """Raised by the cache decorator on a hit, to bypass the other decorators of the view
+    (ordering, pagination, ...) and the serialization.
+    """
+
+    def __init__(self, response: HttpResponse):
+        super().__init__()
+        self.response = response
+
+
+def get_cache():
+    return caches[getattr(settings, "API_RESPONSE_CACHE_ALIAS", DEFAULT_CACHE_ALIAS)]
+
+
+# ----------------------------------------------------
+# Invalidation
+# ----------------------------------------------------
+
+
+def _generation_key(model: Type[Model]) -> str:
+    return f"{CACHE_KEY_PREFIX}:generation:{model._meta.label_lower}"
+
+
+def invalidate_response_cache(*models: Type[Model]) -> None:
+    """Drop all cached responses depending on the given models."""
+    cache = get_cache()
+    for model in models:
+        key = _generation_key(model)
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:  # expired in between
+                cache.set(key, 1, timeout=None)
+
+
+def invalidate_response_cache_on_commit(*models: Type[Model]) -> None:
+    """Invalidate now, and again once committed: a concurrent request may have cached the
+    data of before the transaction in the meantime. To use for writes not emitting signals.
+    """
+    invalidate_response_cache(*models)
+    transaction.on_commit(lambda: invalidate_response_cache(*models))
+
+
+def _handle_model_change(sender, **kwargs):
+    invalidate_response_cache_on_commit(sender)
+
+
+def _handle_m2m_change(sender, instance, action, model, **kwargs):
+    if action.startswith("post_"):
+        invalidate_response_cache_on_commit(type(instance), model)
+
+
+def watch_models(models: Iterable[Type[Model]]) -> None:
+    """Connect the invalidation handlers to the signals of the given models."""
+    for model in models:
+        if model in _watched_models:
+            continue
+        _watched_models.add(model)
+
+        uid = f"{CACHE_KEY_PREFIX}:{model._meta.label_lower}"
+        post_save.connect(_handle_model_change, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(_handle_model_change, sender=model, weak=False, dispatch_uid=uid)
+        for field in model._meta.get_fields():
+            if isinstance(field, ManyToManyField):
+                m2m_changed.connect(
+                    _handle_m2m_change,
+                    sender=field.remote_field.through,
+                    weak=False,
+                    dispatch_uid=f"{uid}:{field.name}",
+                )
+
+
+# ----------------------------------------------------
+# Statistics
+# ----------------------------------------------------
+
+
+def get_response_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hits, misses and hit ratio of each cache, for the current process."""
+    result = {}
+    for name, stats in _stats.items():
+        total = stats["hits"] + stats["misses"]
+        result[name] = {
+            **stats,
+            "ratio": (stats["hits"] / total) if total else None,
+        }
+    return result
+
+
+def clear_response_cache() -> None:
+    get_cache().clear()
+    _stats.clear()
+
+
+# ----------------------------------------------------
+# Decorator
+# ----------------------------------------------------
+
+
+def response_cache(
+    name: str,
+    models: List[Type[Model]],
+    timeout: Optional[int] = 300,
+    fingerprint: Optional[Callable[[HttpRequest], str]] = None,
+) -> Callable:
+    """
+    Cache the rendered response of the decorated view. Must be the innermost decorator, so
+    permissions are checked before serving an entry.
+
+    @api.get(...
+    @response_cache("my_view", models=[MyModel])
+    def my_view(request):
+
+    :param name: unique name of the cache, used in entry keys and statistics
+    :param models: models whose changes invalidate the entries
+    :param timeout: entry lifetime in seconds (`None` to never expire)
+    :param fingerprint: function returning a string identifying what the caller can see
+    """
+    watch_models(models)
+
+    def decorator(func: Callable) -> Callable:
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_cache(request: HttpRequest, **kwargs: Any) -> Any:
+                _lookup(request, name, models, fingerprint)
+                return await func(request, **kwargs)
+
+        else:
+
+            @wraps(func)
+            def view_with_cache(request: HttpRequest, **kwargs: Any) -> Any:
+                _lookup(request, name, models, fingerprint)
+                return func(request, **kwargs)
+
+        contribute_operation_callback(
+            view_with_cache,
+            lambda operation: _make_operation_cached(operation, name, timeout),
+        )
+        return view_with_cache
+
+    return decorator
+
+
+def _get_entry_key(request, name, models, fingerprint) -> str:
+    cache = get_cache()
+    generation_keys = [_generation_key(model) for model in models]
+    generations = cache.get_many(generation_keys)
+
+    digest = hashlib.sha256()
+    digest.update(request.get_full_path().encode("utf-8"))
+    digest.update(get_media_type(request).encode("utf-8"))
+    if fingerprint:
+        digest.update(fingerprint(request).encode("utf-8"))
+    for key in generation_keys:
+        digest.update(f"{key}={generations.get(key, 0)}".encode("utf-8"))
+    return f"{CACHE_KEY_PREFIX}:{name}:{digest.hexdigest()}"
+
+
+def _lookup(request, name, models, fingerprint) -> None:
+    key = _get_entry_key(request, name, models, fingerprint)
+    entry = get_cache().get(key)
+    if entry is not None:
+        _stats[name]["hits"] += 1
+        content, content_type = entry
+        response = HttpResponse(content, content_type=content_type)
+        response["X-Cache"] = "HIT"
+        raise CachedResponse(response)
+
+    _stats[name]["misses"] += 1
+    setattr(request, PENDING_KEY_REQUEST_ATTR, key)
+
+
+def _make_operation_cached(operation: Any, name: str, timeout: Optional[int]) -> None:
+    """Serve the hits raised from the view, and store the rendered responses of misses."""
+    view_func = operation.view_func
+    run = operation.run
+
+    if is_async_callable(view_func):
+
+        @wraps(view_func)
+        async def view_func_cached(request: HttpRequest, **kwargs: Any) -> Any:
+            try:
+                return await view_func(request, **kwargs)
+            except CachedResponse as hit:
+                return hit.response
+
+    else:
+
+        @wraps(view_func)
+        def view_func_cached(request: HttpRequest, **kwargs: Any) -> Any:
+            try:
+                return view_func(request, **kwargs)
+            except CachedResponse as hit:
+                return hit.response
+
+    if is_async_callable(run):
+
+        @wraps(run)
+        async def run_cached(request: HttpRequest, **kw: Any) -> HttpResponseBase:
+            response = await run(request, **kw)
+            return _store(request, response, timeout)
+
+    else:
+
+        @wraps(run)
+        def run_cached(request: HttpRequest, **kw: Any) -> HttpResponseBase:
+            response = run(request, **kw)
+            return _store(request, response, timeout)
+
+    operation.view_func = view_func_cached
+    operation.run = run_cached
+
+
+def _store(
+    request: HttpRequest, response: HttpResponseBase, timeout: Optional[int]
+) -> HttpResponseBase:
+    key = getattr(request, PENDING_KEY_REQUEST_ATTR, None)
+    if key is None:
+        return response
+    delattr(request, PENDING_KEY_REQUEST_ATTR)
+
+    if response.status_code == 200 and not response.streaming:
+        get_cache().set(key, (response.content, response["Content-Type"]), timeout)
+        response["X-Cache"] = "MISS"
+    return response
@@ -0,0 +1,117 @@
+"""
+Changes feed of list endpoints (`/changes/?changed_since=<cursor>`), for the incremental
+synchronization of clients.
+
+A client first gets the current cursor (no `changed_since`), then downloads the full list.
+Afterwards, it gives its last cursor to get the records changed since, and the identifiers of
+the deleted ones, with the cursor to use next time (see `core.changes`). Records changed but
+not readable anymore by the client (access rules, filters) are given as deleted.
+"""
+import typing as t
+from functools import wraps
+
+from django.db.models import Model, QuerySet
+from django.http import HttpRequest
+from ninja import Query, Schema
+from ninja.utils import contribute_operation_args, is_async_callable
+from pydantic import BaseModel, Field, create_model, field_validator
+
+from core.changes import Cursor, read_changes, track_changes
+
+__all__ = [
+    "changes",
+    "create_changes_schema",
+]
+
+
+class ChangesInput(Schema):
+    changed_since: t.Optional[str] = Field(
+        None,
+        description="Cursor given by the previous call. When not given, only the current "
+        "cursor is returned.",
+    )
+    limit: int = Field(
+        1000, ge=1, le=1000, description="Maximum number of changes to return."
+    )
+
+    @field_validator("changed_since")
+    @classmethod
+    def check_changed_since(cls, value):
+        if value is not None:
+            Cursor.parse(value)
+        return value
+
+
+def create_changes_schema(
+    model: t.Type[Model], schema: t.Type[BaseModel], pk_type: t.Type = t.Any
+) -> t.Type[BaseModel]:
+    """Response schema of the changes feed of the given list schema."""
+    return create_model(
+        f"{model.__name__}Changes",
+        __base__=Schema,
+        cursor=(str, Field(..., description="Cursor to give for the next call.")),
+        has_more=(
+            bool,
+            Field(..., description="More changes are available with the returned cursor."),
+        ),
+        changed=(t.List[schema], Field(..., description="Records created or modified.")),
+        deleted=(t.List[pk_type], Field(..., description="Identifiers of deleted records.")),
+    )
+
+
+def changes(model: t.Type[Model]) -> t.Callable:
+    """
+    Give the records of the queryset returned by the view changed since the cursor of the
+    `changed_since` query parameter. The changes of the model are tracked from now on.
+
+    @api.get(..., response=create_changes_schema(MyModel, MySchema))
+    @changes(MyModel)
+    def my_view(request):
+        return MyModel.objects.all()
+    """
+    track_changes(model)
+
+    def _response(queryset: QuerySet, changes_input: ChangesInput) -> t.Dict[str, t.Any]:
+        cursor = None
+        if changes_input.changed_since is not None:
+            cursor = Cursor.parse(changes_input.changed_since)
+        result = read_changes(model, cursor, limit=changes_input.limit)
+
+        changed = []
+        if result.changed:
+            instances = {
+                instance.pk: instance
+                for instance in queryset.filter(pk__in=result.changed)
+            }
+            changed = [instances[pk] for pk in result.changed if pk in instances]
+        readable = {instance.pk for instance in changed}
+        deleted = [pk for pk in result.changed if pk not in readable]
+        deleted.extend(result.deleted)
+        return {
+            "cursor": str(result.cursor),
+            "has_more": result.has_more,
+            "changed": changed,
+            "deleted": deleted,
+        }
+
+    def decorator(func: t.Callable) -> t.Callable:
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_changes(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                changes_input = kwargs.pop("ninja_changes")
+                queryset = await func(request, **kwargs)
+                return _response(queryset, changes_input)
+
+        else:
+
+            @wraps(func)
+            def view_with_changes(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                changes_input = kwargs.pop("ninja_changes")
+                queryset = func(request, **kwargs)
+                return _response(queryset, changes_input)
+
+        contribute_operation_args(view_with_changes, "ninja_changes", ChangesInput, Query(...))
+        return view_with_changes
+
+    return decorator
@@ -0,0 +1,356 @@
+"""
+Coalescing of identical concurrent GET requests (single-flight).
+
+While a request is being processed, the identical requests arriving in the meantime (same
+path, query parameters and caller fingerprint, usually derived from its access rules) wait
+for it instead of running the same queries, and get a copy of its rendered response. The
+first request is the "leader", the waiting ones are "followers". If the leader fails (or
+takes longer than `API_COALESCE_TIMEOUT` seconds), followers process the request themselves.
+
+Only successful responses without cookies are shared. Coalescing happens between the threads
+(and the tasks, for async views) of a process.
+
+Two decorators are provided: `coalesce` for ninja operations (see the `coalesce` option of
+routes), and `coalesce_view` for plain django views.
+"""
+import asyncio
+import hashlib
+import threading
+from collections import defaultdict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+from django.utils import translation
+from ninja.utils import contribute_operation_callback, is_async_callable
+
+from .renderers import get_media_type
+
+__all__ = [
+    "CoalescedResponse",
+    "coalesce",
+    "coalesce_view",
+    "get_coalesce_stats",
+    "clear_coalesce_stats",
+]
+
+
+PENDING_FLIGHT_REQUEST_ATTR = "_coalesce_flight"
+
+# Leaders and followers of the current process, per name
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"leaders": 0, "followers": 0})
+_flights: Dict[str, "_Flight"] = {}
+_lock = threading.Lock()
+
+
+class CoalescedResponse(Exception):
+    """Raised by the decorator on a follower, to bypass the other decorators of the view and
+    the serialization.
+    """
+
+    def __init__(self, response: HttpResponse):
+        super().__init__()
+        self.response = response
+
+
+class _Flight:
+    """A request being processed, and the response it will share."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.owner = _get_owner()
+        self.done = threading.Event()
+        self.shared: Optional[tuple] = None
+
+    def land(self, response: Optional[HttpResponseBase]) -> None:
+        if response is not None and _is_shareable(response):
+            self.shared = (
+                response.content,
+                response.status_code,
+                [(name, value) for name, value in response.items()],
+            )
+        with _lock:
+            if _flights.get(self.key) is self:
+                del _flights[self.key]
+        self.done.set()
+
+    def get_response(self) -> Optional[HttpResponse]:
+        if self.shared is None:
+            return None
+        content, status, headers = self.shared
+        response = HttpResponse(content, status=status)
+        for name, value in headers:
+            response[name] = value
+        return response
+
+
+def get_timeout() -> float:
+    return getattr(settings, "API_COALESCE_TIMEOUT", 10)
+
+
+def _get_owner():
+    """Identify the current execution: the task for async code, the thread otherwise."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # no running event loop
+        task = None
+    return task if task is not None else threading.get_ident()
+
+
+def _is_shareable(response: HttpResponseBase) -> bool:
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and getattr(response, "is_rendered", True)
+    )
+
+
+def _get_key(request: HttpRequest, name: str, fingerprint: Optional[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update(request.get_full_path().encode("utf-8"))
+    digest.update(b"\x1e")
+    digest.update(get_media_type(request).encode("utf-8"))
+    digest.update(b"\x1e")
+    digest.update((fingerprint or "").encode("utf-8"))
+    return f"{name}:{digest.hexdigest()}"
+
+
+def _take_off(key: str, name: str) -> Tuple[_Flight, bool]:
+    """Join the flight of the key, or start it. Return the flight and if it was joined."""
+    with _lock:
+        flight = _flights.get(key)
+        if flight is not None and flight.owner != _get_owner():
+            _stats[name]["followers"] += 1
+            return flight, True
+        flight = _Flight(key)
+        _flights[key] = flight
+        _stats[name]["leaders"] += 1
+        return flight, False
+
+
+# ----------------------------------------------------
+# Ninja operations
+# ----------------------------------------------------
+
+
+def coalesce(
+    name: str, fingerprint: Optional[Callable[[HttpRequest], str]] = None
+) -> Callable:
+    """
+    Coalesce the identical concurrent calls of the decorated view. Must be the innermost
+    decorator, so permissions are checked before sharing a response.
+
+    @api.get(...
+    @coalesce("my_view")
+    def my_view(request):
+
+    :param name: unique name of the view, used in keys and statistics
+    :param fingerprint: function returning a string identifying what the caller can see
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_coalesce(request: HttpRequest, **kwargs: Any) -> Any:
+                key = _get_key(request, name, fingerprint(request) if fingerprint else None)
+                flight, joined = _take_off(key, name)
+                if joined:
+                    await sync_to_async(flight.done.wait, thread_sensitive=False)(
+                        get_timeout()
+                    )
+                    _follow(flight)
+                else:
+                    setattr(request, PENDING_FLIGHT_REQUEST_ATTR, flight)
+                return await func(request, **kwargs)
+
+        else:
+
+            @wraps(func)
+            def view_with_coalesce(request: HttpRequest, **kwargs: Any) -> Any:
+                key = _get_key(request, name, fingerprint(request) if fingerprint else None)
+                flight, joined = _take_off(key, name)
+                if joined:
+                    flight.done.wait(get_timeout())
+                    _follow(flight)
+                else:
+                    setattr(request, PENDING_FLIGHT_REQUEST_ATTR, flight)
+                return func(request, **kwargs)
+
+        contribute_operation_callback(view_with_coalesce, _make_operation_coalesced)
+        return view_with_coalesce
+
+    return decorator
+
+
+def _follow(flight: _Flight) -> None:
+    response = flight.get_response() if flight.done.is_set() else None
+    if response is not None:
+        raise CoalescedResponse(response)
+    # leader failed or too slow: the request is processed
+
+
+def _make_operation_coalesced(operation: Any) -> None:
+    """Give the followers their response, and share the rendered response of leaders."""
+    view_func = operation.view_func
+    run = operation.run
+
+    if is_async_callable(view_func):
+
+        @wraps(view_func)
+        async def view_func_coalesced(request: HttpRequest, **kwargs: Any) -> Any:
+            try:
+                return await view_func(request, **kwargs)
+            except CoalescedResponse as follower:
+                return follower.response
+
+    else:
+
+        @wraps(view_func)
+        def view_func_coalesced(request: HttpRequest, **kwargs: Any) -> Any:
+            try:
+                return view_func(request, **kwargs)
+            except CoalescedResponse as follower:
+                return follower.response
+
+    if is_async_callable(run):
+
+        @wraps(run)
+        async def run_coalesced(request: HttpRequest, **kw: Any) -> HttpResponseBase:
+            response = None
+            try:
+                response = await run(request, **kw)
+                return response
+            finally:
+                _land(request, response)
+
+    else:
+
+        @wraps(run)
+        def run_coalesced(request: HttpRequest, **kw: Any) -> HttpResponseBase:
+            response = None
+            try:
+                response = run(request, **kw)
+                return response
+            finally:
+                _land(request, response)
+
+    operation.view_func = view_func_coalesced
+    operation.run = run_coalesced
+
+
+def _land(request: HttpRequest, response: Optional[HttpResponseBase]) -> None:
+    flight = getattr(request, PENDING_FLIGHT_REQUEST_ATTR, None)
+    if flight is not None:
+        delattr(request, PENDING_FLIGHT_REQUEST_ATTR)
+        flight.land(response)
+
+
+# ----------------------------------------------------
+# Django views
+# ----------------------------------------------------
+
+
+def get_language_fingerprint(request: HttpRequest) -> str:
+    return translation.get_language() or ""
+
+
+def coalesce_view(
+    name: str, fingerprint: Optional[Callable[[HttpRequest], Optional[str]]] = None
+) -> Callable:
+    """
+    Coalesce the identical concurrent GET requests of a django view (function, or result of
+    `View.as_view()`). Template responses are rendered to be shared. By default, requests are
+    distinguished by their active language only: the view must not depend on the user.
+
+    path("", coalesce_view("homepage")(HomePageView.as_view()))
+
+    :param fingerprint: function returning a string identifying what the caller can see, or
+        None to not coalesce the request
+    """
+    fingerprint = fingerprint or get_language_fingerprint
+
+    def decorator(view: Callable) -> Callable:
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def coalesced_view(request: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+                key = _get_view_key(request, name, fingerprint)
+                if key is None:
+                    return await view(request, *args, **kwargs)
+                flight, joined = _take_off(key, name)
+                if joined:
+                    await sync_to_async(flight.done.wait, thread_sensitive=False)(
+                        get_timeout()
+                    )
+                    response = flight.get_response() if flight.done.is_set() else None
+                    return response or await view(request, *args, **kwargs)
+                response = None
+                try:
+                    response = await view(request, *args, **kwargs)
+                    if getattr(response, "is_rendered", True) is False:
+                        await sync_to_async(response.render)()
+                    return response
+                finally:
+                    flight.land(response)
+
+        else:
+
+            @wraps(view)
+            def coalesced_view(request: HttpRequest, *args: Any, **kwargs: Any) -> Any:
+                key = _get_view_key(request, name, fingerprint)
+                if key is None:
+                    return view(request, *args, **kwargs)
+                flight, joined = _take_off(key, name)
+                if joined:
+                    flight.done.wait(get_timeout())
+                    response = flight.get_response() if flight.done.is_set() else None
+                    return response or view(request, *args, **kwargs)
+                response = None
+                try:
+                    response = view(request, *args, **kwargs)
+                    if getattr(response, "is_rendered", True) is False:
+                        response.render()
+                    return response
+                finally:
+                    flight.land(response)
+
+        return coalesced_view
+
+    return decorator
+
+
+def _get_view_key(request, name, fingerprint) -> Optional[str]:
+    if request.method not in ("GET", "HEAD"):
+        return None
+    value = fingerprint(request)
+    if value is None:
+        return None
+    return _get_key(request, f"{name}:{request.method}", value)
+
+
+# ----------------------------------------------------
+# Statistics
+# ----------------------------------------------------
+
+
+def get_coalesce_stats() -> Dict[str, Dict[str, Any]]:
+    """Leaders, followers and ratio of coalesced requests of each view, for the current
+    process.
+    """
+    result = {}
+    for name, stats in _stats.items():
+        total = stats["leaders"] + stats["followers"]
+        result[name] = {
+            **stats,
+            "ratio": (stats["followers"] / total) if total else None,
+        }
+    return result
+
+
+def clear_coalesce_stats() -> None:
+    _stats.clear()
@@ -0,0 +1,160 @@
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Optional, Union
+
+from django.http import HttpRequest, HttpResponseNotModified
+from django.http.response import HttpResponseBase
+from django.utils.http import parse_etags, quote_etag
+from ninja.utils import contribute_operation_callback, is_async_callable
+
+__all__ = [
+    "NotModified",
+    "compute_etag",
+    "conditional",
+    "etag_matches",
+    "get_version_etag",
+    "if_match",
+    "set_request_etag",
+]
+
+
+ETAG_REQUEST_ATTR = "_conditional_etag"
+
+
+class NotModified(Exception):
+    """Raised by a view when the client representation (`If-None-Match`) is still valid. The
+    `conditional` decorator turns it into a `304` response, skipping the serialization.
+    """
+
+    def __init__(self, etag: str):
+        super().__init__(etag)
+        self.etag = etag
+
+
+def compute_etag(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = str(part).encode("utf-8")
+        digest.update(part)
+        digest.update(b"\x1e")
+    return quote_etag(digest.hexdigest())
+
+
+def etag_matches(request: HttpRequest, etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if "*" in etags:
+        return True
+    # `If-None-Match` uses the weak comparison (RFC 9110, 13.1.2)
+    return etag.removeprefix("W/") in [e.removeprefix("W/") for e in etags]
+
+
+def get_version_etag(version: Union[int, str], media_type: str) -> str:
+    """ETag of a representation of the version of an object (see
+    `base.models.mixins.VersionedModelMixin`): strong ETags differ between media types.
+    """
+    return quote_etag(f"{version}-{media_type.rpartition('/')[2]}")
+
+
+def if_match(request: HttpRequest, *etags: str) -> bool:
+    """Whether the write can be done: no `If-Match` header, or the client has one of the
+    current representations.
+    """
+    header = request.headers.get("If-Match")
+    if not header:
+        return True
+    matches = parse_etags(header)
+    # `If-Match` uses the strong comparison (RFC 9110, 13.1.1): weak ETags never match
+    return "*" in matches or any(etag in matches for etag in etags)
+
+
+def set_request_etag(request: HttpRequest, etag: str) -> None:
+    """Give the ETag of the response being computed, instead of hashing its body."""
+    setattr(request, ETAG_REQUEST_ATTR, etag)
+
+
+def not_modified_response(etag: str) -> HttpResponseNotModified:
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return response
+
+
+def conditional(func: Callable) -> Callable:
+    """
+    Add ETag on successful GET responses, and respond `304` when the client already has the
+    current representation (`If-None-Match` header).
+
+    @api.get(...
+    @conditional
+    def my_view(request):
+
+    The ETag is the hash of the response body, unless the view computed it beforehand with
+    `set_request_etag` (or raised `NotModified`). Successful writes only give the ETag set by
+    the view (e.g. version of the object written).
+    """
+
+    if is_async_callable(func):
+
+        @wraps(func)
+        async def view_with_conditional(request: HttpRequest, **kwargs: Any) -> Any:
+            try:
+                return await func(request, **kwargs)
+            except NotModified as exc:
+                return not_modified_response(exc.etag)
+
+    else:
+
+        @wraps(func)
+        def view_with_conditional(request: HttpRequest, **kwargs: Any) -> Any:
+            try:
+                return func(request, **kwargs)
+            except NotModified as exc:
+                return not_modified_response(exc.etag)
+
+    contribute_operation_callback(view_with_conditional, _make_operation_conditional)
+    return view_with_conditional
+
+
+def _make_operation_conditional(operation: Any) -> None:
+    """Wrap the operation run, as the response body is only available once ninja rendered it."""
+    run = operation.run
+
+    if is_async_callable(run):
+
+        @wraps(run)
+        async def run_conditional(request: HttpRequest, **kw: Any) -> HttpResponseBase:
+            response = await run(request, **kw)
+            return _process_response(request, response)
+
+    else:
+
+        @wraps(run)
+        def run_conditional(request: HttpRequest, **kw: Any) -> HttpResponseBase:
+            response = run(request, **kw)
+            return _process_response(request, response)
+
+    operation.run = run_conditional
+
+
+def _process_response(
+    request: HttpRequest, response: HttpResponseBase
+) -> HttpResponseBase:
+    etag: Optional[str] = getattr(request, ETAG_REQUEST_ATTR, None)
+    if request.method not in ("GET", "HEAD"):
+        if etag is not None and 200 <= response.status_code < 300:
+            response["ETag"] = etag
+        return response
+    if response.status_code != 200 or response.streaming:
+        return response
+
+    if etag is None:
+        etag = compute_etag(response.content)
+
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    response["ETag"] = etag
+    return response
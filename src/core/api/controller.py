@@ -1,27 +1,61 @@
 import inspect
 import typing as t
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
 from types import FunctionType
 
 import pydantic
 from asgiref.sync import async_to_sync
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
 from django.db import transaction
-from django.db.models import ManyToManyField, Model, QuerySet
+from django.db.models import F, ManyToManyField, Model, QuerySet
 from django.db.utils import DatabaseError
 from django.http import HttpRequest
-from ninja import Body, FilterSchema, NinjaAPI, Path, Query, Router, Schema
-from ninja.errors import ValidationError
+from django.utils.text import slugify
+from ninja import FilterSchema, NinjaAPI, Path, Query, Router, Schema
+from ninja.constants import NOT_SET
+from ninja.errors import HttpError, ValidationError
 from ninja.security.base import AuthBase
 from ninja.signature.utils import get_path_param_names
 from ninja.utils import normalize_path
 from pydantic import BaseModel
 
-from user.access_policy import apply_access_rules, request_to_context
-
+from base.models.mixins import VersionConflict, VersionedModelMixin
+from core.changes import get_changes_marker, get_record_marker, track_changes
+from core.schemas.fields import convert_db_field
+from core.schemas.relations import QuerySetDelta
+from user.access_policy import (
+    access_rules_fingerprint,
+    apply_access_rules,
+    request_to_context,
+)
+
+from .cache import invalidate_response_cache_on_commit, response_cache
+from .changes import changes, create_changes_schema
+from .conditional import (
+    NotModified,
+    compute_etag,
+    conditional,
+    etag_matches,
+    get_version_etag,
+    if_match,
+    set_request_etag,
+)
+from .dump import dump_response
+from .events import events, get_events_openapi_extra
+from .expand import RelationExpander, expand, get_relation_expander, get_request_expand
+from .export import export, get_export_openapi_extra
+from .idempotency import idempotent
+from .jobs import JobSchema, as_job, register_view_job
 from .ordering import Ordering, OrderingBase, ordering
 from .pagination import PageNumberPagination, PaginationBase, paginate
+from .params import Body
+from .related import RelatedPlan, build_related_plan, get_response_schema
+from .renderers import MEDIA_TYPES, get_media_type
 from .route import MAGIC_ROUTE_ATTR, Route  # pragma: no cover
+from .stats import stats
+from .values import ValuesSerializer, get_values_serializer, values_response
 
 
 class BaseController:
@@ -40,12 +74,20 @@ class BaseController:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            # The instance is shared: the current action and request are local to each
+            # thread (or asyncio task) processing a request.
+            cls._instance._context = ContextVar(
+                f"{cls.__name__}_context", default=(None, None)
+            )
         return cls._instance
 
-    def __init__(self):
-        self.action = None
-        self.request = None
-        super().__init__()
+    @property
+    def action(self) -> t.Optional[str]:
+        return self._context.get()[0]
+
+    @property
+    def request(self) -> t.Optional[HttpRequest]:
+        return self._context.get()[1]
 
     def __init_subclass__(cls) -> None:
         super().__init_subclass__()
@@ -71,36 +113,43 @@ class BaseController:
         instances have the magic attribute `MAGIC_ROUTE_ATTR` and add them to the
         router.
         """
-        view_members = {
-            name: member
-            for name, member in inspect.getmembers(cls)
-            if hasattr(member, MAGIC_ROUTE_ATTR)
-        }
-
-        ordered_view_members = sorted(
-            view_members.items(),
+        ordered_routes = sorted(
+            cls.get_routes().items(),
             key=lambda view_member: list(cls.__dict__).index(view_member[0]),
         )
-        for name, func in ordered_view_members:
-            route = getattr(func, MAGIC_ROUTE_ATTR, None)
+        for name, route in ordered_routes:
             route.set_controller(cls())  # singleton instance is bind to route
             router.add_api_operation(**route.as_operation())
 
+    @classmethod
+    def get_routes(cls) -> t.Dict[str, Route]:
+        """Return the routes of the controller, by method name."""
+        return {
+            name: getattr(member, MAGIC_ROUTE_ATTR)
+            for name, member in inspect.getmembers(cls)
+            if hasattr(member, MAGIC_ROUTE_ATTR)
+        }
+
+    @classmethod
+    def get_coalesce_fingerprint(cls, request: HttpRequest) -> str:
+        """Coalesced requests (`coalesce` option of routes) are shared between the requests
+        of the same user.
+        """
+        auth = getattr(request, "auth", None)
+        user = getattr(auth, "user", auth)
+        return str(getattr(user, "pk", ""))
+
     @contextmanager
     def set_context(
         self,
         request: HttpRequest,
         action: str,
     ):
-        old_action = self.action
-        old_request = self.request
-        self.action = action
-        self.request = request
+        token = self._context.set((action, request))
         try:
             yield
         finally:
-            self.action = old_action
-            self.request = old_request
+            self._context.reset(token)
 
     def permission_denied(self, message=None):
         if not message:
@@ -113,8 +162,149 @@ class BaseModelController(BaseController):
     model: Model = None
     path_model = None
 
+    # Relations to load for each action (action name -> `RelatedPlan`). When not given, the
+    # plan is deduced from the response schema of the route at registration.
+    related_plans: t.Dict[str, RelatedPlan] = {}
+    auto_related_plans: bool = True
+    _related_plans: t.Dict[str, RelatedPlan] = {}
+
+    # ETags of list and retrieve computed from the change log of the model and of the given
+    # dependencies (see `core.changes`, their changes are tracked): any write of their records,
+    # many-to-many relations included, gives new ETags, and `304` are returned without loading
+    # nor serializing the records. Otherwise, ETags are the hash of the response body.
+    conditional_changes: bool = False
+    conditional_changes_dependencies: t.List[t.Type[Model]] = []
+
+    # Server-side cache of rendered responses (see `core.api.cache`): cached actions, and
+    # models (in addition to `model`) whose changes invalidate them.
+    response_cache_actions: t.List[str] = []
+    response_cache_dependencies: t.List[t.Type[Model]] = []
+    response_cache_timeout: t.Optional[int] = 300
+
+    # Actions whose identical concurrent requests share one execution (see `core.api.coalesce`)
+    coalesce_actions: t.List[str] = []
+
+    # Actions processed once per `Idempotency-Key` header (see `core.api.idempotency`), for
+    # the clients retrying their writes
+    idempotent_actions: t.List[str] = []
+
+    # Actions run in the background by the workers: they respond `202` with the job to follow
+    # (see `core.api.jobs`).
+    job_actions: t.List[str] = []
+
+    # Relations of the response schemas that can be expanded with the `expand` query parameter
+    # of list and retrieve (relation name -> nested schema, see `core.api.expand`).
+    expandable_fields: t.Dict[str, t.Type[BaseModel]] = {}
+
+    @classmethod
+    def add_routes_to(cls, router: Router) -> None:
+        cls._related_plans = cls._compute_related_plans()
+        cls._add_response_cache_decorators()
+        if cls.conditional_changes:
+            track_changes(cls.model, *cls.conditional_changes_dependencies)
+        for name, route in cls.get_routes().items():
+            if name in cls.coalesce_actions:
+                route.coalesce = True
+            if name in cls.idempotent_actions:
+                # Last decorator is the innermost one: permissions are checked before it.
+                route.decorators.append(
+                    idempotent(
+                        f"{cls.__name__}.{name}",
+                        fingerprint=cls.get_idempotency_fingerprint,
+                    )
+                )
+            if name in cls.job_actions:
+                cls._set_job_route(name, route)
+        super().add_routes_to(router)
+
+    @classmethod
+    def _set_job_route(cls, name: str, route: Route) -> None:
+        job_name = f"{cls.__name__}.{name}"
+        controller = cls()
+        view_func = route.view_func
+
+        @wraps(view_func)
+        def run_action(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+            with controller.set_context(request, action=name):
+                return view_func(controller, request, **kwargs)
+
+        register_view_job(job_name, run_action, route.route_params["response"])
+        route.route_params["response"] = {202: JobSchema}
+        # Last decorator is the innermost one: permissions are checked before it.
+        route.decorators.append(as_job(job_name))
+
+    @classmethod
+    def _compute_related_plans(cls) -> t.Dict[str, RelatedPlan]:
+        plans = {}
+        if cls.model is not None and cls.auto_related_plans:
+            for name, route in cls.get_routes().items():
+                schema = get_response_schema(route.route_params.get("response"))
+                if schema is not None:
+                    plan = build_related_plan(cls.model, schema)
+                    if plan:
+                        plans[name] = plan
+        plans.update(cls.related_plans)
+        # the changes feed serializes the records as the list
+        if "list" in plans and "changes" not in cls.related_plans:
+            plans["changes"] = plans["list"]
+        return plans
+
+    @classmethod
+    def _add_response_cache_decorators(cls) -> None:
+        if cls.model is None:
+            return
+        models = [cls.model, *cls.response_cache_dependencies]
+        models.extend(
+            cls.model._meta.get_field(fname).related_model
+            for fname in cls.expandable_fields
+        )
+        for name, route in cls.get_routes().items():
+            if name in cls.response_cache_actions:
+                # Last decorator is the innermost one: permissions are checked before it.
+                route.decorators.append(
+                    response_cache(
+                        f"{cls.__name__}.{name}",
+                        models=models,
+                        timeout=cls.response_cache_timeout,
+                        fingerprint=cls.get_response_cache_fingerprint,
+                    )
+                )
+
+    @classmethod
+    def get_response_cache_fingerprint(cls, request: HttpRequest) -> str:
+        """Cached responses are shared between callers having the same access rules."""
+        context = async_to_sync(request_to_context)(request)
+        return async_to_sync(access_rules_fingerprint)(cls.model, "read", context)
+
+    @classmethod
+    def get_coalesce_fingerprint(cls, request: HttpRequest) -> str:
+        if cls.model is None:
+            return super().get_coalesce_fingerprint(request)
+        return cls.get_response_cache_fingerprint(request)
+
+    @classmethod
+    def get_idempotency_fingerprint(cls, request: HttpRequest) -> str:
+        """Idempotency keys are unique per user."""
+        return super().get_coalesce_fingerprint(request)
+
+    @classmethod
+    def get_relation_expander(cls, response: t.Any) -> t.Optional[RelationExpander]:
+        schema = get_response_schema(response)
+        if not cls.expandable_fields or schema is None:
+            return None
+        return get_relation_expander(
+            cls.model, schema, tuple(cls.expandable_fields.items())
+        )
+
     # Route Helpers
 
+    @classmethod
+    def _get_pk_type(cls) -> t.Type:
+        python_type, dummy = convert_db_field(cls.model._meta.pk)
+        if t.get_origin(python_type) is t.Union:  # primary keys with default are optional
+            python_type = next(arg for arg in t.get_args(python_type) if arg is not type(None))
+        return python_type
+
     @classmethod
     def method_to_route_function(
         cls,
@@ -128,6 +318,7 @@ class BaseModelController(BaseController):
         decorators: t.List[t.Callable] = None,
         view_wrapper: t.Callable = None,
         tags: t.Optional[t.List[str]] = None,
+        openapi_extra: t.Optional[t.Dict[str, t.Any]] = None,
     ):
         """This method decorates the given function with the route obj. This is required for the
         method to be added to the API.
@@ -150,6 +341,7 @@ class BaseModelController(BaseController):
             description=description,
             decorators=decorators,
             tags=tags,
+            openapi_extra=openapi_extra,
         )
         route.set_controller(cls())
         setattr(view_func, MAGIC_ROUTE_ATTR, route)
@@ -172,7 +364,17 @@ class BaseModelController(BaseController):
     # Queryset Helpers
 
     def get_queryset(self):
-        return self.model._default_manager.all()
+        queryset = self.model._default_manager.all()
+        return self.apply_related_plan(queryset)
+
+    def get_related_plan(self) -> t.Optional[RelatedPlan]:
+        return self._related_plans.get(self.action)
+
+    def apply_related_plan(self, queryset: QuerySet[Model]):
+        plan = self.get_related_plan()
+        if plan:
+            queryset = plan.apply(queryset)
+        return queryset
 
     def apply_query_parameters(
         self, queryset: QuerySet[Model], query_parameters: BaseModel
@@ -196,6 +398,151 @@ class BaseModelController(BaseController):
         context = async_to_sync(request_to_context)(self.request)
         return async_to_sync(apply_access_rules)(queryset, operation, context)
 
+    # Conditional Requests
+
+    def check_not_modified(self, *markers):
+        """Compute the ETag of the response from the given markers, and stop the processing
+        if the client already has this version.
+        """
+        user = getattr(getattr(self.request, "auth", None), "user", None)
+        etag = compute_etag(
+            self.request.get_full_path(),
+            getattr(user, "pk", None),
+            get_media_type(self.request),
+            *markers,
+        )
+        set_request_etag(self.request, etag)
+        if etag_matches(self.request, etag):
+            raise NotModified(etag)
+
+    def get_conditional_markers(self) -> t.Tuple[t.Any, ...]:
+        """Markers of the ETags of list and retrieve (`conditional_changes`)."""
+        return get_changes_marker(self.model, *self.conditional_changes_dependencies)
+
+    # Optimistic Concurrency
+
+    @classmethod
+    def is_versioned(cls) -> bool:
+        """Whether the objects have a version, checked by the writes (`If-Match` header)."""
+        return cls.model is not None and issubclass(cls.model, VersionedModelMixin)
+
+    def check_precondition(self, instance: Model) -> None:
+        """Refuse the write (`412`) when the client does not have the current version of the
+        instance (`If-Match` header), in any of its representations.
+        """
+        if isinstance(instance, VersionedModelMixin):
+            version = self.get_version(instance)
+            if not if_match(
+                self.request,
+                *[get_version_etag(version, media_type) for media_type in MEDIA_TYPES],
+            ):
+                self.precondition_failed()
+
+    def get_version(self, instance: Model) -> str:
+        """Version of the instance given in its ETags. With `conditional_changes`, the changes
+        logged for the record are part of it: its relations can be written without
+        incrementing its version (custom through models, cascades, ...).
+        """
+        if self.conditional_changes:
+            count, last = get_record_marker(self.model, instance.pk)
+            return f"{instance.version}.{count}.{last or 0}"
+        return str(instance.version)
+
+    def bump_version(self, instance: Model) -> None:
+        """Increment the version of the instance when only its many-to-many relations are
+        written, if it was not modified since it was read (`412` otherwise).
+        """
+        updated = (
+            type(instance)
+            ._default_manager.filter(pk=instance.pk, version=instance.version)
+            .update(version=F("version") + 1)
+        )
+        if not updated:
+            self.precondition_failed()
+        instance.version += 1
+
+    def precondition_failed(self) -> t.NoReturn:
+        raise HttpError(412, "The object was modified since you read it.")
+
+    # Prefetch
+
+    def get_prefetched_queryset(
+        self, instance: Model, field_name: str, related_objects: t.Iterable[Model]
+    ) -> QuerySet:
+        """Queryset of a many-to-many relation of the instance, evaluated with the given objects,
+        to set in its prefetch cache (as `prefetch_related_objects` does): the related manager
+        still gives querysets (`count`, `filter`, ...) without reading the relation.
+        """
+        getattr(instance, "_prefetched_objects_cache", {}).pop(field_name, None)
+        queryset = getattr(instance, field_name).get_queryset()
+        queryset._result_cache = list(related_objects)
+        queryset._prefetch_done = True
+        return queryset
+
+    # Bulk Helpers
+
+    def bulk_set_many_to_many(
+        self,
+        field_name: str,
+        relations: t.List[t.Tuple[Model, t.Iterable[Model]]],
+        creation: bool = False,
+    ) -> None:
+        """Set a many-to-many relation of several instances, writing the through rows in bulk
+        (one delete and one insert at most), and set the new values in the prefetch cache.
+        :param relations: list of (instance, related objects or `QuerySetDelta`) pairs
+        :param creation: the instances were just created, there is no existing relation
+        """
+        field = self.model._meta.get_field(field_name)
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+
+        existing = {}
+        if not creation:
+            rows = through._default_manager.filter(
+                **{f"{source}__in": [instance.pk for instance, dummy in relations]}
+            ).values_list("pk", source, target)
+            existing = {(source_pk, target_pk): pk for pk, source_pk, target_pk in rows}
+
+        wanted = {}
+        for instance, related_objects in relations:
+            prefetched_objects = getattr(instance, "_prefetched_objects_cache", {})
+            if isinstance(related_objects, QuerySetDelta):
+                removed = set(related_objects.remove)
+                for source_pk, target_pk in existing:
+                    if source_pk == instance.pk and target_pk not in removed:
+                        wanted[(source_pk, target_pk)] = None
+                for related_object in related_objects.add:
+                    wanted[(instance.pk, related_object.pk)] = None
+                prefetched_objects.pop(field_name, None)
+            else:
+                related_objects = list(related_objects)
+                for related_object in related_objects:
+                    wanted[(instance.pk, related_object.pk)] = None
+                prefetched_objects[field_name] = self.get_prefetched_queryset(
+                    instance, field_name, related_objects
+                )
+            setattr(instance, "_prefetched_objects_cache", prefetched_objects)
+
+        obsoletes = [pk for pair, pk in existing.items() if pair not in wanted]
+        if obsoletes:
+            through._default_manager.filter(pk__in=obsoletes).delete()
+        missings = [
+            through(**{source: source_pk, target: target_pk})
+            for source_pk, target_pk in wanted
+            if (source_pk, target_pk) not in existing
+        ]
+        if missings:
+            through._default_manager.bulk_create(missings)
+
+    def bulk_invalidate_caches(self) -> None:
+        """Bulk writes do not emit model signals: invalidate the cached responses."""
+        models = [self.model]
+        for field in self.model._meta.get_fields():
+            if isinstance(field, ManyToManyField):
+                models.append(field.related_model)
+        invalidate_response_cache_on_commit(*models)
+
     # Data Validation
 
     def validate_data(self, request_body: BaseModel, instance: Model = None):
@@ -216,6 +563,28 @@ class BaseModelController(BaseController):
             values[fname] = getattr(request_body, fname, None)
         return values
 
+    def get_changed_fields(self, instance: Model, validated_data: t.Dict[str, t.Any]) -> t.List[str]:
+        """Names of the fields of the validated data whose value differs from the one of the
+        instance: unchanged values (e.g. resent by forms) are not written.
+        """
+        deferred_fields = instance.get_deferred_fields()
+        changed = []
+        for fname, value in validated_data.items():
+            try:
+                field = instance._meta.get_field(fname)
+            except FieldDoesNotExist:
+                changed.append(fname)
+                continue
+            if not field.concrete or field.many_to_many or field.attname in deferred_fields:
+                changed.append(fname)  # not compared (e.g. not loaded)
+                continue
+            if field.is_relation and isinstance(value, Model):
+                # compare the keys, without loading the related object
+                value = getattr(value, field.target_field.attname)
+            if getattr(instance, field.attname) != value:
+                changed.append(fname)
+        return changed
+
 
 # -------------------------------------------
 # Model Mixin (CRUD Operations)
@@ -230,6 +599,25 @@ class ListModelControllerMixin:
     list_ordering_fields: t.List[str] = []
     list_ordering_default_fields: t.List[str] = []
     list_pagination: t.Optional[t.Type[PaginationBase]] = PageNumberPagination
+    list_conditional: bool = True
+    # Serialize the list from `values()` rows instead of model instances (see `core.api.values`)
+    list_values: bool = False
+    # Serialize the instances with the dump function generated for the response schema,
+    # instead of ninja (see `core.api.dump`)
+    list_dump: bool = False
+    # Streaming export of the list as NDJSON or CSV (`/export/` action, see `core.api.export`)
+    list_export: bool = False
+    list_export_chunk_size: int = 2000
+    # Counts and min/max values grouped by some fields (`/stats/` action, see `core.api.stats`)
+    list_stats: bool = False
+    list_stats_group_by_fields: t.List[str] = []
+    list_stats_aggregate_fields: t.List[str] = []
+    # Records changed since a cursor, for incremental synchronization (`/changes/` action,
+    # see `core.api.changes`)
+    list_changes: bool = False
+    # Server-Sent Events notifying the changes of the records (`/events/` action, see
+    # `core.api.events`)
+    list_events: bool = False
 
     @classmethod
     def add_routes_to(cls, router) -> None:
@@ -248,11 +636,87 @@ class ListModelControllerMixin:
                 tags=[cls.model._meta.verbose_name],
             )
 
+            # Registered before the detail routes, as `/{id}/` would match `/export/`
+            if cls.list_export:
+                cls.method_to_route_function(
+                    view_func=cls.export,
+                    path="/export/",
+                    methods=["GET"],
+                    response=NOT_SET,
+                    operation_id=f"{cls.model._meta.verbose_name.lower()}Export",
+                    summary=f"Export {cls.model._meta.verbose_name_plural.capitalize()}",
+                    decorators=cls._export_function_decorators(),
+                    view_wrapper=cls._annotate_list_view_function,
+                    tags=[cls.model._meta.verbose_name],
+                    openapi_extra=get_export_openapi_extra(
+                        get_response_schema(cls.list_response_schema)
+                    ),
+                )
+
+            if cls.list_stats:
+                cls.method_to_route_function(
+                    view_func=cls.stats,
+                    path="/stats/",
+                    methods=["GET"],
+                    response=t.List[t.Dict[str, t.Any]],
+                    operation_id=f"{cls.model._meta.verbose_name.lower()}Stats",
+                    summary=f"{cls.model._meta.verbose_name.capitalize()} Statistics",
+                    decorators=cls._stats_function_decorators(),
+                    view_wrapper=cls._annotate_list_view_function,
+                    tags=[cls.model._meta.verbose_name],
+                )
+
+            if cls.list_changes:
+                cls.method_to_route_function(
+                    view_func=cls.changes,
+                    path="/changes/",
+                    methods=["GET"],
+                    response=create_changes_schema(
+                        cls.model,
+                        get_response_schema(cls.list_response_schema),
+                        cls._get_pk_type(),
+                    ),
+                    operation_id=f"{cls.model._meta.verbose_name.lower()}Changes",
+                    summary=f"{cls.model._meta.verbose_name.capitalize()} Changes",
+                    decorators=cls._changes_function_decorators(),
+                    view_wrapper=cls._annotate_list_view_function,
+                    tags=[cls.model._meta.verbose_name],
+                )
+
+            if cls.list_events:
+                cls.method_to_route_function(
+                    view_func=cls.events,
+                    path="/events/",
+                    methods=["GET"],
+                    response=NOT_SET,
+                    operation_id=f"{cls.model._meta.verbose_name.lower()}Events",
+                    summary=f"{cls.model._meta.verbose_name.capitalize()} Events",
+                    decorators=cls._events_function_decorators(),
+                    view_wrapper=cls._annotate_list_view_function,
+                    tags=[cls.model._meta.verbose_name],
+                    openapi_extra=get_events_openapi_extra(),
+                )
+
         super().add_routes_to(router)
 
     @classmethod
     def _list_function_decorators(cls):
         decorators = []
+        if cls.list_conditional:
+            decorators.append(conditional)
+        items_attribute = getattr(cls.list_pagination, "items_attribute", "results")
+        if cls.list_dump and not cls.list_values:
+            # outside of the expansion: the expanded relations are already rendered
+            decorators.append(
+                dump_response(get_response_schema(cls.list_response_schema), items_attribute)
+            )
+        expander = cls.get_relation_expander(cls.list_response_schema)
+        if expander:
+            decorators.append(expand(expander, items_attribute, values=cls.list_values))
+        elif cls.list_values:
+            decorators.append(
+                values_response(cls.get_list_values_serializer(), items_attribute)
+            )
         if cls.list_pagination:
             decorators.append(paginate(cls.list_pagination))
         if cls.list_ordering:
@@ -265,6 +729,45 @@ class ListModelControllerMixin:
             )
         return decorators
 
+    @classmethod
+    def _export_function_decorators(cls):
+        decorators = [
+            export(
+                get_response_schema(cls.list_response_schema),
+                slugify(cls.model._meta.verbose_name_plural),
+                chunk_size=cls.list_export_chunk_size,
+                values_serializer=(
+                    cls.get_list_values_serializer() if cls.list_values else None
+                ),
+            )
+        ]
+        if cls.list_ordering:
+            decorators.append(
+                ordering(
+                    cls.list_ordering,
+                    ordering_fields=cls.list_ordering_fields,
+                    default_ordering_fields=cls.list_ordering_default_fields,
+                )
+            )
+        return decorators
+
+    @classmethod
+    def _stats_function_decorators(cls):
+        return [
+            stats(
+                group_by_fields=cls.list_stats_group_by_fields,
+                aggregate_fields=cls.list_stats_aggregate_fields,
+            )
+        ]
+
+    @classmethod
+    def _changes_function_decorators(cls):
+        return [changes(cls.model)]
+
+    @classmethod
+    def _events_function_decorators(cls):
+        return [events(cls.model)]
+
     @classmethod
     def _annotate_list_view_function(
         cls, view_func: t.Callable[..., t.Any], path: str
@@ -280,6 +783,15 @@ class ListModelControllerMixin:
             ]
         return view_func
 
+    @classmethod
+    def get_list_values_serializer(
+        cls, expand: t.FrozenSet[str] = frozenset()
+    ) -> ValuesSerializer:
+        schema = get_response_schema(cls.list_response_schema)
+        if expand:
+            schema = cls.get_relation_expander(cls.list_response_schema).get_schema(expand)
+        return get_values_serializer(cls.model, schema)
+
     def list(
         self,
         request,
@@ -288,12 +800,65 @@ class ListModelControllerMixin:
     ) -> QuerySet:
         queryset = self.get_queryset()
         queryset = self.apply_query_parameters(queryset, query_parameters)
+        queryset = self.apply_access_rules(queryset, "read")
+        # The markers do not change with the expanded related objects
+        expand = get_request_expand(request)
+        if self.list_conditional and self.conditional_changes and not expand:
+            self.check_not_modified(*self.get_conditional_markers())
+        if self.list_values:
+            queryset = self.get_list_values_serializer(expand).values(queryset)
+        return queryset
+
+    def export(
+        self,
+        request,
+        path_parameters: t.Optional[BaseModel],
+        query_parameters: t.Optional[FilterSchema],
+    ) -> QuerySet:
+        queryset = self.get_queryset()
+        queryset = self.apply_query_parameters(queryset, query_parameters)
+        return self.apply_access_rules(queryset, "read")
+
+    def stats(
+        self,
+        request,
+        path_parameters: t.Optional[BaseModel],
+        query_parameters: t.Optional[FilterSchema],
+    ) -> QuerySet:
+        # Related objects are not read by the aggregation
+        queryset = self.get_queryset().select_related(None).prefetch_related(None)
+        queryset = self.apply_query_parameters(queryset, query_parameters)
+        return self.apply_access_rules(queryset, "read")
+
+    def changes(
+        self,
+        request,
+        path_parameters: t.Optional[BaseModel],
+        query_parameters: t.Optional[FilterSchema],
+    ) -> QuerySet:
+        queryset = self.get_queryset()
+        queryset = self.apply_query_parameters(queryset, query_parameters)
+        return self.apply_access_rules(queryset, "read")
+
+    def events(
+        self,
+        request,
+        path_parameters: t.Optional[BaseModel],
+        query_parameters: t.Optional[FilterSchema],
+    ) -> QuerySet:
+        # Only the identifiers of the changed records are read
+        queryset = self.get_queryset().select_related(None).prefetch_related(None)
+        queryset = self.apply_query_parameters(queryset, query_parameters)
         return self.apply_access_rules(queryset, "read")
 
 
 class RetrieveModelControllerMixin:
 
     retrieve_response_schema: Schema = None
+    retrieve_conditional: bool = True
+    # Serialize the instance with the dump function generated for the response schema (see
+    # `core.api.dump`)
+    retrieve_dump: bool = False
 
     @classmethod
     def add_routes_to(cls, router) -> None:
@@ -316,7 +881,15 @@ class RetrieveModelControllerMixin:
 
     @classmethod
     def _retrieve_function_decorators(cls):
-        return []
+        decorators = []
+        if cls.retrieve_conditional:
+            decorators.append(conditional)
+        if cls.retrieve_dump:
+            decorators.append(dump_response(cls.retrieve_response_schema))
+        expander = cls.get_relation_expander(cls.retrieve_response_schema)
+        if expander:
+            decorators.append(expand(expander))
+        return decorators
 
     @classmethod
     def _annotate_retrieve_view_function(
@@ -336,7 +909,19 @@ class RetrieveModelControllerMixin:
     ) -> Model:
         queryset = self.get_queryset()
         queryset = self.apply_access_rules(queryset, "read")
-        return queryset.get(**(path_parameters.model_dump() if path_parameters else {}))
+        instance = queryset.get(
+            **(path_parameters.model_dump() if path_parameters else {})
+        )
+        if self.retrieve_conditional and not get_request_expand(request):
+            if isinstance(instance, VersionedModelMixin):
+                # the version is the ETag to give in `If-Match` to write the object
+                etag = get_version_etag(self.get_version(instance), get_media_type(request))
+                set_request_etag(request, etag)
+                if etag_matches(request, etag):
+                    raise NotModified(etag)
+            elif self.conditional_changes:
+                self.check_not_modified(*self.get_conditional_markers())
+        return instance
 
 
 class CreateModelControllerMixin:
@@ -426,8 +1011,11 @@ class CreateModelControllerMixin:
                     # there is no exsting relations.
                     field.add(*value)
                     # Set in cache in order to avoid refetching the m2m relation when serializing.
-                    # This can be done since we are in creation mode. m2m cache value is a django queryset.
-                    prefetched_objects[field_name] = value
+                    # This can be done since we are in creation mode. The validated values are
+                    # already evaluated.
+                    prefetched_objects[field_name] = self.get_prefetched_queryset(
+                        instance, field_name, value
+                    )
 
                 setattr(instance, "_prefetched_objects_cache", prefetched_objects)
 
@@ -469,6 +1057,8 @@ class UpdateModelControllerMixin:
 
     @classmethod
     def _update_function_decorators(cls):
+        if cls.is_versioned():
+            return [conditional]  # ETag of the new version
         return []
 
     @classmethod
@@ -496,6 +1086,7 @@ class UpdateModelControllerMixin:
             instance = queryset.get(
                 **(path_parameters.model_dump() if path_parameters else {})
             )
+            self.check_precondition(instance)
 
             # Preprocess data
             validated_data = self.validate_data(request_body, instance=instance)
@@ -508,21 +1099,63 @@ class UpdateModelControllerMixin:
                 if isinstance(field, ManyToManyField) and field.name in validated_data:
                     many_to_many[field.name] = validated_data.pop(field.name)
 
-            # Update instance
-            try:
-                for attr, value in validated_data.items():
-                    setattr(instance, attr, value)
-                instance.save(update_fields=list(validated_data))
-            except DatabaseError as exc:
-                raise ValidationError(
-                    [str(exc)]
-                )  # TODO parse error and respond with violation error define on model constraint
-
-            # Save many-to-many relationships after the instance is created.
+            # Update instance, writing the changed fields only: when nothing changed, the save
+            # and its side effects (signals, ...) are skipped
+            update_fields = self.get_changed_fields(instance, validated_data)
+            if update_fields:
+                try:
+                    for attr in update_fields:
+                        setattr(instance, attr, validated_data[attr])
+                    instance.save(update_fields=update_fields)
+                except VersionConflict:
+                    # modified since it was read by this request
+                    self.precondition_failed()
+                except DatabaseError as exc:
+                    raise ValidationError(
+                        [str(exc)]
+                    )  # TODO parse error and respond with violation error define on model constraint
+
+            # Save many-to-many relationships after the instance is updated, and set them in the
+            # prefetch cache: the validated values are already evaluated.
             if many_to_many:
+                prefetched_objects = getattr(instance, "_prefetched_objects_cache", {})
+                written = False
                 for field_name, value in many_to_many.items():
                     field = getattr(instance, field_name)
-                    field.set(value)
+                    if isinstance(value, QuerySetDelta):
+                        # changes only: delete and insert the through rows, without reading
+                        # and comparing the whole relation
+                        if value.remove:
+                            field.remove(*value.remove)
+                        if value.add:
+                            field.add(*value.add)
+                        written = written or bool(value.remove or value.add)
+                        prefetched_objects.pop(field_name, None)
+                    else:
+                        # as `set`, but knowing whether the relation changed
+                        value = list(value)
+                        current = set(field.values_list("pk", flat=True))
+                        removed = current - {obj.pk for obj in value}
+                        added = [obj for obj in value if obj.pk not in current]
+                        if removed:
+                            field.remove(*removed)
+                        if added:
+                            field.add(*added)
+                        written = written or bool(removed or added)
+                        prefetched_objects[field_name] = self.get_prefetched_queryset(
+                            instance, field_name, value
+                        )
+
+                setattr(instance, "_prefetched_objects_cache", prefetched_objects)
+
+                # the relations are part of the version
+                if written and not update_fields and isinstance(instance, VersionedModelMixin):
+                    self.bump_version(instance)
+
+            if isinstance(instance, VersionedModelMixin):
+                set_request_etag(
+                    request, get_version_etag(self.get_version(instance), get_media_type(request))
+                )
 
             # Postprocess
             self._update_postprocess(request, instance)
@@ -584,8 +1217,21 @@ class DeleteModelControllerMixin:
         )
 
         instance_pk = instance.pk
-        instance.delete()
-        self._delete_postprocess(request, instance_pk)
+        with transaction.atomic():
+            if isinstance(instance, VersionedModelMixin) and request.headers.get("If-Match"):
+                self.check_precondition(instance)
+                # deleted only if not modified since it was read, in a single statement
+                # (`DELETE ... WHERE id = ... AND version = ...`): the foreign keys are checked
+                # at the commit, the cascades and signals are then handled by `delete`
+                deleted = (
+                    type(instance)
+                    ._default_manager.filter(pk=instance_pk, version=instance.version)
+                    ._raw_delete(using=instance._state.db)
+                )
+                if not deleted:
+                    self.precondition_failed()
+            instance.delete()
+            self._delete_postprocess(request, instance_pk)
 
     def _delete_postprocess(self, request: HttpRequest, instance_pk: t.Any):
         """This is part of the atomic process of deletion. Any error here will rollback the delete.
@@ -594,6 +1240,386 @@ class DeleteModelControllerMixin:
         return instance_pk
 
 
+# -------------------------------------------
+# Bulk Model Mixin (CRUD Operations on several objects)
+# -------------------------------------------
+
+
+class BaseBulkModelControllerMixin:
+    """Common options of the bulk operations. Bulk mixins must be placed before the
+    `ModelController` in the bases of a controller, so `/bulk/` is routed before `/{id}/`.
+    """
+
+    bulk_max_batch_size: int = 100
+
+    @classmethod
+    def _annotate_bulk_view_function(
+        cls, view_func: t.Callable[..., t.Any], path: str
+    ) -> t.Callable[..., t.Any]:
+        annotations = t.cast(FunctionType, view_func).__annotations__
+        annotations["path_parameters"] = t.Annotated[
+            cls._get_default_path_schema(path, view_func),
+            Path(default=None, include_in_schema=False),
+        ]
+        return view_func
+
+    def _bulk_get_many_to_many_fields(self) -> t.List[str]:
+        return [
+            field.name
+            for field in self.model._meta.get_fields()
+            if isinstance(field, ManyToManyField)
+        ]
+
+    def _bulk_raise_not_found(self, locations: t.List[t.List[t.Any]]):
+        message = f"No {self.model._meta.verbose_name.lower()} found."
+        raise ValidationError(
+            [{"loc": loc, "msg": message, "type": "not_found"} for loc in locations]
+        )
+
+
+class BulkCreateModelControllerMixin(BaseBulkModelControllerMixin):
+
+    @classmethod
+    def add_routes_to(cls, router) -> None:
+        if cls.model and cls.create_request_schema:
+            decorators = cls._bulk_create_function_decorators()
+
+            cls.method_to_route_function(
+                view_func=cls.bulk_create,
+                path="/bulk/",
+                methods=["POST"],
+                response={201: t.List[cls.create_response_schema]},
+                operation_id=f"{cls.model._meta.verbose_name.lower()}BulkCreate",
+                summary=f"Create {cls.model._meta.verbose_name_plural.capitalize()}",
+                decorators=decorators,
+                view_wrapper=cls._annotate_bulk_create_view_function,
+                tags=[cls.model._meta.verbose_name],
+            )
+
+        super().add_routes_to(router)
+
+    @classmethod
+    def _bulk_create_function_decorators(cls):
+        return []
+
+    @classmethod
+    def _annotate_bulk_create_view_function(
+        cls, view_func: t.Callable[..., t.Any], path: str
+    ) -> t.Callable[..., t.Any]:
+        view_func = cls._annotate_bulk_view_function(view_func, path)
+        annotations = t.cast(FunctionType, view_func).__annotations__
+        annotations["request_body"] = t.Annotated[
+            t.List[cls.create_request_schema],
+            Body(min_length=1, max_length=cls.bulk_max_batch_size),
+        ]
+        return view_func
+
+    def bulk_create(
+        self,
+        request: HttpRequest,
+        path_parameters: t.Optional[BaseModel],
+        request_body: t.List[BaseModel],
+    ) -> t.Tuple[int, t.List[Model]]:
+        """Create all the objects of the batch, or none of them."""
+        many_to_many_fields = self._bulk_get_many_to_many_fields()
+
+        with transaction.atomic():
+            queryset = self.get_queryset()
+
+            # Preprocess data
+            instances = []
+            many_to_many = {fname: [] for fname in many_to_many_fields}
+            for item in request_body:
+                validated_data = self.validate_data(item, instance=None)
+                relations = {
+                    fname: validated_data.pop(fname)
+                    for fname in many_to_many_fields
+                    if fname in validated_data
+                }
+                try:
+                    instance = queryset.model(**validated_data)
+                except TypeError as exc:
+                    raise TypeError(str(exc))
+                instances.append(instance)
+                for fname, value in relations.items():
+                    many_to_many[fname].append((instance, value))
+
+            # Create instances
+            try:
+                queryset.bulk_create(instances)
+            except DatabaseError as exc:
+                raise ValidationError([str(exc)])
+
+            # Access rules check
+            queryset = self.apply_access_rules(queryset, "create")
+            pks = [instance.pk for instance in instances]
+            if queryset.filter(pk__in=pks).count() != len(pks):
+                self.permission_denied(
+                    "Your access rules prevent you to create those objects."
+                )
+
+            # Save many-to-many relationships in bulk
+            try:
+                for fname, relations in many_to_many.items():
+                    if relations:
+                        self.bulk_set_many_to_many(fname, relations, creation=True)
+            except DatabaseError as exc:
+                raise ValidationError([str(exc)])
+
+            self.bulk_invalidate_caches()
+
+            # Postprocess
+            self._bulk_create_postprocess(request, instances)
+
+        return 201, instances
+
+    def _bulk_create_postprocess(self, request: HttpRequest, instances: t.List[Model]):
+        """This is part of the atomic process of creation. Any error here will rollback the
+        whole batch. Override this method to add additional atomic operation.
+        """
+        return instances
+
+
+class BulkUpdateModelControllerMixin(BaseBulkModelControllerMixin):
+
+    @classmethod
+    def add_routes_to(cls, router) -> None:
+        if cls.model and cls.update_request_schema:
+            decorators = cls._bulk_update_function_decorators()
+
+            cls.method_to_route_function(
+                view_func=cls.bulk_update,
+                path="/bulk/",
+                methods=["PATCH"],
+                response=t.List[cls.update_response_schema],
+                operation_id=f"{cls.model._meta.verbose_name.lower()}BulkUpdate",
+                summary=f"Update {cls.model._meta.verbose_name_plural.capitalize()}",
+                decorators=decorators,
+                view_wrapper=cls._annotate_bulk_update_view_function,
+                tags=[cls.model._meta.verbose_name],
+            )
+
+        super().add_routes_to(router)
+
+    @classmethod
+    def _bulk_update_function_decorators(cls):
+        return []
+
+    @classmethod
+    def _annotate_bulk_update_view_function(
+        cls, view_func: t.Callable[..., t.Any], path: str
+    ) -> t.Callable[..., t.Any]:
+        view_func = cls._annotate_bulk_view_function(view_func, path)
+        item_schema = pydantic.create_model(
+            f"{cls.update_request_schema.__name__}BulkItem",
+            __base__=cls.update_request_schema,
+            id=(cls._get_pk_type(), ...),
+        )
+        annotations = t.cast(FunctionType, view_func).__annotations__
+        annotations["request_body"] = t.Annotated[
+            t.List[item_schema],
+            Body(min_length=1, max_length=cls.bulk_max_batch_size),
+        ]
+        return view_func
+
+    def bulk_update(
+        self,
+        request: HttpRequest,
+        path_parameters: t.Optional[BaseModel],
+        request_body: t.List[BaseModel],
+    ) -> t.List[Model]:
+        """Update all the objects of the batch (each item gives its `id`), or none of them."""
+        many_to_many_fields = self._bulk_get_many_to_many_fields()
+        pk_field = self.model._meta.pk
+
+        with transaction.atomic():
+            ids = [pk_field.to_python(item.id) for item in request_body]
+            duplicates = [index for index, pk in enumerate(ids) if pk in ids[:index]]
+            if duplicates:
+                raise ValidationError(
+                    [
+                        {
+                            "loc": ["body", "request_body", index, "id"],
+                            "msg": "Object given several times.",
+                            "type": "duplicate",
+                        }
+                        for index in duplicates
+                    ]
+                )
+
+            # Single access rules check, locking the rows to update
+            queryset = self.get_queryset()
+            queryset = self.apply_access_rules(queryset, "update")
+            instances = {
+                instance.pk: instance
+                for instance in queryset.select_for_update(of=("self",)).filter(
+                    pk__in=ids
+                )
+            }
+            missings = [index for index, pk in enumerate(ids) if pk not in instances]
+            if missings:
+                self._bulk_raise_not_found(
+                    [["body", "request_body", index, "id"] for index in missings]
+                )
+
+            # Preprocess data
+            update_fields = set()
+            changed_instances = []
+            many_to_many = {fname: [] for fname in many_to_many_fields}
+            for pk, item in zip(ids, request_body):
+                instance = instances[pk]
+                validated_data = self.validate_data(item, instance=instance)
+                validated_data.pop("id", None)
+                for fname in many_to_many_fields:
+                    if fname in validated_data:
+                        many_to_many[fname].append((instance, validated_data.pop(fname)))
+                # unchanged values are not written
+                changed_fields = self.get_changed_fields(instance, validated_data)
+                for attr in changed_fields:
+                    setattr(instance, attr, validated_data[attr])
+                if changed_fields:
+                    changed_instances.append(instance)
+                    update_fields.update(changed_fields)
+
+            # Update instances
+            try:
+                if changed_instances:
+                    self.model._default_manager.bulk_update(
+                        changed_instances, fields=sorted(update_fields)
+                    )
+                for fname, relations in many_to_many.items():
+                    if relations:
+                        self.bulk_set_many_to_many(fname, relations)
+                if self.is_versioned():
+                    self._bulk_bump_versions(many_to_many, changed_instances)
+            except DatabaseError as exc:
+                raise ValidationError([str(exc)])
+
+            self.bulk_invalidate_caches()
+
+            # Postprocess
+            results = [instances[pk] for pk in ids]
+            self._bulk_update_postprocess(request, results)
+
+        return results
+
+    def _bulk_bump_versions(
+        self,
+        many_to_many: t.Dict[str, t.List[t.Tuple[Model, t.Any]]],
+        changed_instances: t.List[Model],
+    ) -> None:
+        """Increment the version of the instances whose many-to-many relations only were
+        given (the bulk update of the others already did).
+        """
+        instances = {
+            instance.pk: instance
+            for relations in many_to_many.values()
+            for instance, dummy in relations
+        }
+        for instance in changed_instances:
+            instances.pop(instance.pk, None)
+        if instances:
+            self.model._default_manager.filter(pk__in=list(instances)).update(
+                version=F("version") + 1
+            )
+            for instance in instances.values():
+                instance.version += 1
+
+    def _bulk_update_postprocess(self, request: HttpRequest, instances: t.List[Model]):
+        """This is part of the atomic process of update. Any error here will rollback the
+        whole batch. Override this method to add additional atomic operation.
+        """
+        return instances
+
+
+class BulkDeleteModelControllerMixin(BaseBulkModelControllerMixin):
+
+    @classmethod
+    def add_routes_to(cls, router) -> None:
+        if cls.model:
+            decorators = cls._bulk_delete_function_decorators()
+
+            cls.method_to_route_function(
+                view_func=cls.bulk_delete,
+                path="/bulk/",
+                methods=["DELETE"],
+                response=t.List[cls._get_pk_type()],
+                operation_id=f"{cls.model._meta.verbose_name.lower()}BulkDelete",
+                summary=f"Delete {cls.model._meta.verbose_name_plural.capitalize()}",
+                decorators=decorators,
+                view_wrapper=cls._annotate_bulk_delete_view_function,
+                tags=[cls.model._meta.verbose_name],
+            )
+
+        super().add_routes_to(router)
+
+    @classmethod
+    def _bulk_delete_function_decorators(cls):
+        return []
+
+    @classmethod
+    def _annotate_bulk_delete_view_function(
+        cls, view_func: t.Callable[..., t.Any], path: str
+    ) -> t.Callable[..., t.Any]:
+        view_func = cls._annotate_bulk_view_function(view_func, path)
+        query_schema = pydantic.create_model(
+            "BulkDeleteParameters",
+            __base__=Schema,
+            id=(
+                pydantic.conlist(
+                    cls._get_pk_type(), min_length=1, max_length=cls.bulk_max_batch_size
+                ),
+                pydantic.Field(..., description="Identifiers of the objects to delete."),
+            ),
+        )
+        annotations = t.cast(FunctionType, view_func).__annotations__
+        annotations["query_parameters"] = t.Annotated[query_schema, Query()]
+        return view_func
+
+    def bulk_delete(
+        self,
+        request: HttpRequest,
+        path_parameters: t.Optional[BaseModel],
+        query_parameters: BaseModel,
+    ) -> t.List[t.Any]:
+        """Delete all the given objects, or none of them. Return the deleted identifiers."""
+        pk_field = self.model._meta.pk
+
+        with transaction.atomic():
+            ids = [pk_field.to_python(pk) for pk in query_parameters.id]
+
+            # Single access rules check
+            queryset = self.get_queryset()
+            queryset = self.apply_access_rules(queryset, "delete")
+            found = set(queryset.filter(pk__in=ids).values_list("pk", flat=True))
+            missings = [index for index, pk in enumerate(ids) if pk not in found]
+            if missings:
+                self._bulk_raise_not_found(
+                    [["query", "query_parameters", "id", index] for index in missings]
+                )
+
+            ids = list(dict.fromkeys(ids))
+            self.model._default_manager.filter(pk__in=ids).delete()
+            self.bulk_invalidate_caches()
+            self._bulk_delete_postprocess(request, ids)
+
+        return ids
+
+    def _bulk_delete_postprocess(self, request: HttpRequest, instance_pks: t.List[t.Any]):
+        """This is part of the atomic process of deletion. Any error here will rollback the
+        whole batch. Override this method to add additional atomic operation.
+        """
+        return instance_pks
+
+
+class BulkModelControllerMixin(
+    BulkCreateModelControllerMixin,
+    BulkUpdateModelControllerMixin,
+    BulkDeleteModelControllerMixin,
+):
+    pass
+
+
 class ModelController(
     ListModelControllerMixin,
     RetrieveModelControllerMixin,
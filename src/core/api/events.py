@@ -0,0 +1,169 @@
+"""
+Server-Sent Events streams of list endpoints (`/events/`), notifying clients of the changes of
+the records they can read, instead of polling.
+
+The stream gives the following events (`data` is a JSON object):
+- `ready`: changes are notified from now on, the client synchronizes (changes feed, see
+  `core.api.changes`, or full list);
+- `changes`: `{"changed": [...], "deleted": [...]}`, identifiers of the records created or
+  modified (readable by the client only), and of the records deleted or no longer readable
+  (among the ones the client could read: readable when the stream started, or notified
+  since);
+- `reset`: some changes may have been lost, the client synchronizes again.
+Comments are sent on idle streams, to keep the connection open. Each stream keeps the
+identifiers of the records readable by its client (read when it starts).
+
+The changes are received from Postgres notifications (see `core.events`), by a single
+connection per process. Streams need the ASGI server: with WSGI, each of them would hold a
+worker thread.
+"""
+import json
+import typing as t
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Model, QuerySet
+from django.http import HttpRequest, StreamingHttpResponse
+from ninja.errors import HttpError
+from ninja.utils import is_async_callable
+from pydantic_core import to_jsonable_python
+
+from core.changes import track_changes
+from core.events import RESET, ChangeEvent, get_listener
+
+__all__ = [
+    "EVENTS_CONTENT_TYPE",
+    "events",
+    "get_events_openapi_extra",
+]
+
+
+EVENTS_CONTENT_TYPE = "text/event-stream"
+
+
+def events(model: t.Type[Model]) -> t.Callable:
+    """
+    Stream the changes of the records of the queryset returned by the view, as Server-Sent
+    Events. The changes of the model are tracked from now on.
+
+    @api.get(..., response=NOT_SET)
+    @events(MyModel)
+    def my_view(request):
+        return MyModel.objects.all()
+    """
+    track_changes(model)
+
+    def _response(request: HttpRequest, queryset: QuerySet) -> StreamingHttpResponse:
+        if not isinstance(request, ASGIRequest):
+            raise HttpError(501, "Event streams are only available with the ASGI server.")
+        response = StreamingHttpResponse(
+            stream_events(model, queryset), content_type=EVENTS_CONTENT_TYPE
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # no buffering by nginx
+        return response
+
+    def decorator(func: t.Callable) -> t.Callable:
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_events(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                queryset = await func(request, **kwargs)
+                return _response(request, queryset)
+
+        else:
+
+            @wraps(func)
+            def view_with_events(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                queryset = func(request, **kwargs)
+                return _response(request, queryset)
+
+        return view_with_events
+
+    return decorator
+
+
+async def stream_events(
+    model: t.Type[Model], queryset: QuerySet, keepalive: t.Optional[float] = None
+) -> t.AsyncIterator[str]:
+    """Server-Sent Events of the changes of the records of the queryset."""
+    if keepalive is None:
+        keepalive = getattr(settings, "API_EVENTS_KEEPALIVE", 15)
+    subscription = get_listener().subscribe(model)
+    try:
+        await subscription.wait_listening()
+        # records the client can know, the only ones reported as deleted
+        readable = set(
+            await sync_to_async(list)(queryset.values_list("pk", flat=True))
+        )
+        yield _format_event("ready", {})
+        while True:
+            items = await subscription.get(timeout=keepalive)
+            if not items:
+                yield ": keep-alive\n\n"
+            elif RESET in items:
+                yield _format_event("reset", {})
+            else:
+                data = await _get_changes(model, queryset, items, readable)
+                if data["changed"] or data["deleted"]:
+                    yield _format_event("changes", data)
+    finally:
+        subscription.close()
+
+
+async def _get_changes(
+    model: t.Type[Model],
+    queryset: QuerySet,
+    items: t.List[ChangeEvent],
+    readable: t.Set[t.Any],
+) -> t.Dict[str, t.List[t.Any]]:
+    """Changes of the records for the client, updating the identifiers of the records it can
+    read: the changed records no longer readable are reported as deleted, the deletions of the
+    records it could not read are not reported.
+    """
+    # last state of each record
+    states = {}
+    for item in items:
+        for pk in item.pks:
+            states.pop(pk, None)
+            states[pk] = item.deleted
+
+    to_python = model._meta.pk.to_python
+    states = {to_python(pk): deleted for pk, deleted in states.items()}
+    changed = [pk for pk, deleted in states.items() if not deleted]
+    still_readable = set()
+    if changed:
+        still_readable = set(
+            await sync_to_async(list)(
+                queryset.filter(pk__in=changed).values_list("pk", flat=True)
+            )
+        )
+
+    data = {"changed": [], "deleted": []}
+    for pk, deleted in states.items():
+        if not deleted and pk in still_readable:
+            readable.add(pk)
+            data["changed"].append(pk)
+        elif pk in readable:
+            readable.discard(pk)
+            data["deleted"].append(pk)
+    return data
+
+
+def _format_event(name: str, data: t.Any) -> str:
+    return f"event: {name}\ndata: {json.dumps(to_jsonable_python(data))}\n\n"
+
+
+def get_events_openapi_extra() -> t.Dict[str, t.Any]:
+    """Document the stream of an events operation."""
+    return {
+        "responses": {
+            200: {
+                "description": "Server-Sent Events: `ready`, `changes` (identifiers of the "
+                "`changed` and `deleted` records) and `reset`.",
+                "content": {EVENTS_CONTENT_TYPE: {"schema": {"type": "string"}}},
+            }
+        }
+    }
@@ -0,0 +1,257 @@
+"""
+Expansion of relations on demand (`?expand=roles,page`).
+
+Relation fields of response schemas (`core.schemas.relations.ForeignKey` and `QuerySetField`)
+are serialized as their lookup value (primary key). The expandable ones are declared with the
+nested schema to serialize them with when their name is given in the `expand` query parameter.
+
+The related objects of the expanded relations are loaded in bulk for the whole response: one
+query per relation (nested relations of the expanded schemas included), never one per row.
+Model instances are completed with `prefetch_related_objects`, and `values()` rows are
+serialized with the serializer of the expanded schema (see `core.api.values`), which groups
+multiple relations by parent.
+"""
+import typing as t
+from copy import copy
+from functools import lru_cache, wraps
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Model, prefetch_related_objects
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+from ninja import Query, Schema
+from ninja.utils import contribute_operation_args, is_async_callable
+from pydantic import BaseModel, Field, TypeAdapter, create_model, field_validator
+
+from core.schemas.relations import QuerySetField, get_relation_type
+
+from .related import build_related_plan
+from .renderers import serialized_response
+from .values import get_values_serializer, render_values
+
+__all__ = [
+    "RelationExpander",
+    "expand",
+    "get_relation_expander",
+    "get_request_expand",
+]
+
+
+EXPAND_REQUEST_ATTR = "_expand"
+
+
+def get_request_expand(request: HttpRequest) -> t.FrozenSet[str]:
+    """Relations to expand in the response of the current request."""
+    return getattr(request, EXPAND_REQUEST_ATTR, frozenset())
+
+
+class RelationExpander:
+    """Give the variants of a response schema with some of its relations expanded, and load
+    the related objects they need.
+    """
+
+    def __init__(
+        self,
+        model: t.Type[Model],
+        schema: t.Type[BaseModel],
+        expandable_fields: t.Dict[str, t.Type[BaseModel]],
+    ):
+        self.model = model
+        self.schema = schema
+        self.expandable_fields = {}
+        for fname, nested_schema in expandable_fields.items():
+            field_info = schema.model_fields.get(fname)
+            if field_info is None:
+                continue  # not part of this response
+            if get_relation_type(field_info.annotation) is None:
+                raise ImproperlyConfigured(
+                    f"{schema.__name__}.{fname} must be a relation field to be expandable."
+                )
+            self.expandable_fields[fname] = nested_schema
+
+        self.Input = self.create_input()
+        self._schemas: t.Dict[t.FrozenSet[str], t.Type[BaseModel]] = {}
+
+    def create_input(self) -> t.Type[Schema]:
+        expandable_fields = list(self.expandable_fields)
+        choices = ", ".join(f"`{fname}`" for fname in expandable_fields)
+
+        class ExpandInput(Schema):
+            expand: t.Optional[str] = Field(
+                None,
+                description="Comma separated relations to give as objects instead of "
+                f"identifiers. Possible values are {choices}",
+            )
+
+            @field_validator("expand")
+            @classmethod
+            def check_expand(cls, value):
+                unknown = set(_split(value)) - set(expandable_fields)
+                if unknown:
+                    raise ValueError(
+                        f"Relations can not be expanded: {', '.join(sorted(unknown))}."
+                    )
+                return value
+
+        return ExpandInput
+
+    def parse(self, value: t.Optional[str]) -> t.FrozenSet[str]:
+        return frozenset(_split(value))
+
+    def get_schema(self, expand: t.FrozenSet[str]) -> t.Type[BaseModel]:
+        """Variant of the response schema with the given relations as nested schemas."""
+        if not expand:
+            return self.schema
+        if expand not in self._schemas:
+            fields = {}
+            for fname in sorted(expand):
+                field_info = self.schema.model_fields[fname]
+                fields[fname] = (
+                    _expand_annotation(
+                        field_info.annotation, self.expandable_fields[fname]
+                    ),
+                    copy(field_info),
+                )
+            self._schemas[expand] = create_model(
+                f"{self.schema.__name__}Expanded",
+                __base__=self.schema,
+                __module__=self.schema.__module__,
+                **fields,
+            )
+        return self._schemas[expand]
+
+    def get_lookups(self, expand: t.FrozenSet[str]) -> t.List[str]:
+        """Relation paths to load for the given expanded relations."""
+        lookups = []
+        for fname in sorted(expand):
+            related_model = self.model._meta.get_field(fname).related_model
+            plan = build_related_plan(related_model, self.expandable_fields[fname])
+            lookups.append(fname)
+            lookups.extend(
+                f"{fname}__{path}"
+                for path in (*plan.select_related, *plan.prefetch_related)
+            )
+        return lookups
+
+    def load(self, instances: t.List[Model], expand: t.FrozenSet[str]) -> None:
+        """Load the expanded relations of all the instances at once. Relations already
+        loaded (`select_related`, `prefetch_related` of the queryset) are not queried again.
+        """
+        lookups = self.get_lookups(expand)
+        if instances and lookups:
+            prefetch_related_objects(instances, *lookups)
+
+    def render(
+        self,
+        request: HttpRequest,
+        result: t.Any,
+        expand: t.FrozenSet[str],
+        items_attribute: str = "results",
+    ) -> HttpResponse:
+        """Render the instance, the instances or the page of instances returned by a view."""
+        schema = self.get_schema(expand)
+        if isinstance(result, Model):
+            self.load([result], expand)
+            return serialized_response(request, schema.model_validate(result))
+        adapter = _get_list_adapter(schema)
+        if isinstance(result, dict):
+            items = list(result[items_attribute])
+            self.load(items, expand)
+            return serialized_response(
+                request, {**result, items_attribute: adapter.validate_python(items)}
+            )
+        items = list(result)
+        self.load(items, expand)
+        return serialized_response(
+            request, adapter.validate_python(items), adapter=adapter
+        )
+
+
+@lru_cache(maxsize=None)
+def get_relation_expander(
+    model: t.Type[Model],
+    schema: t.Type[BaseModel],
+    expandable_fields: t.Tuple[t.Tuple[str, t.Type[BaseModel]], ...],
+) -> RelationExpander:
+    return RelationExpander(model, schema, dict(expandable_fields))
+
+
+def expand(
+    expander: RelationExpander, items_attribute: str = "results", values: bool = False
+) -> t.Callable:
+    """
+    Serialize the response with the relations given in the `expand` query parameter as
+    nested schemas. With `values`, the view returns `values()` rows (as is, or paginated),
+    projected with `get_request_expand` (see `core.api.values`).
+
+    @api.get(...
+    @expand(get_relation_expander(MyModel, MySchema, (("page", PageSchema),)))
+    def my_view(request):
+    """
+
+    def decorator(func: t.Callable) -> t.Callable:
+        def _prepare(request, kwargs):
+            expand_input = kwargs.pop("ninja_expand")
+            fields = expander.parse(expand_input.expand)
+            setattr(request, EXPAND_REQUEST_ATTR, fields)
+            return fields
+
+        def _response(request, result, fields):
+            if isinstance(result, HttpResponseBase):
+                return result
+            if values:
+                serializer = get_values_serializer(
+                    expander.model, expander.get_schema(fields)
+                )
+                return render_values(request, serializer, result, items_attribute)
+            if not fields:
+                return result  # serialized by ninja
+            return expander.render(request, result, fields, items_attribute)
+
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_expand(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                fields = _prepare(request, kwargs)
+                return _response(request, await func(request, **kwargs), fields)
+
+        else:
+
+            @wraps(func)
+            def view_with_expand(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                fields = _prepare(request, kwargs)
+                return _response(request, func(request, **kwargs), fields)
+
+        contribute_operation_args(view_with_expand, "ninja_expand", expander.Input, Query(...))
+        return view_with_expand
+
+    return decorator
+
+
+@lru_cache(maxsize=None)
+def _get_list_adapter(schema: t.Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(t.List[schema])
+
+
+def _split(value: t.Optional[str]) -> t.List[str]:
+    if not value:
+        return []
+    return [fname.strip() for fname in value.split(",") if fname.strip()]
+
+
+def _expand_annotation(annotation: t.Any, nested_schema: t.Type[BaseModel]) -> t.Any:
+    """Replace the relation type of the annotation by the nested schema (or a list of it)."""
+    if isinstance(annotation, type) and issubclass(annotation, QuerySetField):
+        return t.List[nested_schema]
+    if get_relation_type(annotation) is annotation:
+        return nested_schema
+    args = t.get_args(annotation)
+    if not args:
+        return annotation
+    origin = t.get_origin(annotation)
+    if origin is t.Annotated:
+        return t.Annotated[(_expand_annotation(args[0], nested_schema), *args[1:])]
+    args = tuple(_expand_annotation(arg, nested_schema) for arg in args)
+    if origin is t.Union:
+        return t.Union[args]
+    return origin[args]
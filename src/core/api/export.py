@@ -0,0 +1,212 @@
+"""
+Streaming exports of querysets, as NDJSON (one JSON object per line) or CSV.
+
+Records are read with a server-side cursor (`QuerySet.iterator`) and serialized chunk by
+chunk, so the memory used does not depend on the number of exported rows. With the ASGI
+server, the content is given as an asynchronous iterator reading one chunk at a time in the
+thread of the request (Django reads a synchronous iterator entirely before sending it).
+"""
+import csv
+import json
+import typing as t
+from functools import wraps
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import QuerySet
+from django.http import HttpRequest, StreamingHttpResponse
+from ninja import Query, Schema
+from ninja.utils import contribute_operation_args, is_async_callable
+from pydantic import BaseModel, Field
+
+from .values import ValuesSerializer
+
+__all__ = [
+    "EXPORT_FORMATS",
+    "export",
+    "get_export_openapi_extra",
+    "iter_records",
+    "stream_export",
+]
+
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class ExportInput(Schema):
+    format: t.Literal["ndjson", "csv"] = Field(
+        "ndjson", description="Format of the export: NDJSON (one object per line) or CSV."
+    )
+
+
+def export(
+    schema: t.Type[BaseModel],
+    filename: str,
+    chunk_size: int = 2000,
+    values_serializer: t.Optional[ValuesSerializer] = None,
+) -> t.Callable:
+    """
+    Stream the queryset returned by the view, in the format given by the `format` query
+    parameter. Must be the outermost decorator, as the others (ordering, ...) work on the
+    queryset.
+
+    @api.get(...
+    @export(MySchema, "my-models")
+    @ordering
+    def my_view(request):
+        return MyModel.objects.all()
+    """
+    fields = list(schema.model_fields)
+
+    def decorator(func: t.Callable) -> t.Callable:
+        def _response(request, queryset, export_input):
+            records = iter_records(queryset, schema, chunk_size, values_serializer)
+            return stream_export(
+                records,
+                export_input.format,
+                fields,
+                filename,
+                chunk_size=chunk_size,
+                asynchronous=isinstance(request, ASGIRequest),
+            )
+
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_export(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                export_input = kwargs.pop("ninja_export")
+                queryset = await func(request, **kwargs)
+                return _response(request, queryset, export_input)
+
+        else:
+
+            @wraps(func)
+            def view_with_export(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                export_input = kwargs.pop("ninja_export")
+                queryset = func(request, **kwargs)
+                return _response(request, queryset, export_input)
+
+        contribute_operation_args(view_with_export, "ninja_export", ExportInput, Query(...))
+        return view_with_export
+
+    return decorator
+
+
+def get_export_openapi_extra(schema: t.Type[BaseModel]) -> t.Dict[str, t.Any]:
+    """Document the streamed media types of an export operation."""
+    return {
+        "responses": {
+            200: {
+                "description": "Exported records",
+                "content": {
+                    EXPORT_FORMATS["ndjson"]: {
+                        "schema": {
+                            "type": "string",
+                            "description": f"One {schema.__name__} JSON object per line.",
+                        }
+                    },
+                    EXPORT_FORMATS["csv"]: {"schema": {"type": "string"}},
+                },
+            }
+        }
+    }
+
+
+def iter_records(
+    queryset: QuerySet,
+    schema: t.Type[BaseModel],
+    chunk_size: int = 2000,
+    values_serializer: t.Optional[ValuesSerializer] = None,
+) -> t.Iterator[BaseModel]:
+    """Yield the records of the queryset validated with the schema. When a values serializer
+    is given, rows are read with `values()` and validated by chunk (see `core.api.values`).
+    Prefetched relations are loaded for each chunk.
+    """
+    if values_serializer is None:
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            yield schema.model_validate(instance)
+        return
+
+    rows = values_serializer.values(queryset).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from values_serializer.validate(chunk)
+
+
+def stream_export(
+    records: t.Iterable[BaseModel],
+    export_format: str,
+    fields: t.List[str],
+    filename: str,
+    chunk_size: int = 2000,
+    asynchronous: bool = False,
+) -> StreamingHttpResponse:
+    if export_format == "csv":
+        content = _iter_csv(records, fields)
+    else:
+        content = _iter_ndjson(records)
+    if asynchronous:
+        content = _aiter_chunks(content, chunk_size)
+
+    response = StreamingHttpResponse(
+        content, content_type=f"{EXPORT_FORMATS[export_format]}; charset=utf-8"
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
+
+
+async def _aiter_chunks(lines, chunk_size):
+    """Lines joined by chunk, each read in the thread of the request (where the cursor of
+    the queryset is opened).
+    """
+    lines = iter(lines)
+    read_chunk = sync_to_async(lambda: "".join(islice(lines, chunk_size)))
+    try:
+        while True:
+            chunk = await read_chunk()
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        # the cursor is closed in its thread, also when the client disconnects
+        if hasattr(lines, "close"):
+            await sync_to_async(lines.close)()
+
+
+def _iter_ndjson(records):
+    for record in records:
+        yield record.model_dump_json() + "\n"
+
+
+class _Echo:
+    """Pseudo buffer returning what is written, for `csv.writer` to produce lines."""
+
+    def write(self, value):
+        return value
+
+
+def _iter_csv(records, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for record in records:
+        data = record.model_dump(mode="json")
+        yield writer.writerow([_csv_value(data.get(fname)) for fname in fields])
+
+
+def _csv_value(value):
+    """Nested objects and lists are written as JSON in their cell."""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
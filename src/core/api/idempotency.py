@@ -0,0 +1,314 @@
+"""
+Idempotent writes with the `Idempotency-Key` request header.
+
+Clients retrying a write (e.g. after a network failure) give the same unique key to each
+attempt. The first attempt is processed, and its response is stored for `API_IDEMPOTENCY_TTL`
+seconds: the retries get it back (with an `Idempotent-Replayed: true` header) instead of
+processing the write again. A retry arriving while the first attempt is still processed
+waits for it (up to `API_IDEMPOTENCY_TIMEOUT` seconds, then `409`).
+
+The entry of an attempt being processed is kept until its response is stored, for at most
+`API_IDEMPOTENCY_LEASE` seconds (much longer than any request): after it, its request is
+considered as dead, and the next retry takes the entry over, then processes the write.
+
+Keys are unique per caller and per view: reusing a key for another request (other path or
+body) gives a `422`. Server errors are not stored, the write can be retried with the same key.
+Requests without the header are processed as usual.
+
+Entries are stored in the database (`core.models.IdempotencyKey`), shared by all the
+processes of the application: the first attempt inserts the entry of its key, the retries
+find it. Expired entries are removed by the `clear_idempotency_keys` command (to run
+periodically).
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from datetime import timedelta
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+from django.utils import timezone
+from ninja.utils import contribute_operation_callback, is_async_callable
+
+from core.models import IdempotencyKey
+
+__all__ = [
+    "IDEMPOTENCY_KEY_HEADER",
+    "IdempotentResponse",
+    "idempotent",
+]
+
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+ENTRY_KEY_PREFIX = "api_idempotency"
+PENDING_ENTRY_REQUEST_ATTR = "_idempotency_entry"
+
+# Delay between two checks of a pending entry, in seconds
+POLL_INTERVAL = 0.05
+
+
+class IdempotentResponse(Exception):
+    """Raised by the decorator for retries, to bypass the other decorators of the view and the
+    serialization.
+    """
+
+    def __init__(self, response: HttpResponse):
+        super().__init__()
+        self.response = response
+
+
+def get_ttl() -> int:
+    return getattr(settings, "API_IDEMPOTENCY_TTL", 24 * 60 * 60)
+
+
+def get_timeout() -> float:
+    return getattr(settings, "API_IDEMPOTENCY_TIMEOUT", 30)
+
+
+def get_lease() -> int:
+    return getattr(settings, "API_IDEMPOTENCY_LEASE", 60 * 60)
+
+
+def _error(message: str, status: int) -> HttpResponse:
+    return HttpResponse(
+        json.dumps({"message": message}),
+        status=status,
+        content_type="application/json; charset=utf-8",
+    )
+
+
+def _get_entry_key(name: str, idempotency_key: str, fingerprint: Optional[str]) -> str:
+    digest = hashlib.sha256()
+    digest.update((fingerprint or "").encode("utf-8"))
+    digest.update(b"\x1e")
+    digest.update(idempotency_key.encode("utf-8"))
+    return f"{ENTRY_KEY_PREFIX}:{name}:{digest.hexdigest()}"
+
+
+def _get_request_hash(request: HttpRequest) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.get_full_path()}".encode("utf-8"))
+    digest.update(b"\x1e")
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+class _Attempt:
+    """Pending entry of the request processing the write, released with its response."""
+
+    def __init__(self, key: str, request_hash: str):
+        self.key = key
+        self.request_hash = request_hash
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        now = timezone.now()
+        expire_date = now + timedelta(seconds=get_lease())
+        entries = IdempotencyKey.objects.filter(key=self.key, expire_date__lte=now)
+        entries.filter(pending=None).delete()
+        # the lease of the pending attempt expired (its request died): taken over, its token
+        # is replaced so it cannot release the entry anymore
+        if entries.exclude(pending=None).update(
+            request_hash=self.request_hash, pending=self.token, expire_date=expire_date
+        ):
+            return True
+        try:
+            # in a savepoint, the request may be in a transaction
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    key=self.key,
+                    request_hash=self.request_hash,
+                    pending=self.token,
+                    expire_date=expire_date,
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def release(self, response: Optional[HttpResponseBase]) -> None:
+        # nothing done if the lease expired and the entry was taken over by another attempt
+        entries = IdempotencyKey.objects.filter(key=self.key, pending=self.token)
+        if response is None or response.status_code >= 500 or response.streaming:
+            entries.delete()
+            return
+        headers = [
+            (name, value)
+            for name, value in response.items()
+            if name.lower() not in ("set-cookie", "vary")
+        ]
+        entries.update(
+            pending=None,
+            status_code=response.status_code,
+            headers=headers,
+            content=response.content,
+            expire_date=timezone.now() + timedelta(seconds=get_ttl()),
+        )
+
+
+def _check_entry(attempt: _Attempt) -> Optional[bool]:
+    """Replay the response stored for the key of the attempt. Return `True` if the attempt
+    got the key, `False` if another request is processing it, `None` if the key was released
+    in between (to check again).
+    """
+    if attempt.acquire():
+        return True
+    entry = IdempotencyKey.objects.alive().filter(key=attempt.key).first()
+    if entry is None:
+        return None
+    if entry.request_hash != attempt.request_hash:
+        raise IdempotentResponse(
+            _error(
+                "The idempotency key was already used for another request.", status=422
+            )
+        )
+    if entry.pending is None:
+        response = HttpResponse(bytes(entry.content), status=entry.status_code)
+        for name, value in entry.headers:
+            response[name] = value
+        response["Idempotent-Replayed"] = "true"
+        raise IdempotentResponse(response)
+    return False
+
+
+def _get_attempt(request, name, fingerprint) -> Optional[_Attempt]:
+    idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if not idempotency_key:
+        return None
+    if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise IdempotentResponse(
+            _error(
+                f"The idempotency key must have at most {IDEMPOTENCY_KEY_MAX_LENGTH} "
+                "characters.",
+                status=400,
+            )
+        )
+    key = _get_entry_key(name, idempotency_key, fingerprint(request) if fingerprint else None)
+    return _Attempt(key, _get_request_hash(request))
+
+
+def _conflict() -> IdempotentResponse:
+    return IdempotentResponse(
+        _error(
+            "A request with the same idempotency key is still being processed.",
+            status=409,
+        )
+    )
+
+
+# ----------------------------------------------------
+# Decorator
+# ----------------------------------------------------
+
+
+def idempotent(
+    name: str, fingerprint: Optional[Callable[[HttpRequest], str]] = None
+) -> Callable:
+    """
+    Process once the requests of the decorated view having the same `Idempotency-Key` header.
+    Must be the innermost decorator, so permissions are checked before replaying a response.
+
+    @api.post(...
+    @idempotent("my_view")
+    def my_view(request):
+
+    :param name: unique name of the view, used in entry keys
+    :param fingerprint: function returning a string identifying the caller
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_idempotency(request: HttpRequest, **kwargs: Any) -> Any:
+                attempt = _get_attempt(request, name, fingerprint)
+                if attempt is not None:
+                    deadline = time.monotonic() + get_timeout()
+                    while not await sync_to_async(_check_entry)(attempt):
+                        if time.monotonic() > deadline:
+                            raise _conflict()
+                        await asyncio.sleep(POLL_INTERVAL)
+                    setattr(request, PENDING_ENTRY_REQUEST_ATTR, attempt)
+                return await func(request, **kwargs)
+
+        else:
+
+            @wraps(func)
+            def view_with_idempotency(request: HttpRequest, **kwargs: Any) -> Any:
+                attempt = _get_attempt(request, name, fingerprint)
+                if attempt is not None:
+                    deadline = time.monotonic() + get_timeout()
+                    while not _check_entry(attempt):
+                        if time.monotonic() > deadline:
+                            raise _conflict()
+                        time.sleep(POLL_INTERVAL)
+                    setattr(request, PENDING_ENTRY_REQUEST_ATTR, attempt)
+                return func(request, **kwargs)
+
+        contribute_operation_callback(view_with_idempotency, _make_operation_idempotent)
+        return view_with_idempotency
+
+    return decorator
+
+
+def _make_operation_idempotent(operation: Any) -> None:
+    """Give the retries their response, and store the rendered response of first attempts."""
+    view_func = operation.view_func
+    run = operation.run
+
+    if is_async_callable(view_func):
+
+        @wraps(view_func)
+        async def view_func_idempotent(request: HttpRequest, **kwargs: Any) -> Any:
+            try:
+                return await view_func(request, **kwargs)
+            except IdempotentResponse as retry:
+                return retry.response
+
+    else:
+
+        @wraps(view_func)
+        def view_func_idempotent(request: HttpRequest, **kwargs: Any) -> Any:
+            try:
+                return view_func(request, **kwargs)
+            except IdempotentResponse as retry:
+                return retry.response
+
+    if is_async_callable(run):
+
+        @wraps(run)
+        async def run_idempotent(request: HttpRequest, **kw: Any) -> HttpResponseBase:
+            response = None
+            try:
+                response = await run(request, **kw)
+                return response
+            finally:
+                await sync_to_async(_release)(request, response)
+
+    else:
+
+        @wraps(run)
+        def run_idempotent(request: HttpRequest, **kw: Any) -> HttpResponseBase:
+            response = None
+            try:
+                response = run(request, **kw)
+                return response
+            finally:
+                _release(request, response)
+
+    operation.view_func = view_func_idempotent
+    operation.run = run_idempotent
+
+
+def _release(request: HttpRequest, response: Optional[HttpResponseBase]) -> None:
+    attempt = getattr(request, PENDING_ENTRY_REQUEST_ATTR, None)
+    if attempt is not None:
+        delattr(request, PENDING_ENTRY_REQUEST_ATTR)
+        attempt.release(response)
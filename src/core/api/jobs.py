@@ -0,0 +1,204 @@
+"""
+Jobs of the API: actions run in the background, and the endpoint reporting their progress.
+
+A view decorated with `as_job` does not run when called: a job is created with the validated
+parameters of the request, and returned with a `202` status. A worker (`run_workers` command)
+runs the view later, with a request authenticated as the user having launched the job (access
+rules apply), and stores its serialized response as the job result. Clients follow the job
+with the endpoint registered by `add_job_routes` (`GET /jobs/{id}/`).
+"""
+import typing as t
+import uuid
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse
+from ninja import NinjaAPI, Schema
+from ninja.constants import NOT_SET
+from ninja.errors import ValidationError
+from ninja.utils import is_async_callable
+from pydantic import TypeAdapter
+from pydantic_core import to_jsonable_python
+
+from core.choices import JobStatus
+from core.jobs import enqueue_job, register_job
+from core.models import Job
+
+from .renderers import serialized_response
+
+__all__ = [
+    "JOB_REQUEST_ATTR",
+    "JobRequest",
+    "JobSchema",
+    "add_job_routes",
+    "as_job",
+    "get_request_job",
+    "register_view_job",
+]
+
+
+# Attribute of the requests given to views run by a worker, giving the job
+JOB_REQUEST_ATTR = "job"
+
+
+class JobSchema(Schema):
+    id: uuid.UUID
+    name: str
+    status: JobStatus
+    progress: int
+    result: t.Any = None
+    error: str
+    create_date: datetime
+    start_date: t.Optional[datetime] = None
+    end_date: t.Optional[datetime] = None
+
+
+def get_request_job(request: HttpRequest) -> t.Optional[Job]:
+    """Job running the current view, if run by a worker (to report progress)."""
+    return getattr(request, JOB_REQUEST_ATTR, None)
+
+
+def add_job_routes(
+    api: NinjaAPI,
+    path: str = "/jobs/",
+    auth: t.Any = None,
+    **kwargs: t.Any,
+) -> None:
+    """Register the job endpoint on the given API."""
+
+    def job_read(request: HttpRequest, id: uuid.UUID):
+        """Progress and result of a job launched by the current user."""
+        user = getattr(request.auth, "user", None)
+        if user is None:
+            raise Job.DoesNotExist()
+        return Job.objects.get(pk=id, user=user)
+
+    api.get(
+        f"{path}{{id}}/",
+        response=JobSchema,
+        auth=auth,
+        operation_id="jobRead",
+        summary="Read Job",
+        tags=["Job"],
+        **kwargs,
+    )(job_read)
+
+
+# ----------------------------------------------------
+# Views run as jobs
+# ----------------------------------------------------
+
+
+class JobAuthentication:
+    """Authentication of the requests run by workers: the user having launched the job."""
+
+    def __init__(self, user):
+        self.user = user
+
+
+class JobRequest(HttpRequest):
+    """Request given to the views run by a worker."""
+
+    def __init__(self, job: Job):
+        super().__init__()
+        self.method = "POST"
+        self.auth = JobAuthentication(job.user)
+        if job.user is not None:
+            self.user = job.user
+        setattr(self, JOB_REQUEST_ATTR, job)
+
+
+def as_job(name: str) -> t.Callable:
+    """
+    Launch the job of the given name with the parameters of the request, instead of running
+    the decorated view. Must be the innermost decorator, so permissions are checked before
+    launching the job. The job must be registered with `register_view_job`.
+
+    @api.post(..., response={202: JobSchema})
+    @as_job("my_view")
+    def my_view(request, body: MySchema):
+    """
+
+    def _enqueue(request: HttpRequest, kwargs: t.Dict[str, t.Any]) -> HttpResponse:
+        user = getattr(request.auth, "user", None)
+        params = {key: to_jsonable_python(value) for key, value in kwargs.items()}
+        job = enqueue_job(name, user=user, **params)
+        return serialized_response(request, JobSchema.model_validate(job), status=202)
+
+    def decorator(func: t.Callable) -> t.Callable:
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_as_job(request: HttpRequest, **kwargs: t.Any) -> HttpResponse:
+                return await sync_to_async(_enqueue)(request, kwargs)
+
+        else:
+
+            @wraps(func)
+            def view_as_job(request: HttpRequest, **kwargs: t.Any) -> HttpResponse:
+                return _enqueue(request, kwargs)
+
+        return view_as_job
+
+    return decorator
+
+
+def register_view_job(
+    name: str, view_func: t.Callable[..., t.Any], response: t.Any = NOT_SET
+) -> None:
+    """
+    Register the job running a view decorated with `as_job`: the parameters are validated
+    again from the annotations of the view, and the value returned by the view is serialized
+    with the (success) response schema.
+
+    :param view_func: function called with the request and the parameters of the view (its
+        annotations, or the ones of the function it wraps, give the parameter types)
+    :param response: response schema of the view (or status code -> schema)
+    """
+    schema = _get_success_schema(response)
+    adapter = TypeAdapter(schema) if schema is not None else None
+
+    def run_view(job: Job, **params: t.Any) -> t.Any:
+        hints = t.get_type_hints(view_func, include_extras=True)
+        kwargs = {
+            key: (
+                None
+                if value is None
+                else TypeAdapter(_strip_annotated(hints[key])).validate_python(value)
+            )
+            for key, value in params.items()
+        }
+        try:
+            result = view_func(JobRequest(job), **kwargs)
+        except ValidationError as exc:
+            raise ValueError(
+                "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                    for error in exc.errors
+                )
+            ) from exc
+        if adapter is None:
+            return None
+        return adapter.dump_python(
+            adapter.validate_python(result, from_attributes=True), mode="json"
+        )
+
+    register_job(name)(run_view)
+
+
+def _get_success_schema(response: t.Any) -> t.Any:
+    if response is NOT_SET or response is None:
+        return None
+    if isinstance(response, dict):
+        for status, schema in sorted(response.items()):
+            if 200 <= status < 300:
+                return schema
+        return None
+    return response
+
+
+def _strip_annotated(annotation: t.Any) -> t.Any:
+    if t.get_origin(annotation) is t.Annotated:
+        return t.get_args(annotation)[0]
+    return annotation
@@ -0,0 +1,177 @@
+"""
+Persisted OpenAPI document of the APIs: generating it walks every operation and schema, so it
+is generated once per version of the code, and stored gzip-compressed in
+`API_OPENAPI_CACHE_DIR`, shared by the workers and kept across restarts.
+
+The document is keyed by a fingerprint of the source code of the project (and of the versions
+of the libraries generating it): any change of the routes or schemas gives a new document.
+It is generated on the first request, or beforehand with `manage.py warm_schemas --api ...`,
+and served with an ETag (`304` responses to the clients having the current document).
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import typing as t
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
+from ninja import NinjaAPI
+from ninja.responses import NinjaJSONEncoder
+
+from .conditional import etag_matches, not_modified_response
+
+__all__ = [
+    "OpenAPIDocument",
+    "accepts_gzip",
+    "get_code_fingerprint",
+    "get_openapi_document",
+    "openapi_json",
+]
+
+logger = logging.getLogger(__name__)
+
+# libraries whose version changes the generated document
+FINGERPRINT_DISTRIBUTIONS = ("django", "django-ninja", "pydantic")
+
+# directories of the project not defining the API
+FINGERPRINT_EXCLUDED_DIRS = {"tests", "migrations", "__pycache__"}
+
+
+class OpenAPIDocument(t.NamedTuple):
+    etag: str
+    # gzip-compressed JSON
+    content: bytes
+
+    def decompress(self) -> bytes:
+        return gzip.decompress(self.content)
+
+    @property
+    def gzip_etag(self) -> str:
+        """ETag of the compressed representation."""
+        return f'{self.etag[:-1]}-gzip"'
+
+
+# documents loaded by the process, by key
+_documents: t.Dict[str, OpenAPIDocument] = {}
+
+
+@lru_cache(maxsize=None)
+def get_code_fingerprint() -> str:
+    """Hash of the Python sources of the project (tests and migrations excluded), and of the
+    versions of the libraries generating the OpenAPI document.
+    """
+    digest = hashlib.sha256()
+    for name in FINGERPRINT_DISTRIBUTIONS:
+        try:
+            version = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            version = ""
+        digest.update(f"{name}=={version}\n".encode("utf-8"))
+
+    base_dir = Path(settings.BASE_DIR)
+    for path in sorted(_iter_source_files(base_dir)):
+        digest.update(path.relative_to(base_dir).as_posix().encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(path.read_bytes())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _iter_source_files(base_dir: Path) -> t.Iterator[Path]:
+    for root, dirs, files in os.walk(base_dir):
+        dirs[:] = [name for name in dirs if name not in FINGERPRINT_EXCLUDED_DIRS]
+        for name in files:
+            if name.endswith(".py"):
+                yield Path(root) / name
+
+
+def get_openapi_document(
+    api: NinjaAPI, path_params: t.Optional[t.Dict[str, t.Any]] = None
+) -> OpenAPIDocument:
+    """OpenAPI document of the API for the current code: from the memory of the process,
+    from the cache directory, or generated (and stored) otherwise.
+    """
+    path_prefix = api.get_root_path(path_params or {})
+    key = hashlib.sha256(
+        f"{get_code_fingerprint()}:{api.urls_namespace}:{path_prefix}".encode("utf-8")
+    ).hexdigest()[:32]
+
+    document = _documents.get(key)
+    if document is None:
+        path = Path(settings.API_OPENAPI_CACHE_DIR) / f"{key}.json.gz"
+        try:
+            content = path.read_bytes()
+        except OSError:  # not generated yet
+            content = _generate(api, path_prefix)
+            _store(path, content)
+        document = _documents[key] = OpenAPIDocument(quote_etag(key), content)
+    return document
+
+
+def _generate(api: NinjaAPI, path_prefix: str) -> bytes:
+    schema = api.get_openapi_schema(path_prefix=path_prefix)
+    content = json.dumps(schema, cls=NinjaJSONEncoder).encode("utf-8")
+    # no timestamp: the same document gives the same file
+    return gzip.compress(content, mtime=0)
+
+
+def _store(path: Path, content: bytes) -> None:
+    """Write the file atomically, as other workers may read it meanwhile. The cache is only
+    an optimization: the document is still served if it cannot be written.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+            file.write(content)
+        os.replace(file.name, path)
+    except OSError:
+        logger.warning("Unable to store the OpenAPI document in %s", path, exc_info=True)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether the `Accept-Encoding` header accepts gzip: the quality of its most specific
+    coding (`gzip`, then `*`) is not zero.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, dummy, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    quality = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return quality > 0
+
+
+def openapi_json(request: HttpRequest, api: NinjaAPI, **kwargs: t.Any) -> HttpResponse:
+    """View of the OpenAPI document, replacing the one of ninja. The compressed document is
+    served as is to the clients accepting gzip, with its own ETag: the two representations
+    do not share a strong validator.
+    """
+    document = get_openapi_document(api, kwargs)
+    compressed = accepts_gzip(request.headers.get("Accept-Encoding", ""))
+    etag = document.gzip_etag if compressed else document.etag
+    if etag_matches(request, etag):
+        response = not_modified_response(etag)
+    elif compressed:
+        response = HttpResponse(document.content, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+        response["ETag"] = etag
+    else:
+        response = HttpResponse(document.decompress(), content_type="application/json")
+        response["ETag"] = etag
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
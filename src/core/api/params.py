@@ -0,0 +1,41 @@
+"""
+Request body parameter of the views, resolving the foreign keys of the body in batch: the
+lookup values of the `ForeignKey` fields are collected before the validation, and the
+instances of each model are loaded with a single query (see
+`core.schemas.relations.ForeignKeyResolver`), instead of one query per value.
+
+@api.post(...)
+def create(request, payload: Annotated[MySchema, Body()]):
+    ...
+"""
+import typing as t
+
+from ninja.params import models as params_models
+
+from core.schemas.relations import collect_foreign_keys, resolve_foreign_keys
+
+__all__ = [
+    "Body",
+]
+
+
+class BodyModel(params_models.BodyModel):
+
+    @classmethod
+    def model_validate(cls, obj: t.Any, **kwargs: t.Any) -> t.Any:
+        with resolve_foreign_keys() as resolver:
+            resolver.prefetch(collect_foreign_keys(cls, obj))
+            return super().model_validate(obj, **kwargs)
+
+
+class ResolvedBody(params_models.Body):
+    _model = BodyModel
+
+    @classmethod
+    def _param_source(cls) -> str:
+        return "body"
+
+
+def Body(default: t.Any = ..., **kwargs: t.Any) -> t.Any:  # pylint: disable=invalid-name
+    """Same as `ninja.Body`, with the foreign keys resolved in batch."""
+    return ResolvedBody(default, **kwargs)
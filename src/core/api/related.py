@@ -0,0 +1,112 @@
+import typing as t
+from dataclasses import dataclass, field
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, QuerySet
+from pydantic import BaseModel
+
+from core.schemas.relations import get_relation_type
+
+__all__ = [
+    "RelatedPlan",
+    "build_related_plan",
+    "get_response_schema",
+]
+
+
+@dataclass(frozen=True)
+class RelatedPlan:
+    """Relations to load along with the queryset, to avoid N+1 queries when serializing."""
+
+    select_related: t.Tuple[str, ...] = field(default_factory=tuple)
+    prefetch_related: t.Tuple[str, ...] = field(default_factory=tuple)
+
+    def __bool__(self):
+        return bool(self.select_related or self.prefetch_related)
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+
+def get_response_schema(response: t.Any) -> t.Optional[t.Type[BaseModel]]:
+    """Extract the pydantic schema from a route `response` parameter. It can be a schema, a
+    generic alias (`List[Schema]`), or a mapping status code -> schema.
+    """
+    if isinstance(response, dict):
+        for status_code in sorted(response):
+            if 200 <= status_code < 300:
+                return get_response_schema(response[status_code])
+        return None
+    return _find_schema(response)
+
+
+def build_related_plan(
+    model: t.Type[Model], schema: t.Type[BaseModel]
+) -> RelatedPlan:
+    """Inspect the fields of the given schema to find the django relations it will read when
+    serializing an instance of `model`.
+     - Forward many-to-one and one-to-one relations are joined (`select_related`), unless they
+       are reached through a prefetched relation.
+     - Many-to-many and reverse relations are prefetched (`prefetch_related`).
+    Nested schemas are explored recursively.
+    """
+    select_related, prefetch_related = [], []
+    _explore_schema(model, schema, "", False, select_related, prefetch_related, set())
+    return RelatedPlan(
+        select_related=tuple(select_related),
+        prefetch_related=tuple(prefetch_related),
+    )
+
+
+def _explore_schema(
+    model, schema, prefix, in_prefetch, select_related, prefetch_related, visited
+):
+    if (model, schema) in visited:  # recursive schemas (tree)
+        return
+    visited = visited | {(model, schema)}
+
+    for fname, field_info in schema.model_fields.items():
+        try:
+            model_field = model._meta.get_field(fname)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation or model_field.related_model is None:
+            continue
+
+        nested_schema = _find_schema(field_info.annotation)
+        if nested_schema is None and get_relation_type(field_info.annotation) is None:
+            continue
+
+        path = f"{prefix}{fname}"
+        is_multiple = model_field.many_to_many or model_field.one_to_many
+        if is_multiple or in_prefetch:
+            prefetch_related.append(path)
+        else:
+            select_related.append(path)
+
+        if nested_schema is not None:
+            _explore_schema(
+                model_field.related_model,
+                nested_schema,
+                f"{path}__",
+                in_prefetch or is_multiple,
+                select_related,
+                prefetch_related,
+                visited,
+            )
+
+
+def _find_schema(annotation: t.Any) -> t.Optional[t.Type[BaseModel]]:
+    """Unwrap `Optional`, `List`, `Annotated`, ... to find a pydantic model class."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in t.get_args(annotation):
+        schema = _find_schema(arg)
+        if schema is not None:
+            return schema
+    return None
+
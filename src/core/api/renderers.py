@@ -0,0 +1,222 @@
+"""
+Content negotiation of the API: responses are rendered as JSON, or as MessagePack when the
+client prefers it (`Accept: application/msgpack`), and request bodies are parsed according
+to their `Content-Type` (JSON or MessagePack).
+
+MessagePack gives the same values as JSON (dates and identifiers as strings, ...), only the
+encoding differs. `NegotiatedNinjaAPI` sets the negotiated content type on the responses
+rendered by ninja; the views rendering their response themselves use `serialized_response`.
+"""
+import json
+import typing as t
+from functools import partial
+
+import msgpack
+from django.http import HttpRequest, HttpResponse
+from django.urls import URLPattern, URLResolver, path
+from django.utils.cache import patch_vary_headers
+from ninja import NinjaAPI
+from ninja.parser import Parser
+from ninja.renderers import BaseRenderer, JSONRenderer
+from ninja.responses import NinjaJSONEncoder
+from pydantic import TypeAdapter
+from pydantic_core import to_json, to_jsonable_python
+
+from .openapi import openapi_json
+
+__all__ = [
+    "JSON_MEDIA_TYPE",
+    "MSGPACK_MEDIA_TYPE",
+    "MEDIA_TYPES",
+    "MsgPackRenderer",
+    "NegotiatedNinjaAPI",
+    "NegotiatedParser",
+    "NegotiatedRenderer",
+    "get_media_type",
+    "serialized_response",
+]
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MEDIA_TYPES = (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE)
+
+# Media types accepted in request bodies, or `Accept` headers, for MessagePack
+MSGPACK_ALIASES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+MEDIA_TYPE_REQUEST_ATTR = "_negotiated_media_type"
+
+
+# ----------------------------------------------------
+# Negotiation
+# ----------------------------------------------------
+
+
+def get_media_type(request: HttpRequest) -> str:
+    """Media type of the response: MessagePack when the client prefers it (`Accept` header,
+    at least as much as JSON), JSON otherwise.
+    """
+    media_type = getattr(request, MEDIA_TYPE_REQUEST_ATTR, None)
+    if media_type is None:
+        media_type = _negotiate(request.headers.get("Accept", ""))
+        setattr(request, MEDIA_TYPE_REQUEST_ATTR, media_type)
+    return media_type
+
+
+def _negotiate(accept: str) -> str:
+    if "msgpack" not in accept:
+        return JSON_MEDIA_TYPE
+
+    # quality of each media type, from the most specific range matching it
+    json_quality = (-1, 0.0)
+    msgpack_quality = (-1, 0.0)
+    for item in accept.split(","):
+        media_range, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, dummy, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_range = media_range.lower()
+        if media_range in MSGPACK_ALIASES:
+            msgpack_quality = max(msgpack_quality, (2, quality))
+        elif media_range == JSON_MEDIA_TYPE:
+            json_quality = max(json_quality, (2, quality))
+        elif media_range in ("application/*", "*/*"):
+            specificity = 1 if media_range == "application/*" else 0
+            json_quality = max(json_quality, (specificity, quality))
+
+    if msgpack_quality[1] > 0 and msgpack_quality[1] >= json_quality[1]:
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def get_content_type(media_type: str) -> str:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return media_type
+    return f"{media_type}; charset=utf-8"
+
+
+def serialized_response(
+    request: HttpRequest,
+    value: t.Any,
+    status: int = 200,
+    adapter: t.Optional[TypeAdapter] = None,
+) -> HttpResponse:
+    """Response of already validated values (pydantic models, or lists and dicts of them),
+    in the negotiated format, without the validation of ninja.
+
+    :param adapter: serializer of the value, instead of inferring it
+    """
+    media_type = get_media_type(request)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        if adapter is not None:
+            value = adapter.dump_python(value, mode="json")
+        content = msgpack.packb(to_jsonable_python(value))
+    elif adapter is not None:
+        content = adapter.dump_json(value)
+    else:
+        content = to_json(value)
+    response = HttpResponse(content, status=status, content_type=get_content_type(media_type))
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+# ----------------------------------------------------
+# Ninja
+# ----------------------------------------------------
+
+
+class MsgPackRenderer(BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    # same values as the JSON renderer
+    encoder_class: t.Type[json.JSONEncoder] = NinjaJSONEncoder
+
+    def render(self, request: HttpRequest, data: t.Any, *, response_status: int) -> t.Any:
+        return msgpack.packb(data, default=self.encoder_class().default)
+
+
+class NegotiatedRenderer(BaseRenderer):
+    """Render with the renderer of the negotiated media type."""
+
+    media_type = JSON_MEDIA_TYPE
+
+    def __init__(self):
+        self.renderers = {
+            JSON_MEDIA_TYPE: JSONRenderer(),
+            MSGPACK_MEDIA_TYPE: MsgPackRenderer(),
+        }
+
+    def render(self, request: HttpRequest, data: t.Any, *, response_status: int) -> t.Any:
+        renderer = self.renderers[get_media_type(request)]
+        return renderer.render(request, data, response_status=response_status)
+
+
+class NegotiatedParser(Parser):
+    """Parse the request bodies according to their content type: MessagePack or JSON."""
+
+    def parse_body(self, request: HttpRequest) -> t.Dict[str, t.Any]:
+        if request.content_type in MSGPACK_ALIASES:
+            return t.cast(t.Dict[str, t.Any], msgpack.unpackb(request.body))
+        return t.cast(t.Dict[str, t.Any], json.loads(request.body))
+
+
+class NegotiatedNinjaAPI(NinjaAPI):
+    """API rendering its responses in the media type negotiated with the client (see
+    `NegotiatedRenderer`), and parsing the MessagePack request bodies.
+    """
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any):
+        kwargs.setdefault("renderer", NegotiatedRenderer())
+        kwargs.setdefault("parser", NegotiatedParser())
+        super().__init__(*args, **kwargs)
+
+    def create_response(
+        self,
+        request: HttpRequest,
+        data: t.Any,
+        *,
+        status: t.Optional[int] = None,
+        temporal_response: t.Optional[HttpResponse] = None,
+    ) -> HttpResponse:
+        response = super().create_response(
+            request, data, status=status, temporal_response=temporal_response
+        )
+        response["Content-Type"] = get_content_type(get_media_type(request))
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+    def get_openapi_schema(self, *args: t.Any, **kwargs: t.Any) -> t.Dict[str, t.Any]:
+        schema = super().get_openapi_schema(*args, **kwargs)
+        _document_media_types(schema)
+        return schema
+
+    def _get_urls(self) -> t.List[t.Union[URLResolver, URLPattern]]:
+        urls = super()._get_urls()
+        # serve the persisted OpenAPI document (see `core.api.openapi`)
+        for index, url in enumerate(urls):
+            if getattr(url, "name", None) == "openapi-json":
+                view = partial(openapi_json, api=self)
+                if self.docs_decorator:
+                    view = self.docs_decorator(view)
+                urls[index] = path(str(url.pattern), view, name="openapi-json")
+        return urls
+
+
+def _document_media_types(schema: t.Dict[str, t.Any]) -> None:
+    """Declare the MessagePack variant of each JSON request body and response."""
+    for path_item in schema.get("paths", {}).values():
+        for operation in path_item.values():
+            if not isinstance(operation, dict):
+                continue
+            contents = [operation.get("requestBody", {}).get("content", {})]
+            contents.extend(
+                response.get("content", {})
+                for response in operation.get("responses", {}).values()
+            )
+            for content in contents:
+                if JSON_MEDIA_TYPE in content:
+                    content.setdefault(MSGPACK_MEDIA_TYPE, content[JSON_MEDIA_TYPE])
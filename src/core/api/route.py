@@ -8,6 +8,7 @@ from ninja.signature import is_async
 from ninja.throttling import BaseThrottle
 from ninja.types import TCallable
 
+from .coalesce import coalesce as coalesce_decorator
 from .permission import BasePermission, check_permissions
 
 POST = "POST"
@@ -72,6 +73,7 @@ class Route(object):
         ] = None,
         openapi_extra: t.Optional[t.Dict[str, t.Any]] = None,
         decorators: t.List[t.Callable] = [],
+        coalesce: bool = False,
     ) -> None:
         if not isinstance(methods, list):
             raise RouteInvalidParameterException("methods must be a list")
@@ -125,6 +127,8 @@ class Route(object):
         self.decorators = decorators or [] # allow to create route without the decorator
         if permissions:
             self.decorators.append(check_permissions(permissions))
+        # Identical concurrent requests share one execution (see `core.api.coalesce`)
+        self.coalesce = coalesce
 
     @classmethod
     def _create_route_function(
@@ -151,6 +155,7 @@ class Route(object):
             t.List[t.Union[t.Type[BasePermission], BasePermission, t.Any]]
         ] = None,
         openapi_extra: t.Optional[t.Dict[str, t.Any]] = None,
+        coalesce: bool = False,
     ) -> TCallable:
         if response is NOT_SET:
             type_hint = t.get_type_hints(view_func).get("return") or NOT_SET
@@ -176,6 +181,7 @@ class Route(object):
             permissions=permissions,
             openapi_extra=openapi_extra,
             throttle=throttle,
+            coalesce=coalesce,
         )
 
         setattr(view_func, MAGIC_ROUTE_ATTR, route_obj)
@@ -185,10 +191,20 @@ class Route(object):
         self._api_controller = controller
 
     def as_operation(self) -> dict[str, t.Any]:
+        decorators = list(self.decorators)
+        if self.coalesce:
+            # innermost: permissions are checked before sharing a response
+            controller = self._api_controller
+            decorators.append(
+                coalesce_decorator(
+                    f"{type(controller).__name__}.{self.view_func.__name__}",
+                    fingerprint=controller.get_coalesce_fingerprint,
+                )
+            )
         return {
             "view_func": functools.reduce(
                 lambda f, g: g(f),
-                reversed(self.decorators),
+                reversed(decorators),
                 self._create_standalone_handler(self.view_func),
             ),
             **self.route_params,
@@ -262,6 +278,7 @@ class Route(object):
             t.List[t.Union[t.Type[BasePermission], BasePermission, t.Any]]
         ] = None,
         openapi_extra: t.Optional[t.Dict[str, t.Any]] = None,
+        coalesce: bool = False,
     ) -> t.Callable[[TCallable], TCallable]:
         """
         A GET Operation method decorator
@@ -287,6 +304,7 @@ class Route(object):
         :param url_name: a name to an endpoint which can be resolved using `reverse` function in django. default: `None`
         :param include_in_schema: indicates whether an endpoint should appear on the swagger documentation
         :param permissions: collection permission classes. default: `None`
+        :param coalesce: identical concurrent requests share one execution. default: `False`
         :return: Route[GET]
         """
         def decorator(view_func: TCallable) -> TCallable:
@@ -310,6 +328,7 @@ class Route(object):
                 permissions=permissions,
                 openapi_extra=openapi_extra,
                 throttle=throttle,
+                coalesce=coalesce,
             )
 
         return decorator
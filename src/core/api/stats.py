@@ -0,0 +1,145 @@
+"""
+Statistics of querysets: counts and min/max values, grouped by some fields.
+
+The aggregation runs in a single SQL query on the queryset returned by the view (filtered and
+restricted by access rules), e.g. `?group_by=user_type&aggregates=count,max_date_joined`
+gives one row per user type with the number of users and the last joining date.
+"""
+import typing as t
+from functools import wraps
+
+from django.db.models import Count, Max, Min, QuerySet
+from django.http import HttpRequest
+from ninja import Query, Schema
+from ninja.utils import contribute_operation_args, is_async_callable
+from pydantic import Field, field_validator
+
+__all__ = [
+    "Stats",
+    "stats",
+]
+
+
+AGGREGATE_FUNCTIONS = {
+    "min": Min,
+    "max": Max,
+}
+
+
+class Stats:
+    """Validate the `group_by` and `aggregates` parameters, and compute the statistics."""
+
+    def __init__(
+        self,
+        group_by_fields: t.Optional[t.List[str]] = None,
+        aggregate_fields: t.Optional[t.List[str]] = None,
+    ) -> None:
+        self.group_by_fields = list(group_by_fields or [])
+        # `count`, then `min_<field>` and `max_<field>` for each aggregated field
+        self.aggregates = {"count": Count("pk")}
+        for fname in aggregate_fields or []:
+            for name, function in AGGREGATE_FUNCTIONS.items():
+                self.aggregates[f"{name}_{fname}"] = function(fname)
+        self.Input = self.create_input()
+
+    def create_input(self) -> t.Type[Schema]:
+        group_by_fields = self.group_by_fields
+        aggregate_names = list(self.aggregates)
+
+        class StatsInput(Schema):
+            group_by: t.Optional[str] = Field(
+                None,
+                description="Comma separated fields to group the records by. Possible "
+                f"values are {_choices(group_by_fields)}",
+            )
+            aggregates: str = Field(
+                "count",
+                description="Comma separated values to compute for each group. Possible "
+                f"values are {_choices(aggregate_names)}",
+            )
+
+            @field_validator("group_by")
+            @classmethod
+            def check_group_by(cls, value):
+                _check_choices(value, group_by_fields, "Records can not be grouped by")
+                return value
+
+            @field_validator("aggregates")
+            @classmethod
+            def check_aggregates(cls, value):
+                if not _split(value):
+                    raise ValueError("At least one value to compute is required.")
+                _check_choices(value, aggregate_names, "Values can not be computed")
+                return value
+
+        return StatsInput
+
+    def compute(
+        self, queryset: QuerySet, stats_input: Schema
+    ) -> t.List[t.Dict[str, t.Any]]:
+        group_by = _split(stats_input.group_by)
+        aggregates = {
+            name: self.aggregates[name] for name in _split(stats_input.aggregates)
+        }
+        # default ordering of the model would be part of the grouping
+        queryset = queryset.order_by()
+        if not group_by:
+            return [queryset.aggregate(**aggregates)]
+        return list(
+            queryset.values(*group_by).annotate(**aggregates).order_by(*group_by)
+        )
+
+
+def stats(
+    group_by_fields: t.Optional[t.List[str]] = None,
+    aggregate_fields: t.Optional[t.List[str]] = None,
+) -> t.Callable:
+    """
+    Compute the statistics of the queryset returned by the view, grouped by the fields given
+    in the `group_by` query parameter (among `group_by_fields`). Minimum and maximum values
+    can be computed for the `aggregate_fields`.
+
+    @api.get(...
+    @stats(["user_type", "is_active"], ["date_joined"])
+    def my_view(request):
+        return MyModel.objects.all()
+    """
+    statistics = Stats(group_by_fields, aggregate_fields)
+
+    def decorator(func: t.Callable) -> t.Callable:
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_stats(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                stats_input = kwargs.pop("ninja_stats")
+                queryset = await func(request, **kwargs)
+                return statistics.compute(queryset, stats_input)
+
+        else:
+
+            @wraps(func)
+            def view_with_stats(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                stats_input = kwargs.pop("ninja_stats")
+                queryset = func(request, **kwargs)
+                return statistics.compute(queryset, stats_input)
+
+        contribute_operation_args(view_with_stats, "ninja_stats", statistics.Input, Query(...))
+        return view_with_stats
+
+    return decorator
+
+
+def _split(value: t.Optional[str]) -> t.List[str]:
+    if not value:
+        return []
+    return list(dict.fromkeys(item.strip() for item in value.split(",") if item.strip()))
+
+
+def _choices(values: t.List[str]) -> str:
+    return ", ".join(f"`{value}`" for value in values)
+
+
+def _check_choices(value, choices, message):
+    unknown = set(_split(value)) - set(choices)
+    if unknown:
+        raise ValueError(f"{message}: {', '.join(sorted(unknown))}.")
@@ -0,0 +1,320 @@
+"""
+Serialization of list endpoints from `values()` rows, without instantiating the models.
+
+The projection is deduced from the response schema: concrete fields are selected by name,
+nested schemas of forward many-to-one relations are joined (`fk__field`), and nested schemas
+of multiple relations (many-to-many, reverse foreign keys) are loaded with a single query
+grouped by the parent primary key. Relations given as lookup values (`core.schemas.relations`)
+are read the same way, selecting only their lookup field. The rows are then validated and dumped to JSON in bulk
+with a `TypeAdapter(List[Schema])`. Unless they define validators or serializers, schemas
+are mirrored into plain pydantic models for that, skipping the attribute resolution of ninja
+schemas (`DjangoGetter`) made for model instances.
+
+Only schemas made of model fields are supported: resolvers or nested schemas containing
+relations can not be projected.
+"""
+import typing as t
+from collections import defaultdict
+from copy import copy
+from functools import lru_cache, wraps
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import FileField, Model, QuerySet
+from django.db.models.fields.related import ForeignObjectRel
+from django.http import HttpRequest
+from django.http.response import HttpResponseBase
+from ninja.utils import is_async_callable
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from core.schemas.fields import convert_db_field
+from core.schemas.relations import QuerySetField, get_relation_type
+
+from .related import get_response_schema
+from .renderers import serialized_response
+
+__all__ = [
+    "ValuesSerializer",
+    "get_values_serializer",
+    "render_values",
+    "values_response",
+]
+
+
+class ValuesSerializer:
+
+    def __init__(self, model: t.Type[Model], schema: t.Type[BaseModel]):
+        if getattr(schema, "_ninja_resolvers", None):
+            raise ImproperlyConfigured(
+                f"{schema.__name__} has resolvers and can not be serialized from values."
+            )
+
+        self.model = model
+        self.schema = schema
+
+        self.pk_name = model._meta.pk.attname
+        self.fields: t.List[str] = []
+        self.files: t.Dict[str, FileField] = {}
+        # relation name -> (field names of the nested schema, file fields)
+        self.joined: t.Dict[str, t.Tuple[t.List[str], t.Dict[str, FileField]]] = {}
+        # relation name -> (related model, lookup to the parent, field names, file fields)
+        self.grouped: t.Dict[
+            str, t.Tuple[t.Type[Model], str, t.List[str], t.Dict[str, FileField]]
+        ] = {}
+        # many-to-one relation name -> path of its lookup field (e.g. `page_id`)
+        self.keys: t.Dict[str, str] = {}
+        # multiple relations serialized as the list of their lookup values
+        self.flat: t.Set[str] = set()
+        nested_schemas, key_types = {}, {}
+
+        for fname, field_info in schema.model_fields.items():
+            model_field = _get_model_field(model, schema, fname)
+            if not model_field.is_relation:
+                self.fields.append(fname)
+                if isinstance(model_field, FileField):
+                    self.files[fname] = model_field
+                continue
+
+            related_model = model_field.related_model
+            is_multiple = model_field.many_to_many or model_field.one_to_many
+            if is_multiple:
+                if isinstance(model_field, ForeignObjectRel):
+                    lookup = model_field.field.name
+                else:
+                    lookup = model_field.related_query_name()
+
+            nested_schema = get_response_schema(field_info.annotation)
+            if nested_schema is None:
+                relation_type = get_relation_type(field_info.annotation)
+                if relation_type is None:
+                    raise ImproperlyConfigured(
+                        f"Relation {schema.__name__}.{fname} must be a nested schema or a "
+                        "relation field to be serialized from values."
+                    )
+                key_field = _get_key_field(related_model, relation_type.lookup_field)
+                key_types[fname] = convert_db_field(key_field)[0]
+                if is_multiple:
+                    self.grouped[fname] = (related_model, lookup, [key_field.name], {})
+                    self.flat.add(fname)
+                elif key_field.primary_key:
+                    self.keys[fname] = model_field.attname
+                else:
+                    self.keys[fname] = f"{fname}__{key_field.name}"
+                continue
+
+            subfields, subfiles = _get_scalar_fields(related_model, nested_schema)
+            nested_schemas[fname] = nested_schema
+            if is_multiple:
+                self.grouped[fname] = (related_model, lookup, subfields, subfiles)
+            else:
+                self.joined[fname] = (subfields, subfiles)
+
+        self.adapter = TypeAdapter(
+            t.List[_get_plain_schema(schema, nested_schemas, key_types)]
+        )
+
+    def get_projection(self) -> t.List[str]:
+        projection = [self.pk_name, *self.fields, *self.keys.values()]
+        for fname, (subfields, dummy) in self.joined.items():
+            projection.append(fname)
+            projection.extend(f"{fname}__{subfield}" for subfield in subfields)
+        return list(dict.fromkeys(projection))
+
+    def values(self, queryset: QuerySet) -> QuerySet:
+        """Turn the queryset into the `values()` one to serialize. Prefetches are dropped as
+        they do not apply to dictionaries.
+        """
+        return queryset.prefetch_related(None).values(*self.get_projection())
+
+    def get_items(self, rows: t.Iterable[dict]) -> t.List[dict]:
+        """Build the input of the schema from the `values()` rows."""
+        rows = list(rows)
+        items = []
+        for row in rows:
+            item = {fname: row[fname] for fname in self.fields}
+            _convert_files(item, self.files)
+            for fname, path in self.keys.items():
+                item[fname] = row[path]
+            for fname, (subfields, subfiles) in self.joined.items():
+                if row[fname] is None:
+                    item[fname] = None
+                    continue
+                nested = {subfield: row[f"{fname}__{subfield}"] for subfield in subfields}
+                item[fname] = _convert_files(nested, subfiles)
+            items.append(item)
+
+        if self.grouped and rows:
+            pks = [row[self.pk_name] for row in rows]
+            for fname, (related_model, lookup, subfields, subfiles) in self.grouped.items():
+                groups = defaultdict(list)
+                queryset = related_model._default_manager.filter(**{f"{lookup}__in": pks})
+                for values in queryset.values_list(lookup, *subfields):
+                    if fname in self.flat:
+                        groups[values[0]].append(values[1])
+                        continue
+                    nested = dict(zip(subfields, values[1:]))
+                    groups[values[0]].append(_convert_files(nested, subfiles))
+                for row, item in zip(rows, items):
+                    item[fname] = groups.get(row[self.pk_name], [])
+
+        return items
+
+    def dump_json(self, rows: t.Iterable[dict]) -> bytes:
+        return self.adapter.dump_json(self.validate(rows))
+
+    def validate(self, rows: t.Iterable[dict]) -> t.List[BaseModel]:
+        return self.adapter.validate_python(self.get_items(rows))
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(
+    model: t.Type[Model], schema: t.Type[BaseModel]
+) -> ValuesSerializer:
+    return ValuesSerializer(model, schema)
+
+
+def values_response(serializer: ValuesSerializer, items_attribute: str = "results"):
+    """
+    Render the `values()` rows returned by the view (as is, or paginated) with the given
+    serializer, bypassing the validation of the response by ninja.
+
+    @api.get(...
+    @values_response(get_values_serializer(MyModel, MySchema))
+    @paginate
+    def my_view(request):
+    """
+
+    def decorator(func: t.Callable) -> t.Callable:
+        if is_async_callable(func):
+
+            @wraps(func)
+            async def view_with_values(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                result = await func(request, **kwargs)
+                return render_values(request, serializer, result, items_attribute)
+
+        else:
+
+            @wraps(func)
+            def view_with_values(request: HttpRequest, **kwargs: t.Any) -> t.Any:
+                result = func(request, **kwargs)
+                return render_values(request, serializer, result, items_attribute)
+
+        return view_with_values
+
+    return decorator
+
+
+def render_values(
+    request: HttpRequest,
+    serializer: ValuesSerializer,
+    result: t.Any,
+    items_attribute: str = "results",
+) -> HttpResponseBase:
+    """Render the `values()` rows (as is, or paginated) returned by a view."""
+    if isinstance(result, HttpResponseBase):
+        return result
+    if isinstance(result, dict):
+        return serialized_response(
+            request,
+            {**result, items_attribute: serializer.validate(result[items_attribute])},
+        )
+    return serialized_response(
+        request, serializer.validate(result), adapter=serializer.adapter
+    )
+
+
+def _get_plain_schema(schema, nested_schemas=None, key_types=None):
+    """Mirror the given schema into a pydantic model (same fields and config) validating
+    dictionaries directly. Relation fields are replaced by the type of their lookup value.
+    The schema is kept if it has its own validators or serializers.
+    """
+    decorators = schema.__pydantic_decorators__
+    model_validators = set(decorators.model_validators) - {"_run_root_validator"}
+    if (
+        model_validators
+        or decorators.validators
+        or decorators.field_validators
+        or decorators.root_validators
+        or decorators.field_serializers
+        or decorators.model_serializers
+        or decorators.computed_fields
+    ):
+        return schema
+
+    fields = {}
+    for fname, field_info in schema.model_fields.items():
+        annotation = field_info.annotation
+        if nested_schemas and fname in nested_schemas:
+            nested_schema = nested_schemas[fname]
+            annotation = _replace_annotation(
+                annotation, nested_schema, _get_plain_schema(nested_schema)
+            )
+        elif key_types and fname in key_types:
+            relation_type = get_relation_type(annotation)
+            key_type = key_types[fname]
+            if issubclass(relation_type, QuerySetField):
+                key_type = t.List[key_type]
+            annotation = _replace_annotation(annotation, relation_type, key_type)
+        fields[fname] = (annotation, copy(field_info))
+
+    config = {**schema.model_config, "from_attributes": False}
+    return create_model(
+        f"{schema.__name__}Values", __config__=ConfigDict(**config), **fields
+    )
+
+
+def _replace_annotation(annotation, old, new):
+    if annotation is old:
+        return new
+    args = t.get_args(annotation)
+    if not args:
+        return annotation
+    origin = t.get_origin(annotation)
+    if origin is t.Annotated:
+        return t.Annotated[(_replace_annotation(args[0], old, new), *args[1:])]
+    args = tuple(_replace_annotation(arg, old, new) for arg in args)
+    if origin is t.Union:
+        return t.Union[args]
+    return origin[args]
+
+
+def _get_model_field(model, schema, fname):
+    try:
+        return model._meta.get_field(fname)
+    except FieldDoesNotExist as exc:
+        raise ImproperlyConfigured(
+            f"{schema.__name__}.{fname} is not a field of {model.__name__} and can not be "
+            "serialized from values."
+        ) from exc
+
+
+def _get_key_field(model, lookup_field):
+    if lookup_field == "pk":
+        return model._meta.pk
+    return model._meta.get_field(lookup_field)
+
+
+def _get_scalar_fields(model, schema):
+    if getattr(schema, "_ninja_resolvers", None):
+        raise ImproperlyConfigured(
+            f"{schema.__name__} has resolvers and can not be serialized from values."
+        )
+    fields, files = [], {}
+    for fname in schema.model_fields:
+        model_field = _get_model_field(model, schema, fname)
+        if model_field.is_relation:
+            raise ImproperlyConfigured(
+                f"Nested schema {schema.__name__} can not contain relation ({fname}) to be "
+                "serialized from values."
+            )
+        fields.append(fname)
+        if isinstance(model_field, FileField):
+            files[fname] = model_field
+    return fields, files
+
+
+def _convert_files(item, files):
+    """Values are file names: give their url instead, as `FieldFile` are serialized."""
+    for fname, field in files.items():
+        name = item[fname]
+        item[fname] = field.storage.url(name) if name else None
+    return item
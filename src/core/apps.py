@@ -19,3 +19,7 @@ class CoreConfig(AppConfig):
         # django application, they need to loaded. In native django ninja, the route is
         # populated by importing every `api.py` file. This is not the case with controllers.
         autodiscover_modules('api')
+
+        # Job functions (see `core.jobs`) are registered in the `jobs` python module of each
+        # django application, to be available in the workers.
+        autodiscover_modules('jobs')
@@ -0,0 +1,218 @@
+"""
+Change log of records, for the incremental synchronization of clients.
+
+Each write of a tracked model appends an entry (model, primary key, deleted) to the change
+log (`core.models.ChangeLog`): saves and deletions through model signals, many-to-many changes
+(auto-created through tables), and bulk writes calling `record_changes` (custom querysets,
+custom through models, ...). Deletions are kept as tombstones.
+
+Clients read the changes after a cursor (`read_changes`), and get the next cursor. Entries
+become visible in transaction order: an entry is only given once all the transactions that
+may write an entry before it are finished, so no change is missed by a cursor. Only the last
+entry of each record is needed: older entries are removed by `compact_changes`
+(`compact_changes` command, to run periodically).
+
+Changes are also notified to the listening processes (see `core.events`).
+"""
+import typing as t
+
+from django.db.models import Count, ManyToManyField, Max, Model, Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from core.events import notify_changes
+from core.models import ChangeLog
+
+__all__ = [
+    "Changes",
+    "Cursor",
+    "compact_changes",
+    "get_changes_marker",
+    "get_record_marker",
+    "is_tracked",
+    "read_changes",
+    "record_changes",
+    "track_changes",
+]
+
+
+_tracked_models: t.Set[str] = set()
+
+
+# ----------------------------------------------------
+# Writing
+# ----------------------------------------------------
+
+
+def is_tracked(model: t.Type[Model]) -> bool:
+    return model._meta.label_lower in _tracked_models
+
+
+def record_changes(
+    model: t.Type[Model], pks: t.Iterable[t.Any], deleted: bool = False
+) -> None:
+    """Log and notify the changes of the given records, if their model is tracked. To use for
+    writes not emitting signals (`QuerySet.update`, `bulk_create`, ...).
+    """
+    if is_tracked(model):
+        pks = list(pks)
+        if pks:
+            ChangeLog.objects.record(model, pks, deleted=deleted)
+            notify_changes(model, pks, deleted=deleted)
+
+
+def _handle_save(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk])
+
+
+def _handle_delete(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk], deleted=True)
+
+
+def _handle_m2m_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        record_changes(type(instance), [instance.pk])
+    elif pk_set:  # unknown on reverse clear
+        record_changes(model, pk_set)
+
+
+def track_changes(*models: t.Type[Model]) -> None:
+    """Log the changes of the records of the given models."""
+    for model in models:
+        label = model._meta.label_lower
+        if label in _tracked_models:
+            continue
+        _tracked_models.add(label)
+
+        uid = f"change_log:{label}"
+        post_save.connect(_handle_save, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(_handle_delete, sender=model, weak=False, dispatch_uid=uid)
+        for field in model._meta.get_fields():
+            # custom through models record the changes of their bulk writes
+            if (
+                isinstance(field, ManyToManyField)
+                and field.remote_field.through._meta.auto_created
+            ):
+                m2m_changed.connect(
+                    _handle_m2m_change,
+                    sender=field.remote_field.through,
+                    weak=False,
+                    dispatch_uid=f"{uid}:{field.name}",
+                )
+
+
+# ----------------------------------------------------
+# Reading
+# ----------------------------------------------------
+
+
+class Cursor(t.NamedTuple):
+    """Position in the change log: entries are ordered by transaction, then identifier."""
+
+    txid: int
+    pk: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Cursor":
+        txid, dummy, pk = value.partition(".")
+        try:
+            return cls(int(txid), int(pk))
+        except ValueError:
+            raise ValueError("Invalid cursor.") from None
+
+    def __str__(self) -> str:
+        return f"{self.txid}.{self.pk}"
+
+
+class Changes(t.NamedTuple):
+    cursor: Cursor
+    changed: t.List[t.Any]
+    deleted: t.List[t.Any]
+    has_more: bool
+
+
+def read_changes(
+    model: t.Type[Model], cursor: t.Optional[Cursor], limit: int = 1000
+) -> Changes:
+    """Read the records of the model changed after the cursor: the records changed (and still
+    existing), and the deleted ones, by primary key. Without cursor, give the current cursor
+    only. At most `limit` entries are read: read again with the next cursor if `has_more`.
+    """
+    oldest_transaction = ChangeLog.objects.get_oldest_transaction()
+    # the entries written from now on will be after this cursor
+    current = Cursor(oldest_transaction, 0)
+    if cursor is None:
+        return Changes(current, [], [], False)
+
+    entries = list(
+        ChangeLog.objects.filter(model=model._meta.label_lower)
+        .finished(oldest_transaction)
+        .after(*cursor)
+        .order_by("txid", "pk")
+        .values_list("txid", "pk", "object_id", "deleted")[: limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # last state of each record, in the order of their last change
+    states = {}
+    for dummy, dummy, object_id, deleted in entries:
+        states.pop(object_id, None)
+        states[object_id] = deleted
+
+    if entries:
+        cursor = Cursor(*entries[-1][:2])
+    if not has_more:
+        cursor = max(cursor, current)
+
+    to_python = model._meta.pk.to_python
+    return Changes(
+        cursor,
+        [to_python(object_id) for object_id, deleted in states.items() if not deleted],
+        [to_python(object_id) for object_id, deleted in states.items() if deleted],
+        has_more,
+    )
+
+
+def get_changes_marker(*models: t.Type[Model]) -> t.Tuple[t.Any, ...]:
+    """Marker of the change log of the given (tracked) models, changing with any change of
+    their records: the last entry of the finished transactions, and the count and the sum of
+    the identifiers of the entries of the more recent ones (they can be committed in any
+    order). Read from the feed index: the cost grows with the number of entries written since
+    the start of the oldest running transaction, not with the size of the log.
+    """
+    oldest_transaction = ChangeLog.objects.get_oldest_transaction()
+    marker = []
+    for model in models:
+        entries = ChangeLog.objects.filter(model=model._meta.label_lower)
+        marker.append(
+            entries.filter(txid__lt=oldest_transaction)
+            .order_by("-txid", "-pk")
+            .values_list("txid", "pk")
+            .first()
+        )
+        marker.extend(
+            entries.filter(txid__gte=oldest_transaction)
+            .aggregate(count=Count("pk"), total=Sum("pk"))
+            .values()
+        )
+    return tuple(marker)
+
+
+def get_record_marker(model: t.Type[Model], pk: t.Any) -> t.Tuple[int, t.Optional[int]]:
+    """Marker of the change log of a (tracked) record, changing with any change logged for it
+    (relations written by custom through models, ...). Read from the index of the records.
+    """
+    return tuple(
+        ChangeLog.objects.filter(model=model._meta.label_lower, object_id=str(pk))
+        .aggregate(count=Count("pk"), last=Max("pk"))
+        .values()
+    )
+
+
+def compact_changes() -> int:
+    """Remove the entries having a newer entry for the same record. Return the number of
+    removed entries.
+    """
+    return ChangeLog.objects.compact()
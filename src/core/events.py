@@ -0,0 +1,228 @@
+"""
+Notifications of the changes of records, through Postgres `LISTEN` / `NOTIFY`.
+
+The writes recorded in the change log (`core.changes.record_changes`) are also notified on the
+`CHANGES_CHANNEL` channel: Postgres delivers the notifications once the transaction is
+committed, to all the processes listening to the channel. Each process listens with a single
+connection (`get_listener`), opened while there are subscribers, and dispatches the
+notifications to the subscribers interested in their model (the event streams of
+`core.api.events`).
+
+Notifications are not persisted: when some may have been lost (listening connection lost,
+subscriber too slow), subscribers get a `RESET` item, and must synchronize again (changes
+feed, see `core.api.changes`).
+"""
+import asyncio
+import json
+import logging
+import typing as t
+
+import psycopg
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model
+from psycopg import sql
+
+__all__ = [
+    "RESET",
+    "ChangeEvent",
+    "ChangeListener",
+    "Subscription",
+    "get_listener",
+    "notify_changes",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def get_channel() -> str:
+    return getattr(settings, "CHANGES_CHANNEL", "core_changes")
+
+
+# ----------------------------------------------------
+# Notifying
+# ----------------------------------------------------
+
+# Postgres limits the payloads to 8000 bytes
+MAX_PAYLOAD_SIZE = 7800
+
+
+def notify_changes(
+    model: t.Type[Model],
+    pks: t.Iterable[t.Any],
+    deleted: bool = False,
+    using: str = "default",
+) -> None:
+    """Notify the listening processes of the changes of the given records, once the current
+    transaction is committed. Large sets of records are split in several notifications.
+    """
+    label = model._meta.label_lower
+    payloads = [
+        json.dumps({"model": label, "pks": chunk, "deleted": deleted})
+        for chunk in _split_pks([str(pk) for pk in pks])
+    ]
+    if payloads:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                [get_channel(), payloads],
+            )
+
+
+def _split_pks(pks: t.List[str]) -> t.Iterator[t.List[str]]:
+    chunk: t.List[str] = []
+    size = 0
+    for pk in pks:
+        pk_size = len(pk) + 4  # quotes, comma and space
+        if chunk and size + pk_size > MAX_PAYLOAD_SIZE:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(pk)
+        size += pk_size
+    if chunk:
+        yield chunk
+
+
+# ----------------------------------------------------
+# Listening
+# ----------------------------------------------------
+
+
+class ChangeEvent(t.NamedTuple):
+    model: str  # label of the model (`app_label.model_name`)
+    pks: t.List[str]
+    deleted: bool
+
+
+# Item given to the subscribers when notifications may have been lost
+RESET = None
+
+
+class Subscription:
+    """Notifications of the changes of some models, received by a listener. Items are
+    `ChangeEvent` or `RESET`.
+    """
+
+    def __init__(self, listener: "ChangeListener", models: t.Set[str], max_size: int):
+        self.listener = listener
+        self.models = models
+        self.queue: asyncio.Queue = asyncio.Queue(max_size)
+
+    def put(self, item: t.Optional[ChangeEvent]) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # the subscriber does not keep up: drop its events, it must synchronize again
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+    async def get(self, timeout: t.Optional[float] = None) -> t.List[t.Optional[ChangeEvent]]:
+        """Wait for the next items, and give all the available ones (none after `timeout`
+        seconds).
+        """
+        try:
+            items = [await asyncio.wait_for(self.queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.queue.empty():
+            items.append(self.queue.get_nowait())
+        return items
+
+    async def wait_listening(self) -> None:
+        """Wait for the listener to be listening: changes are notified from then on."""
+        await self.listener.listening.wait()
+
+    def close(self) -> None:
+        self.listener.unsubscribe(self)
+
+
+class ChangeListener:
+    """Listen to the changes notified by all the processes, with a single connection, and
+    dispatch them to the subscribers of this process. The connection is open while there are
+    subscribers, and opened again when lost.
+    """
+
+    def __init__(self, channel: str, using: str = "default", retry_delay: float = 1.0):
+        self.channel = channel
+        self.using = using
+        self.retry_delay = retry_delay
+        self.subscriptions: t.Set[Subscription] = set()
+        self.listening = asyncio.Event()
+        self._task: t.Optional[asyncio.Task] = None
+
+    def subscribe(self, *models: t.Type[Model], max_size: int = 1000) -> Subscription:
+        """Subscribe to the changes of the given models. Must be called from the event loop
+        running the listener.
+        """
+        subscription = Subscription(
+            self, {model._meta.label_lower for model in models}, max_size
+        )
+        self.subscriptions.add(subscription)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self.listening = asyncio.Event()
+            self._task = loop.create_task(self._listen())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.listening.clear()
+
+    def dispatch(self, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            event = ChangeEvent(data["model"], data["pks"], data["deleted"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Invalid change notification: %s", payload)
+            return
+        for subscription in self.subscriptions:
+            if event.model in subscription.models:
+                subscription.put(event)
+
+    def reset(self) -> None:
+        for subscription in self.subscriptions:
+            subscription.put(RESET)
+
+    async def _listen(self) -> None:
+        lost = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    **self._get_connection_params(), autocommit=True
+                ) as conn:
+                    await conn.execute(
+                        sql.SQL("LISTEN {}").format(sql.Identifier(self.channel))
+                    )
+                    self.listening.set()
+                    if lost:
+                        self.reset()
+                        lost = False
+                    async for notify in conn.notifies():
+                        self.dispatch(notify.payload)
+            except (psycopg.Error, OSError):
+                logger.exception("Listening to the changes failed, retrying.")
+            self.listening.clear()
+            lost = True
+            await asyncio.sleep(self.retry_delay)
+
+    def _get_connection_params(self) -> t.Dict[str, t.Any]:
+        params = connections[self.using].get_connection_params()
+        # cursors and adapters of the (sync) django connections
+        params.pop("cursor_factory", None)
+        params.pop("context", None)
+        return params
+
+
+_listener: t.Optional[ChangeListener] = None
+
+
+def get_listener() -> ChangeListener:
+    """Listener of the current process."""
+    global _listener  # pylint: disable=global-statement
+    if _listener is None:
+        _listener = ChangeListener(get_channel())
+    return _listener
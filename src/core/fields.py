@@ -1,7 +1,17 @@
 from django.db import models
+from django.utils.text import Truncator
 from django.utils.translation import gettext_lazy as _
 
-from core.validators import HTML_DEFAULT_ATTRS, HTML_DEFAULT_TAGS, HTMLValidator
+from core.utils.html import Cleaner, html_to_text, sanitize_html, tags_to_kill, tags_to_remove
+from core.validators import (
+    HTML_DEFAULT_ATTRS,
+    HTML_DEFAULT_TAGS,
+    HTML_MAX_SIZE,
+    HTMLValidator,
+)
+
+# Default length of the plain text excerpts of the HTML contents
+HTML_EXCERPT_LENGTH = 300
 
 
 class HtmlFieldMixin:
@@ -19,6 +29,9 @@ class HtmlFieldMixin:
         allow_class_attr=True,
         allowed_tags=HTML_DEFAULT_TAGS,
         allowed_attrs=HTML_DEFAULT_ATTRS,
+        max_size=HTML_MAX_SIZE,
+        sanitize=False,
+        excerpt_field=None,
         **kwargs
     ):
         html_validator = HTMLValidator(
@@ -27,11 +40,68 @@ class HtmlFieldMixin:
             allow_class_attr=allow_class_attr,
             allowed_tags=allowed_tags,
             allowed_attrs=allowed_attrs,
+            max_size=max_size,
         )
         self.default_validators = [html_validator]
 
+        # the content is cleaned when saved, and the clean HTML is stored: it is rendered as is.
+        # Only `Model.save` cleans it: `QuerySet.update` and `bulk_update` store the given
+        # values as they are, they must be cleaned beforehand (`sanitize_value`)
+        self.sanitize = sanitize
+        self.html_cleaner = self._get_html_cleaner(html_validator) if sanitize else None
+        # name of the field storing the plain text of the content (for listings and search),
+        # set when saved: it must be declared after this one, and saved with it (the model
+        # adds it to the `update_fields` having this field)
+        self.excerpt_field = excerpt_field
+
         super().__init__(*args, **kwargs)
 
+    def _get_html_cleaner(self, html_validator):
+        """Cleaner removing what the validator rejects."""
+        safe_attrs = html_validator.allowed_attrs
+        if not html_validator.allow_class_attr:
+            safe_attrs -= {"class"}
+        return Cleaner(
+            scripts=not html_validator.allow_javascript,
+            javascript=not html_validator.allow_javascript,
+            style=False,
+            inline_style=not html_validator.allow_style_attr,
+            sanitize_style=html_validator.allow_style_attr,
+            strip_classes=not html_validator.allow_class_attr,
+            safe_attrs_only=True,
+            safe_attrs=safe_attrs,
+            allow_tags=html_validator.allowed_tags,
+            remove_unknown_tags=False,
+            kill_tags=frozenset(tags_to_kill) - html_validator.allowed_tags,
+            remove_tags=tags_to_remove,
+            embedded=False,
+            frames=False,
+            forms=False,
+            annoying_tags=False,
+        )
+
+    def sanitize_value(self, value):
+        if not value:
+            return value
+        return sanitize_html(value, self.html_cleaner)
+
+    def get_excerpt(self, value, max_length=HTML_EXCERPT_LENGTH):
+        return Truncator(html_to_text(value)).chars(max_length or HTML_EXCERPT_LENGTH)
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if self.sanitize:
+            value = self.sanitize_value(value)
+            setattr(model_instance, self.attname, value)
+        if self.excerpt_field:
+            excerpt_field = model_instance._meta.get_field(self.excerpt_field)
+            setattr(
+                model_instance,
+                excerpt_field.attname,
+                self.get_excerpt(value, excerpt_field.max_length),
+            )
+        return value
+
 
 class HtmlField(HtmlFieldMixin, models.TextField):
     description = _("Html")
@@ -0,0 +1,127 @@
+"""
+Jobs: operations too long for a request, run in the background by workers.
+
+Functions are registered under a name with `register_job`, and launched with `enqueue_job`
+(parameters must be JSON serializable). The jobs are stored in the database (`core.models.Job`)
+and taken by the workers of the `run_workers` command, in order of creation. A job function
+receives the job (to report its progress) and the parameters, its return value (JSON
+serializable) is stored as the job result, and its exception messages as the job error.
+
+The `jobs` module of each django application is imported at startup: register job functions
+there to make them available to the workers.
+"""
+import logging
+import time
+import typing as t
+
+from django.db import connections
+from django.utils import timezone
+
+from core.choices import JobStatus
+from core.models import Job
+
+__all__ = [
+    "Worker",
+    "enqueue_job",
+    "get_job_function",
+    "register_job",
+    "run_job",
+]
+
+logger = logging.getLogger(__name__)
+
+_registry: t.Dict[str, t.Callable[..., t.Any]] = {}
+
+
+def register_job(name: str) -> t.Callable:
+    """
+    Register the decorated function as a job.
+
+    @register_job("user.import")
+    def import_users(job, path):
+    """
+
+    def decorator(func: t.Callable) -> t.Callable:
+        if name in _registry:
+            raise ValueError(f"Job {name} is already registered.")
+        _registry[name] = func
+        return func
+
+    return decorator
+
+
+def get_job_function(name: str) -> t.Callable[..., t.Any]:
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError(f"Job {name} is not registered.") from None
+
+
+def enqueue_job(name: str, user=None, **params: t.Any) -> Job:
+    """Launch the job of the given name. It will run once the current transaction is
+    committed.
+    """
+    get_job_function(name)  # fail early
+    return Job.objects.create(name=name, user=user, params=params)
+
+
+def run_job(job: Job) -> Job:
+    """Run the given job (taken from the queue), and save its result or error."""
+    try:
+        func = get_job_function(job.name)
+        result = func(job, **job.params)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.exception("Job %s (%s) failed.", job.pk, job.name)
+        job.status = JobStatus.FAILED
+        job.error = str(exc) or exc.__class__.__name__
+        job.end_date = timezone.now()
+        job.save(update_fields=["status", "error", "end_date"])
+    else:
+        job.status = JobStatus.SUCCEEDED
+        job.result = result
+        job.progress = 100
+        job.end_date = timezone.now()
+        job.save(update_fields=["status", "result", "progress", "end_date"])
+    return job
+
+
+class Worker:
+    """Take the jobs of the queue, and run them one after the other."""
+
+    def __init__(self, poll_interval: float = 1.0, burst: bool = False):
+        """
+        :param poll_interval: delay (in seconds) before checking an empty queue again
+        :param burst: stop once the queue is empty
+        """
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.stopped = False
+
+    def stop(self, *args: t.Any) -> None:
+        """Stop after the current job. Can be used as signal handler."""
+        self.stopped = True
+
+    def run(self) -> int:
+        """Run jobs until stopped. Return the number of jobs run."""
+        count = 0
+        while not self.stopped:
+            _close_old_connections()
+            job = Job.objects.fetch()
+            if job is None:
+                if self.burst:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            run_job(job)
+            count += 1
+        _close_old_connections()
+        return count
+
+
+def _close_old_connections() -> None:
+    """Close the connections broken or older than `CONN_MAX_AGE`, as done between requests.
+    Connections in a transaction are kept.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
@@ -0,0 +1,97 @@
+import statistics
+import textwrap
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from core.api.related import get_response_schema
+from core.schemas.dump import get_dump_function
+
+
+class Command(BaseCommand):
+    help = textwrap.dedent(
+        """
+        Compare the serialization of the instances of a list endpoint by pydantic
+        (`model_validate(instance).model_dump(mode="json")`) and by the dump function
+        generated for the response schema (see `core.schemas.dump`), after checking they
+        give the same data.
+
+        The rows of the database are used: populate it with enough data beforehand.
+    """
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "controller",
+            type=str,
+            help="Dotted path of the controller class (e.g. user.api.users.UserController)",
+        )
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[20, 100, 200],
+            help="Numbers of instances to benchmark.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of runs for each size.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            controller = import_string(options["controller"])
+        except ImportError as exc:
+            raise CommandError(str(exc)) from exc
+
+        model = controller.model
+        schema = get_response_schema(controller.list_response_schema)
+        if model is None or schema is None:
+            raise CommandError(f"{controller.__name__} has no list endpoint.")
+        dump = get_dump_function(schema)
+        if dump is None:
+            raise CommandError(f"{schema.__name__} can not be dumped by a generated function.")
+
+        plan = controller._related_plans.get("list")  # pylint: disable=protected-access
+        queryset = model._default_manager.order_by("pk")
+        instances = list((plan.apply(queryset) if plan else queryset)[: max(options["sizes"])])
+
+        def dump_pydantic(items):
+            return [schema.model_validate(obj).model_dump(mode="json") for obj in items]
+
+        def dump_generated(items):
+            return [dump(obj) for obj in items]
+
+        if dump_pydantic(instances) != dump_generated(instances):
+            raise CommandError(f"The dump function of {schema.__name__} gives other data.")
+
+        self.stdout.write(
+            f"{model.__name__}: {len(instances)} rows, {options['repeat']} runs"
+        )
+        self.stdout.write(f"{'size':>6} {'pydantic (ms)':>14} {'generated (ms)':>15} {'speedup':>8}")
+        for size in options["sizes"]:
+            if size > len(instances):
+                self.stdout.write(
+                    self.style.WARNING(f"Only {len(instances)} rows available for size {size}.")
+                )
+            durations = [
+                self._measure(func, instances[:size], options["repeat"])
+                for func in (dump_pydantic, dump_generated)
+            ]
+            self.stdout.write(
+                f"{size:>6} {durations[0]:>14.2f} {durations[1]:>15.2f} "
+                f"{durations[0] / durations[1]:>7.1f}x"
+            )
+
+    def _measure(self, func, items, repeat):
+        """Median duration of the function in milliseconds."""
+        func(items)  # warm up
+        durations = []
+        for dummy in range(repeat):
+            start = time.perf_counter()
+            func(items)
+            durations.append((time.perf_counter() - start) * 1000)
+        return statistics.median(durations)
@@ -0,0 +1,91 @@
+import statistics
+import textwrap
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from ninja.renderers import JSONRenderer
+
+from core.api.related import get_response_schema
+from core.api.values import get_values_serializer
+
+
+class Command(BaseCommand):
+    help = textwrap.dedent(
+        """
+        Compare the serialization of a list endpoint from model instances (default) and
+        from `values()` rows (`list_values` option of the controllers).
+
+        The rows of the database are used: populate it with enough data beforehand.
+    """
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "controller",
+            type=str,
+            help="Dotted path of the controller class (e.g. user.api.users.UserController)",
+        )
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[20, 100, 200],
+            help="Page sizes to benchmark.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of runs for each page size.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            controller = import_string(options["controller"])
+        except ImportError as exc:
+            raise CommandError(str(exc)) from exc
+
+        model = controller.model
+        schema = get_response_schema(controller.list_response_schema)
+        if model is None or schema is None:
+            raise CommandError(f"{controller.__name__} has no list endpoint.")
+
+        serializer = get_values_serializer(model, schema)
+        plan = controller._related_plans.get("list")  # pylint: disable=protected-access
+        queryset = model._default_manager.order_by("pk")
+        total = queryset.count()
+
+        def serialize_instances(size):
+            instances = plan.apply(queryset) if plan else queryset
+            data = [schema.from_orm(obj).model_dump() for obj in instances[:size]]
+            return JSONRenderer().render(None, data, response_status=200)
+
+        def serialize_values(size):
+            return serializer.dump_json(serializer.values(queryset)[:size])
+
+        self.stdout.write(f"{model.__name__}: {total} rows, {options['repeat']} runs")
+        self.stdout.write(f"{'size':>6} {'instances (ms)':>16} {'values (ms)':>14} {'speedup':>8}")
+        for size in options["sizes"]:
+            if size > total:
+                self.stdout.write(
+                    self.style.WARNING(f"Only {total} rows available for size {size}.")
+                )
+            durations = [
+                self._measure(func, size, options["repeat"])
+                for func in (serialize_instances, serialize_values)
+            ]
+            self.stdout.write(
+                f"{size:>6} {durations[0]:>16.2f} {durations[1]:>14.2f} "
+                f"{durations[0] / durations[1]:>7.1f}x"
+            )
+
+    def _measure(self, func, size, repeat):
+        """Median duration of the function in milliseconds."""
+        func(size)  # warm up
+        durations = []
+        for dummy in range(repeat):
+            start = time.perf_counter()
+            func(size)
+            durations.append((time.perf_counter() - start) * 1000)
+        return statistics.median(durations)
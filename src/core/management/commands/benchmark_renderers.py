@@ -0,0 +1,90 @@
+import statistics
+import textwrap
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from ninja.renderers import JSONRenderer
+
+from core.api.related import get_response_schema
+from core.api.renderers import MsgPackRenderer
+
+
+class Command(BaseCommand):
+    help = textwrap.dedent(
+        """
+        Compare the encoding of a page of a list endpoint as JSON and as MessagePack
+        (`Accept: application/msgpack`): duration and size of the rendered payload.
+
+        The rows of the database are used: populate it with enough data beforehand.
+    """
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "controller",
+            type=str,
+            help="Dotted path of the controller class (e.g. user.api.users.UserController)",
+        )
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=200,
+            help="Number of records of the page.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=50,
+            help="Number of runs for each format.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            controller = import_string(options["controller"])
+        except ImportError as exc:
+            raise CommandError(str(exc)) from exc
+
+        model = controller.model
+        schema = get_response_schema(controller.list_response_schema)
+        if model is None or schema is None:
+            raise CommandError(f"{controller.__name__} has no list endpoint.")
+
+        size = options["size"]
+        plan = controller._related_plans.get("list")  # pylint: disable=protected-access
+        queryset = model._default_manager.order_by("pk")
+        instances = list((plan.apply(queryset) if plan else queryset)[:size])
+        if len(instances) < size:
+            self.stdout.write(
+                self.style.WARNING(f"Only {len(instances)} rows available for size {size}.")
+            )
+        # data given to the renderers by ninja
+        data = [schema.from_orm(obj).model_dump() for obj in instances]
+
+        self.stdout.write(
+            f"{model.__name__}: {len(instances)} rows, {options['repeat']} runs"
+        )
+        self.stdout.write(f"{'format':>8} {'encode (ms)':>12} {'size (bytes)':>13}")
+        results = []
+        for name, renderer in (("json", JSONRenderer()), ("msgpack", MsgPackRenderer())):
+            content = renderer.render(None, data, response_status=200)
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            duration = self._measure(renderer, data, options["repeat"])
+            results.append((duration, len(content)))
+            self.stdout.write(f"{name:>8} {duration:>12.2f} {len(content):>13}")
+
+        (json_duration, json_size), (msgpack_duration, msgpack_size) = results
+        self.stdout.write(
+            f"msgpack: {json_duration / msgpack_duration:.1f}x faster, "
+            f"{100 * (1 - msgpack_size / json_size):.0f}% smaller"
+        )
+
+    def _measure(self, renderer, data, repeat):
+        """Median duration of the rendering in milliseconds."""
+        durations = []
+        for dummy in range(repeat):
+            start = time.perf_counter()
+            renderer.render(None, data, response_status=200)
+            durations.append((time.perf_counter() - start) * 1000)
+        return statistics.median(durations)
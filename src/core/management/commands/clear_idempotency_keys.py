@@ -0,0 +1,18 @@
+import textwrap
+
+from django.core.management.base import BaseCommand
+
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = textwrap.dedent(
+        """
+        Remove the expired entries of the idempotency keys (see `core.api.idempotency`). To
+        run periodically.
+    """
+    )
+
+    def handle(self, *args, **options):
+        count = IdempotencyKey.objects.clear_expired()
+        self.stdout.write(self.style.SUCCESS(f"{count} idempotency keys removed."))
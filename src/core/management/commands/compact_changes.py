@@ -0,0 +1,19 @@
+import textwrap
+
+from django.core.management.base import BaseCommand
+
+from core.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = textwrap.dedent(
+        """
+        Remove the entries of the change log (see `core.changes`) having a newer entry for
+        the same record. To run periodically: only the last entry of each record is needed
+        by the clients, whatever their cursor.
+    """
+    )
+
+    def handle(self, *args, **options):
+        count = compact_changes()
+        self.stdout.write(self.style.SUCCESS(f"{count} change log entries removed."))
@@ -0,0 +1,83 @@
+import multiprocessing
+import signal
+import textwrap
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = textwrap.dedent(
+        """
+        Run the jobs of the queue (see `core.jobs`), in worker processes.
+
+        Each worker takes the oldest pending job, runs it, and takes the next one. Workers
+        do not wait for each other (`SELECT ... FOR UPDATE SKIP LOCKED`), any number of them
+        can run, on any number of hosts. On SIGINT or SIGTERM, workers stop after their
+        current job.
+    """
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=getattr(settings, "JOBS_WORKER_PROCESSES", 1),
+            help="Number of worker processes.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Delay (in seconds) before checking an empty queue again.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Stop once the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        if processes < 1:
+            raise CommandError("At least one process is required.")
+
+        worker = Worker(poll_interval=options["poll_interval"], burst=options["burst"])
+        if processes == 1:
+            count = run_worker(worker)
+            self.stdout.write(self.style.SUCCESS(f"{count} job(s) run."))
+            return
+
+        # connections can not be shared with the forked processes
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        children = [
+            context.Process(target=run_worker, args=(worker,), name=f"worker-{index}")
+            for index in range(processes)
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f"{processes} workers started.")
+
+        def stop(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: stop after the current job
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:  # children got the SIGINT too
+            for child in children:
+                child.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
+
+
+def run_worker(worker):
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    return worker.run()
@@ -0,0 +1,86 @@
+import textwrap
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from ninja import NinjaAPI
+
+from core.api.openapi import get_openapi_document
+from core.schemas.factory import factory
+
+
+class Command(BaseCommand):
+    help = textwrap.dedent(
+        """
+        Build and validate the schemas of the API before the worker serves requests: the
+        validators and serializers deferred by `API_SCHEMAS_DEFER_BUILD`, the JSON schema of
+        each schema, and the OpenAPI document of the given APIs (stored in
+        `API_OPENAPI_CACHE_DIR` if not already generated for the current code).
+
+        The build duration of each schema (creation on import, and build by this command) is
+        reported, the slowest first.
+    """
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--api",
+            action="append",
+            default=[],
+            help="Dotted path of a ninja API whose OpenAPI document is generated "
+            "(e.g. totem.api.api_v1). Can be repeated.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="Number of schemas in the report (0 for all).",
+        )
+
+    def handle(self, *args, **options):
+        apis = []
+        for path in options["api"]:
+            try:
+                api = import_string(path)
+            except ImportError as exc:
+                raise CommandError(str(exc)) from exc
+            if not isinstance(api, NinjaAPI):
+                raise CommandError(f"{path} is not a ninja API.")
+            apis.append((path, api))
+
+        # the schemas are created on the import of the views
+        import_module(settings.ROOT_URLCONF)
+
+        results = []
+        for key, schema in list(factory.schemas.items()):
+            start = time.perf_counter()
+            if not schema.__pydantic_complete__:
+                schema.model_rebuild(force=True, raise_errors=True)
+            schema.model_json_schema()
+            duration = time.perf_counter() - start
+            results.append((schema, factory.build_times.get(key, 0.0), duration))
+
+        results.sort(key=lambda result: result[1] + result[2], reverse=True)
+        top = options["top"] or len(results)
+        self.stdout.write(f"{'schema':<48} {'import (ms)':>12} {'build (ms)':>11}")
+        for schema, import_duration, duration in results[:top]:
+            name = f"{schema.__module__}.{schema.__name__}"
+            self.stdout.write(
+                f"{name:<48} {import_duration * 1000:>12.2f} {duration * 1000:>11.2f}"
+            )
+        self.stdout.write(
+            f"{len(results)} schemas: "
+            f"{sum(result[1] for result in results) * 1000:.1f} ms on import, "
+            f"{sum(result[2] for result in results) * 1000:.1f} ms built"
+        )
+
+        for path, api in apis:
+            start = time.perf_counter()
+            document = get_openapi_document(api)
+            self.stdout.write(
+                f"{path}: OpenAPI document {document.etag} ready in "
+                f"{(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS("Schemas ready."))
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.10 on 2026-10-19 11:07
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Name of the registered function running the job.', max_length=255, verbose_name='Name')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='PENDING', max_length=16, verbose_name='Status')),
+                ('params', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Parameters')),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Percentage of the job done.', verbose_name='Progress')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Result')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')),
+                ('create_date', models.DateTimeField(auto_now_add=True, verbose_name='Creation Date')),
+                ('start_date', models.DateTimeField(blank=True, null=True, verbose_name='Start Date')),
+                ('end_date', models.DateTimeField(blank=True, null=True, verbose_name='End Date')),
+                ('user', models.ForeignKey(blank=True, help_text='User having launched the job.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Job',
+                'verbose_name_plural': 'Jobs',
+                'indexes': [models.Index(condition=models.Q(('status__in', ['PENDING', 'RUNNING'])), fields=['create_date'], name='core_job_queue_idx')],
+            },
+        ),
+    ]
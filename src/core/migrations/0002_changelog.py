@@ -0,0 +1,29 @@
+# Generated by Django 5.0.10 on 2026-10-19 11:13
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=100, verbose_name='Model')),
+                ('object_id', models.CharField(max_length=64, verbose_name='Object ID')),
+                ('deleted', models.BooleanField(default=False, help_text='The record was deleted (tombstone).', verbose_name='Deleted')),
+                ('txid', models.BigIntegerField(db_default=django.db.models.expressions.RawSQL('pg_current_xact_id()::text::bigint', []), verbose_name='Transaction ID')),
+            ],
+            options={
+                'verbose_name': 'Change Log Entry',
+                'verbose_name_plural': 'Change Log',
+                'indexes': [models.Index(fields=['model', 'txid', 'id'], name='core_changelog_feed_idx'), models.Index(fields=['model', 'object_id'], name='core_changelog_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.10 on 2026-10-19 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Key')),
+                ('request_hash', models.CharField(help_text='Hash of the method, path and body.', max_length=64, verbose_name='Request Hash')),
+                ('pending', models.CharField(blank=True, help_text='Token of the attempt processing the write, until it is finished.', max_length=32, null=True, verbose_name='Pending Attempt')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Status Code')),
+                ('headers', models.JSONField(blank=True, default=list, verbose_name='Headers')),
+                ('content', models.BinaryField(blank=True, null=True, verbose_name='Content')),
+                ('expire_date', models.DateTimeField(db_index=True, verbose_name='Expiration Date')),
+            ],
+            options={
+                'verbose_name': 'Idempotency Key',
+                'verbose_name_plural': 'Idempotency Keys',
+            },
+        ),
+    ]
@@ -0,0 +1,3 @@
+from .change_log import *
+from .idempotency import *
+from .job import *
@@ -0,0 +1,81 @@
+from django.db import connections, models
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+
+# ---------------------------------------------------------------
+# Change Log
+# ---------------------------------------------------------------
+
+# Identifier of the current transaction (assigned if needed), and of the oldest transaction
+# still running: all transactions with a lower identifier are finished.
+CURRENT_TRANSACTION_SQL = "pg_current_xact_id()::text::bigint"
+OLDEST_TRANSACTION_SQL = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+
+class ChangeLogQuerySet(models.QuerySet):
+
+    def record(self, model, pks, deleted=False):
+        """Append an entry for each of the given records of the model."""
+        label = model._meta.label_lower
+        return self.bulk_create(
+            [
+                ChangeLog(model=label, object_id=str(pk), deleted=deleted)
+                for pk in dict.fromkeys(pks)
+            ]
+        )
+
+    def get_oldest_transaction(self):
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(f"SELECT {OLDEST_TRANSACTION_SQL}")
+            return cursor.fetchone()[0]
+
+    def finished(self, oldest_transaction):
+        """Entries of the transactions older than the given one (all finished), and of the
+        current transaction.
+        """
+        return self.filter(
+            Q(txid__lt=oldest_transaction)
+            | Q(txid=RawSQL(
+                "pg_current_xact_id_if_assigned()::text::bigint", []
+            ))
+        )
+
+    def after(self, txid, pk):
+        return self.filter(Q(txid__gt=txid) | Q(txid=txid, pk__gt=pk))
+
+    def compact(self):
+        """Remove the entries having a newer entry for the same record. Return the number of
+        removed entries.
+        """
+        newer = ChangeLog.objects.filter(
+            model=OuterRef("model"), object_id=OuterRef("object_id")
+        ).filter(
+            Q(txid__gt=OuterRef("txid")) | Q(txid=OuterRef("txid"), pk__gt=OuterRef("pk"))
+        )
+        count, dummy = self.filter(Exists(newer)).delete()
+        return count
+
+
+class ChangeLog(models.Model):
+    """Append-only log of the changes of records (see `core.changes`). Entries are ordered by
+    transaction then identifier, as they become visible to readers.
+    """
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField("Model", max_length=100, null=False, blank=False)
+    object_id = models.CharField("Object ID", max_length=64, null=False, blank=False)
+    deleted = models.BooleanField(
+        "Deleted", default=False, help_text="The record was deleted (tombstone)."
+    )
+    txid = models.BigIntegerField(
+        "Transaction ID", db_default=RawSQL(CURRENT_TRANSACTION_SQL, [])
+    )
+
+    objects = ChangeLogQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Change Log Entry"
+        verbose_name_plural = "Change Log"
+        indexes = [
+            models.Index(fields=["model", "txid", "id"], name="core_changelog_feed_idx"),
+            models.Index(fields=["model", "object_id"], name="core_changelog_object_idx"),
+        ]
@@ -0,0 +1,41 @@
+from django.db import models
+from django.utils import timezone
+
+# ---------------------------------------------------------------
+# Idempotency Key
+# ---------------------------------------------------------------
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+
+    def alive(self):
+        return self.filter(expire_date__gt=timezone.now())
+
+    def clear_expired(self):
+        """Remove the expired entries. Return the number of removed entries."""
+        count, dummy = self.filter(expire_date__lte=timezone.now()).delete()
+        return count
+
+
+class IdempotencyKey(models.Model):
+    """Write processed for an `Idempotency-Key` request header, and its response (see
+    `core.api.idempotency`). Stored in the database, so all the processes share them.
+    """
+    key = models.CharField("Key", max_length=255, primary_key=True)
+    request_hash = models.CharField(
+        "Request Hash", max_length=64, help_text="Hash of the method, path and body."
+    )
+    pending = models.CharField(
+        "Pending Attempt", max_length=32, null=True, blank=True,
+        help_text="Token of the attempt processing the write, until it is finished."
+    )
+    status_code = models.PositiveSmallIntegerField("Status Code", null=True, blank=True)
+    headers = models.JSONField("Headers", default=list, blank=True)
+    content = models.BinaryField("Content", null=True, blank=True)
+    expire_date = models.DateTimeField("Expiration Date", db_index=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Idempotency Key"
+        verbose_name_plural = "Idempotency Keys"
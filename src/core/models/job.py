@@ -0,0 +1,107 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.choices import JobStatus
+
+# ---------------------------------------------------------------
+# Job
+# ---------------------------------------------------------------
+
+
+class JobQuerySet(models.QuerySet):
+
+    def fetch(self):
+        """Take the oldest job to run, and mark it as running. Jobs being taken by other
+        workers are skipped (`FOR UPDATE SKIP LOCKED`), so workers never wait for each other.
+        Running jobs older than `JOBS_TIMEOUT` seconds (worker killed) are taken again, up to
+        `JOBS_MAX_ATTEMPTS` attempts.
+        """
+        now = timezone.now()
+        stale_date = now - timedelta(seconds=getattr(settings, "JOBS_TIMEOUT", 3600))
+        max_attempts = getattr(settings, "JOBS_MAX_ATTEMPTS", 3)
+
+        while True:
+            with transaction.atomic():
+                job = (
+                    self.select_for_update(skip_locked=True)
+                    .filter(
+                        Q(status=JobStatus.PENDING)
+                        | Q(status=JobStatus.RUNNING, start_date__lt=stale_date)
+                    )
+                    .order_by("create_date")
+                    .first()
+                )
+                if job is None:
+                    return None
+
+                if job.attempts >= max_attempts:
+                    job.status = JobStatus.FAILED
+                    job.error = "The job was interrupted too many times."
+                    job.end_date = now
+                    job.save(update_fields=["status", "error", "end_date"])
+                    continue
+
+                job.status = JobStatus.RUNNING
+                job.start_date = now
+                job.attempts = F("attempts") + 1
+                job.save(update_fields=["status", "start_date", "attempts"])
+                job.refresh_from_db(fields=["attempts"])
+                return job
+
+
+class Job(models.Model):
+    id = models.UUIDField(
+        default=uuid.uuid4, editable=False, null=False, primary_key=True
+    )
+    name = models.CharField(
+        "Name", max_length=255, null=False, blank=False,
+        help_text="Name of the registered function running the job."
+    )
+    status = models.CharField(
+        "Status", max_length=16, choices=JobStatus.choices, default=JobStatus.PENDING
+    )
+    params = models.JSONField(
+        "Parameters", default=dict, blank=True, encoder=DjangoJSONEncoder
+    )
+    progress = models.PositiveSmallIntegerField(
+        "Progress", default=0, help_text="Percentage of the job done."
+    )
+    result = models.JSONField(
+        "Result", null=True, blank=True, encoder=DjangoJSONEncoder
+    )
+    error = models.TextField("Error", blank=True, default="")
+    attempts = models.PositiveSmallIntegerField("Attempts", default=0)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="+", verbose_name="User", help_text="User having launched the job."
+    )
+    create_date = models.DateTimeField("Creation Date", auto_now_add=True)
+    start_date = models.DateTimeField("Start Date", null=True, blank=True)
+    end_date = models.DateTimeField("End Date", null=True, blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        indexes = [
+            # queue of the workers
+            models.Index(
+                fields=["create_date"],
+                condition=Q(status__in=[JobStatus.PENDING, JobStatus.RUNNING]),
+                name="core_job_queue_idx",
+            ),
+        ]
+
+    def set_progress(self, done, total=100):
+        """Report the progress of the job. Progress saved inside a transaction is visible
+        once committed.
+        """
+        self.progress = min(100, int(done * 100 / total)) if total else 100
+        Job.objects.filter(pk=self.pk).update(progress=self.progress)
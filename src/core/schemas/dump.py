@@ -0,0 +1,332 @@
+"""
+Serialization of model instances with a function generated for each schema, giving the
+same result as `Schema.model_validate(instance).model_dump(mode="json")` without the
+generic attribute resolution and validation of pydantic.
+
+The function reads the attributes of the instance directly, and converts the values of the
+common types (strings, numbers, UUIDs, dates, enumerations) in place. Relations given as
+lookup values (`core.schemas.relations`) are read without loading the related objects when
+possible (`page_id` instead of `page.pk`), and nested schemas are dumped with their own
+function. Any other value (or value of an unexpected type) is converted by pydantic, field by
+field, so the result is always the one of the schema.
+
+The values of the instance are not validated: they are expected to be valid for the schema,
+as read from the database.
+
+Only schemas without resolvers, validators, serializers or aliases are supported:
+`get_dump_function` returns None for the others.
+"""
+import datetime
+import math
+import typing as t
+from enum import Enum
+from uuid import UUID
+
+import annotated_types
+from django.db.models import Manager, Model, QuerySet
+from django.db.models.fields.files import FieldFile
+from pydantic import BaseModel, TypeAdapter
+from pydantic.fields import FieldInfo
+from pydantic.types import UuidVersion
+from pydantic_core import to_jsonable_python
+
+from .factory import factory
+from .relations import ForeignKey, QuerySetField, _get_lookup_field_instance
+
+__all__ = [
+    "DumpFunction",
+    "get_dump_function",
+]
+
+DumpFunction = t.Callable[[t.Any], t.Dict[str, t.Any]]
+
+# configuration of the schemas supported (other options may change the serialization)
+SUPPORTED_CONFIG = {"from_attributes", "defer_build", "title"}
+
+# types of the values given as is
+SCALAR_TYPES = (str, int, bool)
+
+# generated functions by schema, None for the schemas not supported
+_dump_functions: t.Dict[t.Type[BaseModel], t.Optional[DumpFunction]] = {}
+
+
+def get_dump_function(schema: t.Type[BaseModel]) -> t.Optional[DumpFunction]:
+    """Function dumping a model instance as `schema.model_validate(instance)
+    .model_dump(mode="json")` does, generated on the first call.
+    """
+    if schema not in _dump_functions:
+        # a schema nested in itself is dumped by pydantic
+        _dump_functions[schema] = None
+        _dump_functions[schema] = _DumpFunctionBuilder(schema).build()
+    return _dump_functions[schema]
+
+
+def _get_schema_model(schema: t.Type[BaseModel]) -> t.Optional[t.Type[Model]]:
+    for key, factory_schema in factory.schemas.items():
+        if factory_schema is schema:
+            return key[0]
+    return None
+
+
+def _is_supported(schema: t.Type[BaseModel]) -> bool:
+    if getattr(schema, "_ninja_resolvers", None):
+        return False
+    if not schema.model_config.get("from_attributes"):
+        return False
+    if set(schema.model_config) - SUPPORTED_CONFIG:
+        return False
+    decorators = schema.__pydantic_decorators__
+    model_validators = set(decorators.model_validators) - {"_run_root_validator"}
+    if (
+        model_validators
+        or decorators.validators
+        or decorators.field_validators
+        or decorators.root_validators
+        or decorators.field_serializers
+        or decorators.model_serializers
+        or decorators.computed_fields
+    ):
+        return False
+    return not any(
+        field_info.alias
+        or field_info.validation_alias
+        or field_info.serialization_alias
+        or field_info.exclude
+        for field_info in schema.model_fields.values()
+    )
+
+
+def _unwrap(annotation: t.Any) -> t.Tuple[t.Any, bool, t.List[t.Any]]:
+    """Type of the annotation without `Optional` and `Annotated`: (type, optional, metadata)."""
+    optional = False
+    metadata = []
+    while True:
+        origin = t.get_origin(annotation)
+        args = t.get_args(annotation)
+        if origin is t.Annotated:
+            annotation = args[0]
+            metadata.extend(args[1:])
+        elif origin is t.Union and type(None) in args and len(args) == 2:
+            optional = True
+            annotation = next(arg for arg in args if arg is not type(None))
+        else:
+            return annotation, optional, metadata
+
+
+def _is_constraint(metadata: t.Any) -> bool:
+    """Whether the metadata only validates the value (no conversion)."""
+    return isinstance(metadata, (annotated_types.BaseMetadata, UuidVersion))
+
+
+def _convert_attribute(value: t.Any) -> t.Any:
+    """Value given to pydantic for an attribute, as by `ninja.schema.DjangoGetter`."""
+    if isinstance(value, Manager):
+        return list(value.all())
+    if isinstance(value, QuerySet):
+        return list(value)
+    if callable(value):
+        return value()
+    if isinstance(value, FieldFile):
+        return value.url if value else None
+    return value
+
+
+class _FieldConverter:
+    """Conversion of a value by pydantic, as done for the field by its schema."""
+
+    def __init__(self, field_info: FieldInfo):
+        self.field_info = field_info
+        self._adapter: t.Optional[TypeAdapter] = None
+
+    @property
+    def adapter(self) -> TypeAdapter:
+        # only built for the fields having values of unexpected types
+        if self._adapter is None:
+            annotation = self.field_info.annotation
+            if self.field_info.metadata:
+                annotation = t.Annotated[(annotation, *self.field_info.metadata)]
+            self._adapter = TypeAdapter(annotation)
+        return self._adapter
+
+    def __call__(self, value: t.Any) -> t.Any:
+        value = self.adapter.validate_python(_convert_attribute(value), from_attributes=True)
+        return self.adapter.dump_python(value, mode="json")
+
+
+def _dump_key(value: t.Any) -> t.Any:
+    """Lookup value of a relation, as serialized by its field (`core.schemas.relations`)."""
+    if value.__class__ in SCALAR_TYPES:
+        return value
+    if value.__class__ is UUID:
+        return str(value)
+    return to_jsonable_python(value)
+
+
+def _dump_datetime(value: datetime.datetime, convert: _FieldConverter) -> t.Any:
+    if value.tzinfo is None:
+        return value.isoformat()
+    if value.tzinfo is datetime.timezone.utc:
+        # pydantic gives `Z` for UTC
+        return f"{value.replace(tzinfo=None).isoformat()}Z"
+    return convert(value)
+
+
+class _DumpFunctionBuilder:
+    """Generate the source code of the dump function of a schema, and compile it."""
+
+    def __init__(self, schema: t.Type[BaseModel]):
+        self.schema = schema
+        self.model = _get_schema_model(schema)
+        self.namespace: t.Dict[str, t.Any] = {
+            "FieldFile": FieldFile,
+            "Manager": Manager,
+            "Model": Model,
+            "UUID": UUID,
+            "date": datetime.date,
+            "datetime": datetime.datetime,
+            "isfinite": math.isfinite,
+            "dump_datetime": _dump_datetime,
+            "dump_key": _dump_key,
+            "fallback": self._fallback,
+        }
+
+    def _fallback(self, obj: t.Any) -> t.Dict[str, t.Any]:
+        return self.schema.model_validate(obj).model_dump(mode="json")
+
+    def build(self) -> t.Optional[DumpFunction]:
+        if not _is_supported(self.schema):
+            return None
+
+        reads, items = [], []
+        for index, (fname, field_info) in enumerate(self.schema.model_fields.items()):
+            self.namespace[f"convert{index}"] = _FieldConverter(field_info)
+            attribute, expression = self._get_field_code(fname, field_info, index)
+            reads.append(f"        v{index} = obj.{attribute}")
+            items.append(f"            {fname!r}: {expression},")
+
+        source = "\n".join(
+            [
+                "def dump(obj):",
+                "    try:",
+                *reads,
+                "        return {",
+                *items,
+                "        }",
+                "    except AttributeError:",
+                "        return fallback(obj)",
+            ]
+        )
+        code = compile(source, f"<dump {self.schema.__module__}.{self.schema.__name__}>", "exec")
+        exec(code, self.namespace)  # pylint: disable=exec-used
+        function = self.namespace["dump"]
+        function.__qualname__ = function.__name__ = f"dump_{self.schema.__name__}"
+        function.__source__ = source
+        return function
+
+    def _get_field_code(
+        self, fname: str, field_info: FieldInfo, index: int
+    ) -> t.Tuple[str, str]:
+        """Attribute read on the instance, and expression of its dumped value (`v<index>`)."""
+        value, convert = f"v{index}", f"convert{index}"
+        annotation, optional, metadata = _unwrap(field_info.annotation)
+        metadata.extend(field_info.metadata)
+        if not all(_is_constraint(item) for item in metadata):
+            return fname, f"{convert}({value})"
+
+        attribute = fname
+        if isinstance(annotation, type) and issubclass(annotation, ForeignKey):
+            attribute, expression = self._get_foreignkey_code(fname, annotation, index)
+        elif isinstance(annotation, type) and issubclass(annotation, QuerySetField):
+            lookup = _get_lookup_field_instance(annotation.model, annotation.lookup_field)
+            expression = (
+                f"[dump_key(item.{lookup.name}) for item in {value}.all()] "
+                f"if isinstance({value}, Manager) else {convert}({value})"
+            )
+        elif t.get_origin(annotation) in (list, t.List) and self._get_nested_dump(
+            t.get_args(annotation)[0], index
+        ):
+            expression = (
+                f"[dump{index}(item) for item in {value}.all()] "
+                f"if isinstance({value}, Manager) else {convert}({value})"
+            )
+        elif isinstance(annotation, type) and self._get_nested_dump(annotation, index):
+            expression = (
+                f"dump{index}({value}) if isinstance({value}, Model) else {convert}({value})"
+            )
+        else:
+            expression = self._get_scalar_code(annotation, optional, index)
+
+        if optional:
+            expression = f"None if {value} is None else ({expression})"
+        return attribute, expression
+
+    def _get_foreignkey_code(
+        self, fname: str, annotation: t.Type[ForeignKey], index: int
+    ) -> t.Tuple[str, str]:
+        value, convert = f"v{index}", f"convert{index}"
+        model_field = None
+        if self.model is not None:
+            model_field = next(
+                (f for f in self.model._meta.concrete_fields if f.name == fname), None
+            )
+        lookup = _get_lookup_field_instance(annotation.model, annotation.lookup_field)
+        if (
+            model_field is not None
+            and (model_field.many_to_one or model_field.one_to_one)
+            and model_field.target_field == lookup
+            and lookup.primary_key
+        ):
+            # the key is the lookup value: the related object is not loaded
+            return model_field.attname, (
+                f"dump_key({value}) if {value} is not None else {convert}({value})"
+            )
+        return fname, (
+            f"dump_key({value}.{annotation.lookup_field}) "
+            f"if isinstance({value}, Model) else {convert}({value})"
+        )
+
+    def _get_nested_dump(self, annotation: t.Any, index: int) -> bool:
+        if not (isinstance(annotation, type) and issubclass(annotation, BaseModel)):
+            return False
+        function = get_dump_function(annotation)
+        if function is None:
+            return False
+        self.namespace[f"dump{index}"] = function
+        return True
+
+    def _get_scalar_code(self, annotation: t.Any, optional: bool, index: int) -> str:
+        value, convert = f"v{index}", f"convert{index}"
+        if annotation is str and optional:
+            # files are given as their url (see `_convert_attribute`)
+            return (
+                f"{value} if {value}.__class__ is str else ({value}.url if {value} else None) "
+                f"if isinstance({value}, FieldFile) else {convert}({value})"
+            )
+        if annotation in SCALAR_TYPES:
+            return f"{value} if {value}.__class__ is {annotation.__name__} else {convert}({value})"
+        if annotation is float:
+            # pydantic gives None for infinite values
+            return (
+                f"{value} if {value}.__class__ is float and isfinite({value}) "
+                f"else {convert}({value})"
+            )
+        if annotation is UUID:
+            return f"str({value}) if {value}.__class__ is UUID else {convert}({value})"
+        if annotation is datetime.datetime:
+            return (
+                f"dump_datetime({value}, {convert}) if {value}.__class__ is datetime "
+                f"else {convert}({value})"
+            )
+        if annotation is datetime.date:
+            return f"{value}.isoformat() if {value}.__class__ is date else {convert}({value})"
+        if isinstance(annotation, type) and issubclass(annotation, Enum):
+            self.namespace[f"values{index}"] = frozenset(
+                member.value
+                for member in annotation
+                if member.value.__class__ in SCALAR_TYPES
+            )
+            return (
+                f"{value} if {value}.__class__ in (str, int) and {value} in values{index} "
+                f"else {convert}({value})"
+            )
+        return f"{convert}({value})"
@@ -1,6 +1,8 @@
 import itertools
+import time
 from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Type, Union, cast
 
+from django.conf import settings
 from django.db.models import Field as DjangoField
 from django.db.models import ManyToManyRel, ManyToOneRel, Model
 from ninja.errors import ConfigError
@@ -18,6 +20,17 @@ class SchemaFactory:
     def __init__(self) -> None:
         self.schemas: Dict[SchemaKey, Type[Schema]] = {}
         self.schema_names: Set[str] = set()
+        # duration (in seconds) of the creation of each schema
+        self.build_times: Dict[SchemaKey, float] = {}
+
+    @property
+    def defer_build(self) -> bool:
+        "whether the validators and serializers of the schemas are built on first use"
+        return getattr(settings, "API_SCHEMAS_DEFER_BUILD", False)
+
+    def get_class_kwargs(self) -> Dict[str, Any]:
+        "returns the pydantic config kwargs of the created classes"
+        return {"defer_build": True} if self.defer_build else {}
 
     def create_schema(
         self,
@@ -67,12 +80,14 @@ class SchemaFactory:
         if name in self.schema_names:
             name = self._get_unique_name(name)
 
+        start = time.perf_counter()
         schema: Type[Schema] = create_pydantic_model(
             name,
             __config__=None,
             __base__=base_class,
             __module__=base_class.__module__,
             __validators__={},
+            __cls_kwargs__=self.get_class_kwargs(),
             **definitions,
         )  # type: ignore
         # __model_name: str,
@@ -83,6 +98,7 @@ class SchemaFactory:
         # __validators__: dict[str, AnyClassMethod] | None = None,
         # __cls_kwargs__: dict[str, Any] | None = None,
         # **field_definitions: Any,
+        self.build_times[key] = time.perf_counter() - start
         self.schemas[key] = schema
         self.schema_names.add(name)
         return schema
@@ -5,7 +5,7 @@ from ninja.errors import ConfigError
 from ninja.schema import ResolverMetaclass, Schema
 from pydantic.dataclasses import dataclass
 
-from .factory import create_schema
+from .factory import create_schema, factory
 
 _is_modelschema_class_defined = False
 
@@ -65,6 +65,9 @@ class ModelSchemaMetaclass(ResolverMetaclass):
         namespace: dict,
         **kwargs,
     ):
+        if _is_modelschema_class_defined and ModelSchema in bases:
+            # only the base class of the schema created by the factory
+            kwargs = {**factory.get_class_kwargs(), **kwargs}
         cls = super().__new__(
             mcs,
             name,
@@ -1,9 +1,32 @@
 # pylint: disable=protected-access,unused-argument
-from typing import Any, Callable, List, Optional, TypeVar, Union
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models as django_models
-from pydantic import GetJsonSchemaHandler, SerializationInfo, TypeAdapter
+from pydantic import (
+    BaseModel,
+    GetJsonSchemaHandler,
+    SerializationInfo,
+    TypeAdapter,
+    ValidationError,
+)
 from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import core_schema as cs
 
@@ -24,6 +47,7 @@ def _get_lookup_field_instance(model_class, lookup_field):
     return model_class._meta.get_field(lookup_fname)
 
 
+@lru_cache(maxsize=None)
 def _get_lookup_field_type_adapter(model_class, lookup_field):
     # avoid circular dependency
     from .fields import convert_db_field  # pylint: disable=wrong-import-position
@@ -34,11 +58,28 @@ def _get_lookup_field_type_adapter(model_class, lookup_field):
     return TypeAdapter(python_type)
 
 
+def get_relation_type(annotation: Any) -> Optional[type]:
+    """Return the `ForeignKey` or `QuerySetField` class of the given annotation (unwrapping
+    `Optional`, `Annotated`, ...), or None if it is not a relation.
+    """
+    if isinstance(annotation, type) and issubclass(
+        annotation, (ForeignKey, QuerySetField)
+    ):
+        return annotation
+    for arg in get_args(annotation):
+        relation_type = get_relation_type(arg)
+        if relation_type is not None:
+            return relation_type
+    return None
+
+
 # ----------------------------------------------------------------
 # Many-to-One (ForeignKey)
 # ----------------------------------------------------------------
 
 
+# one class per relation, shared by the schemas
+@lru_cache(maxsize=None)
 def create_foreignkey_field(model_class, optional: bool, lookup_fname: str = None):
     lookup_fname = lookup_fname or "pk"  # force not None
 
@@ -72,6 +113,13 @@ class ForeignKey:
         # Input is PK (or slug field)
 
         def validate_from_pk(value: Any) -> django_models.Model:
+            resolver = _resolver.get()
+            if resolver is not None:
+                result = resolver.get(cls.model, cls.lookup_field, value)
+                if result is None:
+                    raise ValueError(f"No {cls.model._meta.verbose_name.lower()} found.")
+                return result
+
             queryset = cls.model.objects.all()  # TODO allow customizing queryset
             try:
                 result = queryset.get(**{cls.lookup_field: value})
@@ -113,17 +161,157 @@ class ForeignKey:
         )
 
 
+# ----------------------------------------------------------------
+# Batched resolution of the foreign keys
+# ----------------------------------------------------------------
+
+# (model, lookup field) of a `ForeignKey` field
+RelationKey = Tuple[Type[django_models.Model], str]
+
+_resolver: ContextVar[Optional["ForeignKeyResolver"]] = ContextVar(
+    "foreignkey_resolver", default=None
+)
+
+
+class ForeignKeyResolver:
+    """Identity map of the instances referenced by the `ForeignKey` fields: values of the
+    same model are loaded with a single query (`prefetch`), and each instance is loaded once.
+    """
+
+    def __init__(self):
+        # instance (None when not found) by lookup value, for each relation
+        self.instances: Dict[RelationKey, Dict[Any, Optional[django_models.Model]]] = {}
+
+    def prefetch(self, keys: Dict[RelationKey, List[Any]]) -> None:
+        """Load the instances of the given lookup values (as received, not yet validated),
+        with one query per relation.
+        """
+        for (model_class, lookup_field), values in keys.items():
+            adapter = _get_lookup_field_type_adapter(model_class, lookup_field)
+            lookups = set()
+            for value in values:
+                try:
+                    lookups.add(adapter.validate_python(value))
+                except (ValidationError, TypeError):
+                    continue  # invalid value, reported by the validation
+            self._load(model_class, lookup_field, lookups)
+
+    def get(
+        self, model_class: Type[django_models.Model], lookup_field: str, value: Any
+    ) -> Optional[django_models.Model]:
+        """Instance of the given lookup value (validated), or None if it does not exist."""
+        instances = self.instances.get((model_class, lookup_field), {})
+        if value not in instances:
+            self._load(model_class, lookup_field, {value})
+            instances = self.instances[(model_class, lookup_field)]
+        return instances[value]
+
+    def _load(
+        self, model_class: Type[django_models.Model], lookup_field: str, values: set
+    ) -> None:
+        instances = self.instances.setdefault((model_class, lookup_field), {})
+        values = values - instances.keys()
+        if not values:
+            return
+        attname = _get_lookup_field_instance(model_class, lookup_field).attname
+        queryset = model_class.objects.filter(**{f"{lookup_field}__in": values})
+        for instance in queryset:
+            instances[getattr(instance, attname)] = instance
+        for value in values:
+            instances.setdefault(value, None)
+
+
+@contextmanager
+def resolve_foreign_keys() -> Iterator[ForeignKeyResolver]:
+    """Resolve the `ForeignKey` fields validated in this context with the same identity map
+    (the one of the enclosing context, if any).
+    """
+    resolver = _resolver.get()
+    if resolver is not None:
+        yield resolver
+        return
+    resolver = ForeignKeyResolver()
+    token = _resolver.set(resolver)
+    try:
+        yield resolver
+    finally:
+        _resolver.reset(token)
+
+
+def collect_foreign_keys(
+    annotation: Any, data: Any, keys: Optional[Dict[RelationKey, List[Any]]] = None
+) -> Dict[RelationKey, List[Any]]:
+    """Lookup values of the `ForeignKey` fields in the given data (not validated yet), to
+    validate according to the annotation (schema, list of schemas, ...), by relation.
+    """
+    if keys is None:
+        keys = {}
+    if data is None:
+        return keys
+
+    if isinstance(annotation, type):
+        if issubclass(annotation, ForeignKey):
+            if not isinstance(data, (django_models.Model, dict, list)):
+                keys.setdefault((annotation.model, annotation.lookup_field), []).append(data)
+        elif issubclass(annotation, BaseModel) and isinstance(data, dict):
+            for name, field in annotation.model_fields.items():
+                alias = field.validation_alias
+                key = alias if isinstance(alias, str) else (field.alias or name)
+                if key in data:
+                    collect_foreign_keys(field.annotation, data[key], keys)
+        return keys
+
+    origin = get_origin(annotation)
+    if origin in (list, set, frozenset, tuple):
+        if isinstance(data, (list, tuple)):
+            for arg in get_args(annotation)[:1]:
+                for item in data:
+                    collect_foreign_keys(arg, item, keys)
+    elif origin is not dict:
+        # Optional, Union, Annotated...
+        for arg in get_args(annotation):
+            collect_foreign_keys(arg, data, keys)
+    return keys
+
+
 # ----------------------------------------------------------------
 # Many-to-Many (Queryset)
 # ----------------------------------------------------------------
 
-def create_queryset_field(model_class, optional: bool, lookup_fname: str = None):
+class QuerySetDelta(NamedTuple):
+    """Changes of a many-to-many relation, given as `{"add": [...], "remove": [...]}` instead
+    of the whole list of values.
+    """
+
+    add: django_models.QuerySet  # related objects to add (evaluated)
+    remove: List[Any]  # primary keys of the related objects to remove
+
+
+def _get_delta_schema(pk_schema: cs.CoreSchema) -> cs.CoreSchema:
+    return cs.typed_dict_schema(
+        {
+            "add": cs.typed_dict_field(cs.list_schema(pk_schema), required=False),
+            "remove": cs.typed_dict_field(cs.list_schema(pk_schema), required=False),
+        },
+        extra_behavior="forbid",
+    )
+
+
+@lru_cache(maxsize=None)
+def create_queryset_field(
+    model_class, optional: bool, lookup_fname: str = None, changes: bool = False
+):
+    """Field of a many-to-many relation, given as the list of the lookup values of the related
+    objects. With `changes`, the changes of the relation (`{"add": [...], "remove": [...]}`)
+    are also accepted, for the partial updates.
+    """
 
     lookup_fname = lookup_fname or "pk"  # force not None
 
     class QuerySetFieldLink(QuerySetField):
         model = model_class
         lookup_field = lookup_fname
+        accept_changes = changes
 
     if optional:
         return Optional[QuerySetFieldLink]
@@ -134,6 +322,8 @@ class QuerySetField:
 
     model: T = None
     lookup_field: str = "pk"
+    # `QuerySetDelta` accepted (see `create_queryset_field`)
+    accept_changes: bool = False
 
     @classmethod
     def __get_pydantic_core_schema__(
@@ -158,8 +348,9 @@ class QuerySetField:
             # if needed
             q_expr = django_models.Q(**{f"{lookup_field.name}__in": values})
             qs = model_class._default_manager.filter(q_expr)
-            objects = list(qs)
-            if len(objects) != len(values):
+            # Evaluate the queryset: its result cache is reused by the writes of the relation
+            # and the serialization, instead of querying the same rows again.
+            if len(qs) != len(set(values)):
                 raise ValueError("Some given values does not exists.")
             return qs
 
@@ -179,21 +370,16 @@ class QuerySetField:
 
         def validate_from_model_list(
             values: List[django_models.Model],
-        ) -> django_models.QuerySet:
+        ) -> List[django_models.Model]:
             if any(
                 not isinstance(v, model_class) for v in values
             ):  # pylint: disable=W1116
                 raise ValueError(
                     f"Expected list of {model_class.__class__.__name__} instances."
                 )
-            q_expr = django_models.Q(
-                **{
-                    f"{lookup_field.name}__in": [
-                        getattr(v, lookup_field.name) for v in values
-                    ]
-                }
-            )
-            return model_class._default_manager.filter(q_expr)
+            # Instances are given (e.g. prefetched relation): they are kept as is, so they are
+            # not queried again when written or serialized.
+            return list(values)
 
         from_model_list_schema = cs.chain_schema(
             [
@@ -202,25 +388,48 @@ class QuerySetField:
             ]
         )
 
+        # Input is the changes of the relation: {"add": List of PK, "remove": List of PK}
+
+        def validate_from_delta(values: Dict[str, List[Any]]) -> QuerySetDelta:
+            add = values.get("add", [])
+            remove = values.get("remove", [])
+            if set(add) & set(remove):
+                raise ValueError("Some given values are both added and removed.")
+            if lookup_field.primary_key:
+                remove_pks = list(remove)
+            else:
+                remove_pks = list(
+                    model_class._default_manager.filter(
+                        **{f"{lookup_field.name}__in": remove}
+                    ).values_list("pk", flat=True)
+                )
+            return QuerySetDelta(validate_from_pk_list(add), remove_pks)
+
+        from_delta_schema = cs.chain_schema(
+            [
+                _get_delta_schema(pk_schema),
+                cs.no_info_plain_validator_function(validate_from_delta),
+            ]
+        )
+
         def serialize_data(
-            qs: django_models.QuerySet,
+            qs: Union[django_models.QuerySet, QuerySetDelta],
             info: SerializationInfo,  # pylint: disable=unused-argument
-        ) -> List[Any]:
+        ) -> Union[List[Any], Dict[str, List[Any]]]:
+            if isinstance(qs, QuerySetDelta):
+                return {
+                    "add": [getattr(item, lookup_field.name) for item in qs.add],
+                    "remove": qs.remove,
+                }
             return [getattr(item, lookup_field.name) for item in qs]
 
+        json_schemas = [from_model_list_schema, from_pk_list_schema]
+        if cls.accept_changes:
+            json_schemas.append(from_delta_schema)
         return cs.json_or_python_schema(
-            json_schema=cs.union_schema(
-                [
-                    from_model_list_schema,
-                    from_pk_list_schema,
-                ]
-            ),
+            json_schema=cs.union_schema(json_schemas),
             python_schema=cs.union_schema(
-                [
-                    cs.is_instance_schema(django_models.QuerySet),
-                    from_model_list_schema,
-                    from_pk_list_schema,
-                ]
+                [cs.is_instance_schema(django_models.QuerySet), *json_schemas]
             ),
             serialization=cs.plain_serializer_function_ser_schema(
                 serialize_data, info_arg=True
@@ -237,7 +446,17 @@ class QuerySetField:
             pk_schema = _get_lookup_field_type_adapter(
                 cls.model, cls.lookup_field
             ).core_schema
-            json_schema = handler(cs.list_schema(pk_schema))
+            list_schema = cs.list_schema(pk_schema)
+            if cls.accept_changes:
+                json_schema = handler(
+                    cs.union_schema([list_schema, _get_delta_schema(pk_schema)])
+                )
+                json_schema["description"] = (
+                    "The whole list of values, or the changes of the relation: "
+                    '`{"add": [...], "remove": [...]}`.'
+                )
+            else:
+                json_schema = handler(list_schema)
         else:
             json_schema = handler(cs.list_schema(cs.any_schema()))
         return json_schema
@@ -13,7 +13,7 @@ class APITestCaseMixin:
         :param method: either GET, POST, PATCH, PUT or DELETE.
         :param token: string containing the bearer token to place in auth header.
         :param data: dict of value to put in the request body
-        :param params: GET parameters to add in the URL
+        :param params: GET parameters to add in the URL (lists give repeated parameters)
         :param headers: any additionnal header. String like `X_HTTP_MY_STUFF`
         """
         auth = {"HTTP_AUTHORIZATION": "Bearer " + token}
@@ -24,7 +24,7 @@ class APITestCaseMixin:
         url_parts = list(urlparse.urlparse(url))
         query = dict(urlparse.parse_qsl(url_parts[4]))
         query.update(params)
-        url_parts[4] = urlencode(query)
+        url_parts[4] = urlencode(query, doseq=True)
 
         url = urlparse.urlunparse(url_parts)  # /my-path/?param=value
         # do the request
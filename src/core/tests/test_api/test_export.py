@@ -0,0 +1,63 @@
+import json
+
+from django.test import SimpleTestCase
+from pydantic import BaseModel
+
+from core.api.export import _aiter_chunks, stream_export
+
+
+class ItemSchema(BaseModel):
+    id: int
+    name: str
+
+
+class StreamExportTest(SimpleTestCase):
+
+    def _iter_records(self, count):
+        for index in range(count):
+            self.read.append(index)
+            yield ItemSchema(id=index, name=f"item {index}")
+
+    def setUp(self):
+        self.read = []
+
+    def test_stream_sync(self):
+        response = stream_export(self._iter_records(3), "ndjson", ["id", "name"], "items")
+
+        self.assertFalse(response.is_async)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [0, 1, 2])
+
+    async def test_stream_async(self):
+        response = stream_export(
+            self._iter_records(5), "ndjson", ["id", "name"], "items", chunk_size=2, asynchronous=True
+        )
+        self.assertTrue(response.is_async)
+        stream = aiter(response.streaming_content)
+
+        # the records are read chunk by chunk, as sent
+        first = await anext(stream)
+        self.assertEqual([json.loads(line)["id"] for line in first.decode().splitlines()], [0, 1])
+        self.assertEqual(self.read, [0, 1])
+
+        rest = [chunk async for chunk in stream]
+        self.assertEqual(len(rest), 2)
+        self.assertEqual(self.read, [0, 1, 2, 3, 4])
+
+    async def test_stream_async_csv(self):
+        response = stream_export(
+            self._iter_records(2), "csv", ["id", "name"], "items", chunk_size=2, asynchronous=True
+        )
+
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(content.decode().splitlines(), ["id,name", "0,item 0", "1,item 1"])
+
+    async def test_stream_async_closed(self):
+        lines = (f"{index}\n" for index in range(5))
+        chunks = _aiter_chunks(lines, 2)
+
+        self.assertEqual(await anext(chunks), "0\n1\n")
+        await chunks.aclose()
+
+        # the cursor is released when the client is gone
+        self.assertEqual(list(lines), [])
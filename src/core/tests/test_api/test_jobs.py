@@ -0,0 +1,55 @@
+from django.test import TestCase
+from freezegun import freeze_time
+
+from core.choices import JobStatus
+from core.jobs import Worker, enqueue_job
+from core.testing import APITestCaseMixin
+from user.tests.test_api.common import CommonTestMixin
+
+from ..test_jobs import count_job # noqa (registers the job)
+
+JOB_ID_UNKNOWN = "0d6e3c43-6f8b-4f3c-9d6a-2a3e4b5c6d7e"
+
+
+@freeze_time("2024-11-18 11:12:13")
+class JobAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.job = enqueue_job("test.count", user=cls.user_frodon, items=["a", "b", "c"])
+        cls.url_detail = f"/api/v1/jobs/{cls.job.pk}/"
+
+    def test_read_response(self):
+        response = self.do_api_request(
+            self.url_detail, "GET", self.user_access_token_frodon.token
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["id"], str(self.job.pk))
+        self.assertEqual(data["status"], JobStatus.PENDING)
+        self.assertEqual(data["progress"], 0)
+        self.assertIsNone(data["result"])
+
+        Worker(burst=True).run()
+
+        response = self.do_api_request(
+            self.url_detail, "GET", self.user_access_token_frodon.token
+        )
+        data = response.json()
+
+        self.assertEqual(data["status"], JobStatus.SUCCEEDED)
+        self.assertEqual(data["progress"], 100)
+        self.assertEqual(data["result"], {"count": 3})
+        self.assertEqual(data["end_date"], "2024-11-18T11:12:13Z")
+
+    def test_read_other_user(self):
+        for url, token in [
+            (self.url_detail, self.user_access_token_gollum.token),
+            (self.url_detail, self.app_access_token.token),
+            (f"/api/v1/jobs/{JOB_ID_UNKNOWN}/", self.user_access_token_frodon.token),
+        ]:
+            response = self.do_api_request(url, "GET", token)
+            self.assertEqual(response.status_code, 404)
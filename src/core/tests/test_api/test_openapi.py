@@ -0,0 +1,110 @@
+import gzip
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from parameterized import parameterized
+
+from core.api import openapi
+from totem.api import api_v1
+
+
+class OpenAPIDocumentTest(TestCase):
+    url = "/api/v1/openapi.json"
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = Path(cache_dir.name)
+        settings_override = override_settings(API_OPENAPI_CACHE_DIR=cache_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # documents of the previous tests
+        documents = mock.patch.dict(openapi._documents, clear=True)
+        documents.start()
+        self.addCleanup(documents.stop)
+
+    def test_openapi_response(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        schema = json.loads(response.content)
+        self.assertEqual(schema["info"]["title"], "Totem API")
+        self.assertIn("/api/v1/users/", schema["paths"])
+
+        # stored compressed
+        files = list(self.cache_dir.glob("*.json.gz"))
+        self.assertEqual(len(files), 1)
+        self.assertEqual(gzip.decompress(files[0].read_bytes()), response.content)
+        self.assertEqual(response["ETag"], f'"{files[0].name.removesuffix(".json.gz")}"')
+
+    def test_openapi_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_openapi_gzip(self):
+        response = self.client.get(self.url)
+        content, etag = response.content, response["ETag"]
+
+        response = self.client.get(self.url, headers={"Accept-Encoding": "gzip, br"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), content)
+        # another representation, another strong ETag
+        self.assertEqual(response["ETag"], f'{etag[:-1]}-gzip"')
+
+        response = self.client.get(
+            self.url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @parameterized.expand(
+        [
+            ("gzip", True),
+            ("deflate, gzip;q=0.5", True),
+            ("GZIP", True),
+            ("*", True),
+            ("gzip;q=0", False),
+            ("gzip;q=0, *", False),
+            ("*;q=0", False),
+            ("br, deflate", False),
+            ("", False),
+        ]
+    )
+    def test_accepts_gzip(self, accept_encoding, expected):
+        self.assertEqual(openapi.accepts_gzip(accept_encoding), expected)
+
+    def test_openapi_stored(self):
+        document = openapi.get_openapi_document(api_v1)
+        openapi._documents.clear()
+
+        # read from the cache directory by the other workers, or after a restart
+        with mock.patch.object(openapi, "_generate") as generate:
+            self.assertEqual(openapi.get_openapi_document(api_v1), document)
+        generate.assert_not_called()
+
+    def test_openapi_code_changed(self):
+        document = openapi.get_openapi_document(api_v1)
+
+        with mock.patch.object(openapi, "get_code_fingerprint", return_value="changed"):
+            changed_document = openapi.get_openapi_document(api_v1)
+
+        self.assertNotEqual(changed_document.etag, document.etag)
+        self.assertEqual(changed_document.decompress(), document.decompress())
+        self.assertEqual(len(list(self.cache_dir.glob("*.json.gz"))), 2)
+
+    def test_openapi_not_stored(self):
+        with override_settings(API_OPENAPI_CACHE_DIR="/dev/null/openapi"):
+            with self.assertLogs(openapi.logger, "WARNING"):
+                response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
@@ -1,8 +1,13 @@
+from unittest import mock
+
 from django.core.exceptions import ValidationError
 from django.test import TestCase
+from lxml import etree
 from parameterized import parameterized
 
 from core import fields
+from core.validators import html_validation_cache
+from website.models import Page
 
 HTML_WITH_STYLE = """
 <div id="root">
@@ -134,3 +139,104 @@ class TestHTMLField(TestCase):
         else:
             with self.assertRaises(ValidationError):
                 f.clean(value, None)
+
+    def test_validation_cached(self):
+        html_validation_cache.clear()
+        f = fields.HtmlField()
+        other_f = fields.HtmlField(allow_class_attr=False)
+
+        with mock.patch("core.validators.etree.fromstring", wraps=etree.fromstring) as parse:
+            self.assertEqual(f.clean(HTML_WITH_STYLE, None), HTML_WITH_STYLE)
+            self.assertEqual(f.clean(HTML_WITH_STYLE, None), HTML_WITH_STYLE)
+            self.assertEqual(parse.call_count, 1)
+
+            # other configuration
+            with self.assertRaisesMessage(ValidationError, "'class' attribute is not allowed"):
+                other_f.clean(HTML_WITH_STYLE, None)
+            with self.assertRaisesMessage(ValidationError, "'class' attribute is not allowed"):
+                other_f.clean(HTML_WITH_STYLE, None)
+            self.assertEqual(parse.call_count, 2)
+
+            for dummy in range(2):
+                with self.assertRaisesMessage(ValidationError, "Syntax error"):
+                    f.clean("<p>not closed", None)
+            self.assertEqual(parse.call_count, 3)
+
+    def test_max_size(self):
+        f = fields.HtmlField(max_size=21)
+
+        self.assertEqual(f.clean("<p>this is a test</p>", None), "<p>this is a test</p>")
+        with mock.patch("core.validators.etree.fromstring") as parse:
+            with self.assertRaisesMessage(ValidationError, "too large (22 characters"):
+                f.clean("<p>this is a test!</p>", None)
+        parse.assert_not_called()
+
+    @parameterized.expand(
+        [
+            (
+                {},
+                """<div><script>console.log('hi');</script><p onclick="alert('yolo')">test</p></div>""",
+                "<div><p>test</p></div>",
+            ),
+            (
+                {"allow_javascript": True},
+                """<div><script>console.log('hi');</script><p onclick="alert('yolo')">test</p></div>""",
+                """<div><script>console.log('hi');</script><p onclick="alert('yolo')">test</p></div>""",
+            ),
+            (
+                {},
+                """<p class="lead" style="color: red; position: fixed">a<br/><span/>b</p>""",
+                """<p class="lead" style="color:red">a<br/><span></span>b</p>""",
+            ),
+            (
+                {"allow_class_attr": False, "allow_style_attr": False},
+                """<p class="lead" style="color: red">test</p>""",
+                "<p>test</p>",
+            ),
+            (
+                {},
+                """<div><style>p {}</style><a href="javascript:alert('yolo')">link</a></div>""",
+                """<div><a href="">link</a></div>""",
+            ),
+            ({}, "<p>not closed", "<p>not closed</p>"),
+        ]
+    )
+    def test_sanitize(self, options, value, expected):
+        f = fields.HtmlField(sanitize=True, **options)
+
+        cleaned = f.sanitize_value(value)
+
+        self.assertEqual(cleaned, expected)
+        self.assertEqual(f.sanitize_value(cleaned), cleaned)
+        f.run_validators(cleaned)
+
+    def test_sanitize_on_save(self):
+        page = Page(
+            title="Test",
+            slug="test",
+            content="""<div><script>alert('yolo')</script><p>Hello <b>world</b></p></div>""",
+        )
+        page.save()
+
+        self.assertEqual(page.content, "<div><p>Hello <b>world</b></p></div>")
+        self.assertEqual(page.content_excerpt, "Hello world")
+        page.refresh_from_db()
+        self.assertEqual(page.content, "<div><p>Hello <b>world</b></p></div>")
+        self.assertEqual(page.content_excerpt, "Hello world")
+
+    def test_sanitize_update_fields(self):
+        page = Page.objects.create(title="Test", slug="test", content="<p>Hello</p>")
+
+        page.content = "<p>Hello <script>alert('yolo')</script>world</p>"
+        page.save(update_fields=["content"])
+
+        page.refresh_from_db()
+        self.assertEqual(page.content, "<p>Hello world</p>")
+        self.assertEqual(page.content_excerpt, "Hello world")
+
+    def test_excerpt(self):
+        f = fields.HtmlField()
+
+        self.assertEqual(f.get_excerpt(None), "")
+        self.assertEqual(f.get_excerpt("<div><p>Hello</p><p>w<b>orld</b>  !</p></div>"), "Hello world !")
+        self.assertEqual(f.get_excerpt("<p>Hello world</p>", 6), "Hello…")
@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from freezegun import freeze_time
+
+from core.choices import JobStatus
+from core.jobs import Worker, enqueue_job, register_job
+from core.models import Job
+
+
+@register_job("test.count")
+def count_job(job, items):
+    for index in range(len(items)):
+        job.set_progress(index + 1, len(items))
+    return {"count": len(items)}
+
+
+@register_job("test.fail")
+def fail_job(job):
+    raise ValueError("Something went wrong.")
+
+
+@freeze_time("2024-11-18 11:12:13")
+class JobQueueTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.job = enqueue_job("test.count", items=["a", "b", "c"])
+
+    def test_fetch_order(self):
+        with freeze_time("2024-11-18 11:12:14"):
+            second = enqueue_job("test.count", items=[])
+
+        self.assertEqual(Job.objects.fetch(), self.job)
+        self.assertEqual(Job.objects.fetch(), second)
+        self.assertIsNone(Job.objects.fetch())
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, JobStatus.RUNNING)
+        self.assertEqual(self.job.attempts, 1)
+
+    def test_fetch_interrupted(self):
+        Job.objects.fetch()
+        self.assertIsNone(Job.objects.fetch())
+
+        # the worker running the job was killed
+        with freeze_time("2024-11-18 12:12:14"):
+            self.assertEqual(Job.objects.fetch(), self.job)
+        with freeze_time("2024-11-18 13:12:15"):
+            self.assertEqual(Job.objects.fetch(), self.job)
+        with freeze_time("2024-11-18 14:12:16"):
+            self.assertIsNone(Job.objects.fetch())
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, JobStatus.FAILED)
+        self.assertEqual(self.job.attempts, 3)
+
+    def test_run(self):
+        self.assertEqual(Worker(burst=True).run(), 1)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(self.job.progress, 100)
+        self.assertEqual(self.job.result, {"count": 3})
+
+    def test_failure(self):
+        job = enqueue_job("test.fail")
+
+        Worker(burst=True).run()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.error, "Something went wrong.")
+        self.assertIsNone(job.result)
+
+    def test_run_workers_command(self):
+        out = StringIO()
+        call_command("run_workers", "--burst", "--processes", "1", stdout=out)
+
+        self.assertIn("1 job(s) run.", out.getvalue())
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, JobStatus.SUCCEEDED)
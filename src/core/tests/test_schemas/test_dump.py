@@ -0,0 +1,150 @@
+import datetime
+import json
+import typing as t
+import zoneinfo
+
+from django.test import TestCase
+
+from core.models import Job
+from core.schemas import ModelSchema
+from core.schemas.dump import get_dump_function
+from user.choices import UserType
+from user.models import User, UserRole, UserRoleRelation
+from user.schemas import UserRoleSchema
+
+USER_ID1 = "0a0e2c6b-8b23-4b5a-9a8a-4a5b0b1d3b01"
+USER_ID2 = "0a0e2c6b-8b23-4b5a-9a8a-4a5b0b1d3b02"
+
+
+class DumpUserSchema(ModelSchema):
+    class Meta:
+        model = User
+        fields = [
+            "id",
+            "username",
+            "first_name",
+            "email",
+            "is_active",
+            "user_type",
+            "language",
+            "avatar",
+            "roles",
+            "date_joined",
+            "last_login",
+        ]
+        optional_fields = "__all__"
+
+
+class DumpUserRolesSchema(ModelSchema):
+    roles: t.List[UserRoleSchema] = []
+
+    class Meta:
+        model = User
+        fields = ["id", "username"]
+
+
+class DumpRoleRelationSchema(ModelSchema):
+    user: DumpUserRolesSchema
+
+    class Meta:
+        model = UserRoleRelation
+        fields = ["id", "user"]
+
+
+class DumpJobSchema(ModelSchema):
+    class Meta:
+        model = Job
+        fields = ["id", "name", "status", "progress", "user", "create_date", "end_date"]
+
+
+class DumpResolverSchema(ModelSchema):
+    display_name: str
+
+    class Meta:
+        model = User
+        fields = ["id"]
+
+    @staticmethod
+    def resolve_display_name(obj):
+        return obj.username
+
+
+class TestDumpFunction(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role_admin = UserRole.objects.create(id="user_admin", name="Admin")
+        cls.role_reader = UserRole.objects.create(id="website_reader", name="Reader")
+        cls.user1 = User.objects.create(
+            id=USER_ID1,
+            username="frodon@shire.com",
+            email="frodon@shire.com",
+            first_name="Frodon",
+            user_type=UserType.INTERNAL,
+            avatar="avatars/frodon.png",
+            last_login=datetime.datetime(2024, 3, 1, 10, 30, tzinfo=datetime.timezone.utc),
+        )
+        cls.user1.roles.set([cls.role_admin, cls.role_reader])
+        cls.user2 = User.objects.create(
+            id=USER_ID2, username="sam@shire.com", email="Sam@Shire.COM"
+        )
+        cls.job = Job.objects.create(
+            name="export", params={"format": "csv", "ids": [1, 2]}, user=cls.user1
+        )
+
+    def assertDumped(self, schema, obj):
+        dump = get_dump_function(schema)
+        self.assertIsNotNone(dump)
+        expected = schema.model_validate(obj).model_dump(mode="json")
+        self.assertEqual(json.dumps(dump(obj)), json.dumps(expected))
+
+    def test_dump(self):
+        for user in User.objects.prefetch_related("roles").order_by("username"):
+            with self.subTest(user=user.username):
+                self.assertDumped(DumpUserSchema, user)
+
+    def test_dump_foreignkey(self):
+        job = Job.objects.get()
+        dump = get_dump_function(DumpJobSchema)
+
+        # the key of the user is read without loading it
+        with self.assertNumQueries(0):
+            data = dump(job)
+
+        self.assertEqual(data["user"], USER_ID1)
+        self.assertDumped(DumpJobSchema, job)
+
+    def test_dump_nested(self):
+        relations = UserRoleRelation.objects.select_related("user").prefetch_related(
+            "user__roles"
+        )
+        for relation in relations:
+            with self.subTest(role=relation.role_id):
+                self.assertDumped(DumpRoleRelationSchema, relation)
+
+    def test_dump_not_loaded(self):
+        # values converted by pydantic: not from the database, or of unexpected types
+        user = User(
+            id=USER_ID2,
+            username="pipin@shire.com",
+            email="pipin@shire.com",
+            user_type=UserType.PORTAL,
+            is_active=1,
+            date_joined=datetime.datetime(
+                2024, 3, 1, 10, 30, 15, 250, tzinfo=zoneinfo.ZoneInfo("Europe/Paris")
+            ),
+            last_login=datetime.datetime(2024, 3, 1, 10, 30),
+        )
+        self.assertDumped(DumpUserSchema, user)
+
+    def test_dump_fallback(self):
+        # attributes missing: dumped by pydantic
+        data = {"id": USER_ID1, "username": "frodon@shire.com"}
+
+        self.assertEqual(
+            get_dump_function(DumpUserRolesSchema)(data),
+            {"id": USER_ID1, "username": "frodon@shire.com", "roles": []},
+        )
+
+    def test_not_supported(self):
+        self.assertIsNone(get_dump_function(DumpResolverSchema))
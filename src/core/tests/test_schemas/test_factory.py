@@ -0,0 +1,35 @@
+from django.test import TestCase, override_settings
+
+from core.schemas.factory import SchemaFactory
+from core.schemas.relations import create_foreignkey_field
+from user.models import User, UserRole
+
+
+class TestSchemaFactory(TestCase):
+
+    def _create_schema(self, factory):
+        return factory.create_schema(User, name="UserDeferSchema", fields=["id", "first_name"])
+
+    def test_create_schema(self):
+        factory = SchemaFactory()
+
+        schema = self._create_schema(factory)
+
+        self.assertTrue(schema.__pydantic_complete__)
+        self.assertEqual(factory.build_times.keys(), factory.schemas.keys())
+
+    @override_settings(API_SCHEMAS_DEFER_BUILD=True)
+    def test_create_schema_deferred(self):
+        schema = self._create_schema(SchemaFactory())
+
+        self.assertFalse(schema.__pydantic_complete__)
+        # built on first use
+        item = schema.model_validate({"id": "2b95a2bf-8b23-4b5a-9a8a-4a5b0b1d3b01"})
+        self.assertTrue(schema.__pydantic_complete__)
+        self.assertEqual(item.model_dump(mode="json")["first_name"], None)
+
+    def test_relation_field_shared(self):
+        self.assertIs(
+            create_foreignkey_field(UserRole, optional=False),
+            create_foreignkey_field(UserRole, optional=False),
+        )
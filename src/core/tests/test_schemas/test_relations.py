@@ -0,0 +1,132 @@
+import typing as t
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ninja.signature import ViewSignature
+from pydantic import BaseModel, ValidationError, create_model
+
+from core.api.params import Body
+from core.schemas.relations import (
+    collect_foreign_keys,
+    create_foreignkey_field,
+    create_queryset_field,
+    resolve_foreign_keys,
+)
+from user.choices import UserType
+from user.models import User, UserRole
+
+USER_ID1 = "2b95a2bf-8b23-4b5a-9a8a-4a5b0b1d3b01"
+USER_ID2 = "2b95a2bf-8b23-4b5a-9a8a-4a5b0b1d3b02"
+UNKNOWN_USER_ID = "2b95a2bf-8b23-4b5a-9a8a-4a5b0b1d3b99"
+
+RelationSchema = create_model(
+    "RelationSchema",
+    __base__=BaseModel,
+    user=(create_foreignkey_field(User, optional=False), ...),
+    role=(create_foreignkey_field(UserRole, optional=True), None),
+)
+
+RolesSchema = create_model(
+    "RolesSchema",
+    __base__=BaseModel,
+    roles=(create_queryset_field(UserRole, optional=False), ...),
+)
+
+
+class TestForeignKeyResolution(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = User.objects.create(
+            id=USER_ID1, username="frodon@shire.com", user_type=UserType.INTERNAL
+        )
+        cls.user2 = User.objects.create(
+            id=USER_ID2, username="sam@shire.com", user_type=UserType.INTERNAL
+        )
+        cls.role = UserRole.objects.create(id="user_admin", name="Admin")
+
+    def _get_body_model(self):
+        def view(request, request_body: t.Annotated[t.List[RelationSchema], Body()]):
+            pass
+
+        return ViewSignature("/", view).models[0]
+
+    def test_collect_foreign_keys(self):
+        data = [
+            {"user": USER_ID1, "role": "user_admin"},
+            {"user": USER_ID2, "role": None},
+            {"user": {"invalid": True}},
+        ]
+
+        keys = collect_foreign_keys(t.List[RelationSchema], data)
+
+        self.assertEqual(
+            keys, {(User, "pk"): [USER_ID1, USER_ID2], (UserRole, "pk"): ["user_admin"]}
+        )
+
+    def test_validate_batched(self):
+        data = [
+            {"user": USER_ID1, "role": "user_admin"},
+            {"user": USER_ID2, "role": "user_admin"},
+            {"user": USER_ID1},
+        ]
+        body_model = self._get_body_model()
+
+        with self.assertNumQueries(2):  # one per model
+            body = body_model.model_validate({"request_body": data})
+
+        items = body.request_body
+        self.assertEqual([str(item.user.pk) for item in items], [USER_ID1, USER_ID2, USER_ID1])
+        # identity map: one instance per record
+        self.assertIs(items[0].user, items[2].user)
+        self.assertIs(items[0].role, items[1].role)
+
+    def test_validate_unknown(self):
+        data = [{"user": USER_ID1}, {"user": UNKNOWN_USER_ID}]
+        body_model = self._get_body_model()
+
+        with CaptureQueriesContext(connection) as context:
+            with self.assertRaises(ValidationError) as error:
+                body_model.model_validate({"request_body": data})
+
+        self.assertEqual(len(context.captured_queries), 1)
+        messages = {
+            (item["loc"][:3], item["msg"]) for item in error.exception.errors()
+        }
+        self.assertIn((("request_body", 1, "user"), "Value error, No user found."), messages)
+        self.assertEqual({loc for loc, msg in messages}, {("request_body", 1, "user")})
+
+    def test_validate_not_collected(self):
+        # values not prefetched are loaded on validation, once
+        with resolve_foreign_keys():
+            with self.assertNumQueries(1):
+                first = RelationSchema.model_validate({"user": USER_ID1})
+                second = RelationSchema.model_validate({"user": USER_ID1})
+
+        self.assertIs(first.user, second.user)
+
+    def test_validate_without_resolver(self):
+        with self.assertNumQueries(1):
+            item = RelationSchema.model_validate({"user": USER_ID2})
+        self.assertEqual(str(item.user.pk), USER_ID2)
+
+        with self.assertRaisesMessage(ValidationError, "No user found."):
+            RelationSchema.model_validate({"user": UNKNOWN_USER_ID})
+
+    def test_validate_queryset_from_pks(self):
+        # evaluated once, by the validation
+        with self.assertNumQueries(1):
+            item = RolesSchema.model_validate({"roles": ["user_admin"]})
+            self.assertEqual(list(item.roles), [self.role])
+            self.assertEqual(item.model_dump(), {"roles": ["user_admin"]})
+
+        with self.assertRaisesMessage(ValidationError, "Some given values does not exists."):
+            RolesSchema.model_validate({"roles": ["user_admin", "unknown"]})
+
+    def test_validate_queryset_from_instances(self):
+        # the given instances are kept: no query
+        with self.assertNumQueries(0):
+            item = RolesSchema.model_validate({"roles": [self.role]})
+            self.assertEqual(item.roles, [self.role])
+            self.assertEqual(item.model_dump(), {"roles": ["user_admin"]})
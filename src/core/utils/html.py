@@ -1,6 +1,7 @@
 import collections
 import re
 from lxml import etree
+from lxml import html as lxmlhtml
 from lxml.html import clean as lxmlclean, defs as lxmldefs
 
 
@@ -36,6 +37,7 @@ class Cleaner(lxmlclean.Cleaner):
             for position in ['top', 'bottom', 'left', 'right']
             for attribute in ('style', 'color', 'width', 'left-radius', 'right-radius')]
     )
+    _style_whitelist = frozenset(_style_whitelist)
 
     # given to the __init__ method, and set as attribute in lxml cleaner class.
     strip_classes = False
@@ -72,3 +74,39 @@ class Cleaner(lxmlclean.Cleaner):
                     key, val) for (key, val) in valid_styles.items())
             else:
                 del el.attrib['style']
+
+
+def sanitize_html(value, cleaner):
+    """Clean the HTML fragment with the given cleaner. The fragment is parsed and serialized
+    as XML (as done by `core.validators.HTMLValidator`), so the result is still valid for the
+    validator, and rendered the same by browsers.
+    """
+    container = _parse_fragment(value)
+    cleaner(container)
+    for el in container.iter(tag=etree.Element):
+        # '<span/>' is an opening tag for browsers
+        if el.tag not in lxmldefs.empty_tags and el.text is None and not len(el):
+            el.text = ''
+    return (container.text or '') + ''.join(
+        etree.tostring(child, method='xml', encoding='unicode') for child in container)
+
+
+def html_to_text(value):
+    """Plain text of the HTML fragment, with normalized whitespaces."""
+    if not value:
+        return ''
+    container = _parse_fragment(value)
+    for el in container.iter(tag=etree.Element):
+        # '<p>a</p><p>b</p>' is 'a b'
+        if el.tag in lxmldefs.block_tags or el.tag == 'br':
+            el.tail = ' ' + (el.tail or '')
+    return ' '.join(container.text_content().split())
+
+
+def _parse_fragment(value):
+    # wrapped in a container, so the root element of the fragment can be removed too
+    try:
+        return etree.fromstring('<div>%s</div>' % value, parser=lxmlhtml.xhtml_parser)
+    except etree.XMLSyntaxError:
+        # not validated: parsed as browsers do
+        return lxmlhtml.fragment_fromstring(value, create_parent='div')
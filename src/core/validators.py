@@ -1,4 +1,7 @@
+import hashlib
 import re
+import threading
+from collections import OrderedDict
 
 from django.core.exceptions import ValidationError
 from django.utils.deconstruct import deconstructible
@@ -27,13 +30,56 @@ HTML_DEFAULT_TAGS = (
     - defs.top_level_tags  # html, body, head, frameset
 )
 
+# Maximum length (in characters) of the validated documents: larger ones are rejected
+# before being parsed
+HTML_MAX_SIZE = 1024 * 1024
+
+# Number of validation outcomes kept in memory (see `HTMLValidationCache`)
+HTML_VALIDATION_CACHE_SIZE = 1024
+
+# Outcome of the validation of a document which can not be parsed
+SYNTAX_ERROR = "syntax_error"
+
+
+class HTMLValidationCache:
+    """Bounded LRU of the outcomes of the HTML validation, by validator configuration and
+    hash of the document: unchanged contents (e.g. sent again on each update, validated by
+    the schemas then by `full_clean`) are parsed once.
+    """
+
+    def __init__(self, maxsize=HTML_VALIDATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._outcomes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            outcome = self._outcomes.get(key)
+            if outcome is not None:
+                self._outcomes.move_to_end(key)
+            return outcome
+
+    def set(self, key, outcome):
+        with self._lock:
+            self._outcomes[key] = outcome
+            self._outcomes.move_to_end(key)
+            if len(self._outcomes) > self.maxsize:
+                self._outcomes.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._outcomes.clear()
+
+
+html_validation_cache = HTMLValidationCache()
+
 
 @deconstructible
 class HTMLValidator:
 
     _style_re = re.compile(r"""([\w-]+)\s*:\s*((?:[^;"']|"[^";]*"|'[^';]*')+)""")
 
-    _style_whitelist = [
+    _style_whitelist = [  # frozen below
         "font-size",
         "font-family",
         "font-weight",
@@ -96,6 +142,7 @@ class HTMLValidator:
             for attribute in ("style", "color", "width", "left-radius", "right-radius")
         ]
     )
+    _style_whitelist = frozenset(_style_whitelist)
 
     def __init__(
         self,
@@ -104,12 +151,14 @@ class HTMLValidator:
         allow_class_attr=True,
         allowed_tags=HTML_DEFAULT_TAGS,
         allowed_attrs=HTML_DEFAULT_ATTRS,
+        max_size=HTML_MAX_SIZE,
     ):
         self.allow_javascript = allow_javascript
         self.allow_style_attr = allow_style_attr
         self.allow_class_attr = allow_class_attr
-        self.allowed_tags = allowed_tags
-        self.allowed_attrs = allowed_attrs
+        self.allowed_tags = frozenset(allowed_tags)
+        self.allowed_attrs = frozenset(allowed_attrs)
+        self.max_size = max_size
 
         if allow_javascript:
             self.allowed_attrs |= defs.event_attrs  # onmouse, onblur, onclick, ...
@@ -117,16 +166,30 @@ class HTMLValidator:
         if allow_style_attr:
             self.allowed_attrs |= {"style"}
 
+        # the outcome of the validation only depends on these
+        self._cache_key = (
+            self.allow_style_attr,
+            self.allow_class_attr,
+            self.allowed_tags,
+            self.allowed_attrs,
+        )
+
     def __call__(self, value):
-        try:
-            root = etree.fromstring(value)
-            rejected_tags, rejected_attrs, rejected_style_items, has_rejected_class = (
-                self._validate_etree(root)
-            )
-        except etree.XMLSyntaxError as exc:
+        if self.max_size is not None and len(value) > self.max_size:
             raise ValidationError(
-                _("Syntax error, this is not a parsable HTML code.")
-            ) from exc
+                _("The content is too large (%(size)s characters, %(max_size)s at most).")
+                % {"size": len(value), "max_size": self.max_size}
+            )
+
+        content = value.encode("utf-8") if isinstance(value, str) else value
+        key = (self._cache_key, hashlib.sha256(content).digest())
+        outcome = html_validation_cache.get(key)
+        if outcome is None:
+            outcome = self._validate(value)
+            html_validation_cache.set(key, outcome)
+        if outcome is SYNTAX_ERROR:
+            raise ValidationError(_("Syntax error, this is not a parsable HTML code."))
+        rejected_tags, rejected_attrs, rejected_style_items, has_rejected_class = outcome
 
         messages = []
         if rejected_tags:
@@ -143,6 +206,22 @@ class HTMLValidator:
         if messages:
             raise ValidationError("\n".join(messages))
 
+    def _validate(self, value):
+        """Rejected items of the document, or `SYNTAX_ERROR`."""
+        try:
+            root = etree.fromstring(value)
+        except etree.XMLSyntaxError:
+            return SYNTAX_ERROR
+        rejected_tags, rejected_attrs, rejected_style_items, has_rejected_class = (
+            self._validate_etree(root)
+        )
+        return (
+            frozenset(rejected_tags),
+            frozenset(rejected_attrs),
+            frozenset(rejected_style_items),
+            has_rejected_class,
+        )
+
     def _validate_etree(self, root):
         rejected_tags = set()
         rejected_attrs = set()
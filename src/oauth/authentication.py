@@ -4,11 +4,17 @@ from django.db.models.query import prefetch_related_objects
 from django.http import HttpRequest
 from ninja.security import HttpBearer
 
+from core.api.batch import BATCH_PARENT_REQUEST_ATTR
 from oauth.models import AccessToken
 
 
 class OAuthTokenAuthentication(HttpBearer):
     def authenticate(self, request: HttpRequest, token: str):
+        # Sub-requests of a batch have the headers of the batch request: reuse its token.
+        batch_request = getattr(request, BATCH_PARENT_REQUEST_ATTR, None)
+        if isinstance(getattr(batch_request, "auth", None), AccessToken):
+            return batch_request.auth
+
         token_checksum = hashlib.sha256(token.encode("utf-8")).hexdigest()
         try:
             access_token = AccessToken.objects.select_related("user").get(token_checksum=token_checksum)
@@ -1,13 +1,23 @@
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied, ValidationError
 
-from ninja import NinjaAPI, Redoc
+from ninja import Redoc
 
+from core.api.batch import add_batch_route
+from core.api.jobs import add_job_routes
+from core.api.renderers import NegotiatedNinjaAPI
+from oauth.authentication import OAuthTokenAuthentication
 
-api_v1 = NinjaAPI(
+
+api_v1 = NegotiatedNinjaAPI(
     version='1',
     docs=Redoc(),
     title="Totem API",
-    description="This is the OpenAPI Documentation for Totem API v1."
+    description=(
+        "This is the OpenAPI Documentation for Totem API v1.\n\n"
+        "Responses are rendered as MessagePack instead of JSON with the "
+        "`Accept: application/msgpack` header, and request bodies are read as MessagePack "
+        "with the `Content-Type: application/msgpack` header."
+    ),
 )
 
 @api_v1.exception_handler(ObjectDoesNotExist)
@@ -32,4 +42,8 @@ def handle_object_does_not_exist(request, exc):
         request,
         {"message": str(exc)},
         status=403,
-    )
\ No newline at end of file
+    )
+
+
+add_batch_route(api_v1, "/batch/", auth=[OAuthTokenAuthentication()])
+add_job_routes(api_v1, "/jobs/", auth=[OAuthTokenAuthentication()])
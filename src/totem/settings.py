@@ -107,6 +107,58 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api_response": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "api_response",
+    },
+}
+
+# Cache used to store rendered API responses (see `core.api.cache`)
+API_RESPONSE_CACHE_ALIAS = "api_response"
+
+# Build the validators and serializers of the API schemas on their first use instead of
+# on import, to reduce the boot time (see the `warm_schemas` command to build them before
+# serving requests)
+API_SCHEMAS_DEFER_BUILD = False
+
+# Directory of the OpenAPI documents generated for each version of the code (see
+# `core.api.openapi`)
+API_OPENAPI_CACHE_DIR = "/usr/src/cache/openapi"
+
+# Number of threads executing the GET sub-requests of an API batch (see `core.api.batch`)
+API_BATCH_MAX_WORKERS = 4
+
+# Maximum wait (in seconds) of coalesced requests for the identical one being processed
+# (see `core.api.coalesce`)
+API_COALESCE_TIMEOUT = 10
+
+# Lifetime (in seconds) of the responses stored for idempotency keys, maximum wait of
+# retries for the request being processed, and maximum duration of this request before it is
+# considered as dead and taken over by a retry (see `core.api.idempotency`)
+API_IDEMPOTENCY_TTL = 24 * 60 * 60
+API_IDEMPOTENCY_TIMEOUT = 30
+API_IDEMPOTENCY_LEASE = 60 * 60
+
+# Jobs run in the background (see `core.jobs`): default number of processes of the
+# `run_workers` command, maximum duration (in seconds) of a job before it is considered as
+# interrupted and run again, and maximum number of runs of an interrupted job
+JOBS_WORKER_PROCESSES = 2
+JOBS_TIMEOUT = 60 * 60
+JOBS_MAX_ATTEMPTS = 3
+
+# Postgres channel notifying the changes of records (see `core.events`), and interval (in
+# seconds) of the keep-alive comments sent on idle event streams (see `core.api.events`)
+CHANGES_CHANNEL = "totem_changes"
+API_EVENTS_KEEPALIVE = 15
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -124,6 +124,10 @@ class BaseRule(metaclass=BaseRuleMetaclass):
     name: str = None # required
     description: str = None
 
+    # The scope filter depends on the context user, not only on its roles. Rules not
+    # depending on it allow users having the same roles to share cached responses.
+    user_dependent: bool = True
+
     # List of possible operations for this model. Goal is to avoid
     # too many imports. Depends on what is implemented in the
     # model service.
@@ -183,3 +187,31 @@ async def apply_access_rules(queryset: models.QuerySet, operation: str, context:
             queryset = queryset.filter(rule_lookup)
 
     return queryset
+
+
+async def access_rules_fingerprint(model: models.Model, operation: str, context: Context) -> str:
+    """ Return a string identifying the scope the access rules would apply on the given
+        model for this context: contexts with the same fingerprint see the same records.
+        :param model: django model class to scope
+        :param operation: operation (string) to check
+    """
+    if not context.user:
+        return "-"
+
+    roles = [userrole async for userrole in context.user.roles.all()]
+    role_rule_ids = [rule_id for role in roles for rule_id in (role.rules or [])]
+    matching_rule_maps = access_policy.get_matching_rules(model, operation=operation, rule_ids=role_rule_ids)
+
+    # Same structure as `apply_access_rules`: OR of roles, AND of their rules
+    rule_groups = set()
+    user_dependent = False
+    for role in roles:
+        role_rules = frozenset(rule_id for rule_id in (role.rules or []) if rule_id in matching_rule_maps)
+        if role_rules:
+            rule_groups.add(role_rules)
+            user_dependent |= any(matching_rule_maps[rule_id].user_dependent for rule_id in role_rules)
+
+    fingerprint = "|".join(sorted(",".join(sorted(group)) for group in rule_groups))
+    if user_dependent:
+        fingerprint += f"@{context.user.pk}"
+    return fingerprint
@@ -41,6 +41,11 @@ class UserRoleController(
         "id",
     ]
     list_ordering_default_fields = ["id"]
+    list_changes = True
+    list_events = True
+
+    response_cache_actions = ["list", "permission_read", "access_rules_read"]
+    coalesce_actions = ["list", "permission_read", "access_rules_read"]
 
     @route.get(
         "/permissions/",
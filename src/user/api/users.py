@@ -2,22 +2,26 @@ from typing import List
 
 from ninja import FilterSchema, Schema
 
-from core.api import ModelController, Route, route
+from core.api import BulkModelControllerMixin, ModelController, Route, route
 from oauth.authentication import OAuthTokenAuthentication
 from totem.api import api_v1
-from user.models import User
+from user import signals
+from user.models import User, UserRole
 from user.schemas import (
     ProfilePathParam,
     UserCreateSchema,
     UserFilterSchema,
     UserProfileSchema,
+    UserRoleDisplayNameSchema,
     UserSchema,
     UserUpdateSchema,
 )
 from user.security import IsAuthenticated, TokenHasScopePermissionModelControllerMixin
 
 
-class UserController(TokenHasScopePermissionModelControllerMixin, ModelController):
+class UserController(
+    TokenHasScopePermissionModelControllerMixin, BulkModelControllerMixin, ModelController
+):
     api = api_v1
     model = User
 
@@ -30,12 +34,26 @@ class UserController(TokenHasScopePermissionModelControllerMixin, ModelControlle
         "delete": ["totem.user.delete"],
     }
 
+    expandable_fields = {"roles": UserRoleDisplayNameSchema}
+
+    # the roles give the access rules
+    conditional_changes = True
+    conditional_changes_dependencies = [UserRole]
+
     list_response_schema: Schema = List[UserSchema]
     list_filter_schema: FilterSchema = UserFilterSchema
     list_ordering_fields = ["username", "email", "first_name", "is_active", "date_joined"]
     list_ordering_default_fields = ["username"]
+    list_values = True
+    list_export = True
+    list_stats = True
+    list_changes = True
+    list_events = True
+    list_stats_group_by_fields = ["user_type", "is_active", "language"]
+    list_stats_aggregate_fields = ["date_joined", "last_login"]
 
     retrieve_response_schema: Schema = UserSchema
+    retrieve_dump = True
 
     create_request_schema = UserCreateSchema
     create_response_schema = UserSchema
@@ -43,13 +61,22 @@ class UserController(TokenHasScopePermissionModelControllerMixin, ModelControlle
     update_request_schema = UserUpdateSchema
     update_response_schema = UserSchema
 
-    # Overrides
+    # writes retried by the clients after network failures are processed once
+    idempotent_actions = ["create", "update"]
+
+    # deleting users removes their files
+    job_actions = ["bulk_delete"]
+
+    @classmethod
+    def _update_function_decorators(cls):
+        # roles removed then added change the rights of the user once
+        return super()._update_function_decorators() + [signals.coalesce_user_change_rights()]
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        if self.action == "list":
-            queryset = queryset.prefetch_related("roles")
-        return queryset
+    @classmethod
+    def _bulk_update_function_decorators(cls):
+        return super()._bulk_update_function_decorators() + [
+            signals.coalesce_user_change_rights()
+        ]
 
     # Actions
 
@@ -6,27 +6,54 @@ from django.db import models
 from django.db.models.manager import BaseManager
 
 from base.files.storages import PrivateMediaFileSystemStorage
-from base.models.mixins import CleanupFileQuerysetMixin, CleanupFileModelMixin
+from base.models.mixins import (
+    CleanupFileModelMixin,
+    CleanupFileQuerysetMixin,
+    VersionedModelMixin,
+    VersionedQuerySetMixin,
+)
+from core.changes import is_tracked, record_changes
 from user import choices, signals
 
 
 
-class UserQuerySet(CleanupFileQuerysetMixin, models.QuerySet):
+class UserQuerySet(VersionedQuerySetMixin, CleanupFileQuerysetMixin, models.QuerySet):
 
     def update(self, **kwargs):
         pks = None
-        if 'user_type' in kwargs:
+        if 'user_type' in kwargs or is_tracked(self.model):
             if (
                 self._result_cache is None
             ):  # queryset not evaluated, fetch only required fields
-                pks = self.values_list('id', flat=True)
+                pks = list(self.values_list('id', flat=True))
             else:  # queryset already evaluated
                 pks = [user.pk for user in self]
 
         results = super().update(**kwargs)
 
         if pks:
-            signals.user_change_rights.send(sender=self.__class__, user_qs=self.model.objects.filter(pk__in=pks))
+            record_changes(self.model, pks)
+            if 'user_type' in kwargs:
+                signals.user_change_rights.send(sender=self.__class__, user_qs=self.model.objects.filter(pk__in=pks).order_by("pk"))
+        return results
+
+    def bulk_create(
+        self,
+        objs,
+        batch_size=None,
+        ignore_conflicts=False,
+        update_conflicts=False,
+        update_fields=None,
+        unique_fields=None,
+    ):
+        results = super().bulk_create(objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts, update_conflicts=update_conflicts, update_fields=update_fields, unique_fields=unique_fields)
+        record_changes(self.model, [user.pk for user in results])
+        return results
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        results = super().bulk_update(objs, fields, batch_size=batch_size)
+        record_changes(self.model, [user.pk for user in objs])
         return results
 
 
@@ -42,7 +69,7 @@ def upload_to_user_avatar(instance, filename):
         return f"{instance._meta.app_label}.{instance.__class__.__name__}/{str(instance.pk)}/avatar{file_extension}"
 
 
-class User(CleanupFileModelMixin, AbstractUser):
+class User(VersionedModelMixin, CleanupFileModelMixin, AbstractUser):
     id = models.UUIDField(
         default=uuid.uuid4, editable=False, null=False, primary_key=True
     )
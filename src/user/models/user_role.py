@@ -2,6 +2,7 @@ from django.contrib.postgres.fields import ArrayField
 from django.db import models
 from django.db.models.expressions import RawSQL
 
+from core.changes import is_tracked, record_changes
 from core.validators import validate_unique_choice_array
 from user import signals
 from user.access_policy import access_policy
@@ -16,6 +17,20 @@ def get_rule_choices():
     return access_policy.get_rule_choices()
 
 
+class UserRoleQuerySet(models.QuerySet):
+
+    def delete(self):
+        # the relations are deleted in cascade, without calling their `delete`
+        user_pks = list(
+            UserRoleRelation.objects.filter(role__in=self).values_list('user_id', flat=True).distinct()
+        )
+        results = super().delete()
+        if user_pks:
+            record_changes(User, user_pks)
+            signals.user_change_rights.send(sender=self.__class__, user_qs=User.objects.filter(pk__in=user_pks))
+        return results
+
+
 class UserRole(models.Model):
     id = models.CharField(
         "ID", max_length=128, null=False, blank=False, primary_key=True)
@@ -36,10 +51,21 @@ class UserRole(models.Model):
         help_text="List of access rules applied for this role."
     )
 
+    objects = UserRoleQuerySet.as_manager()
+
     class Meta:
         verbose_name = "User Role"
         verbose_name_plural = "User Roles"
 
+    def delete(self, using=None, keep_parents=False):
+        # the relations are deleted in cascade, without calling their `delete`
+        user_pks = list(self.role_relations.values_list('user_id', flat=True))
+        results = super().delete(using=using, keep_parents=keep_parents)
+        if user_pks:
+            record_changes(User, user_pks)
+            signals.user_change_rights.send(sender=self.__class__, user_qs=User.objects.filter(pk__in=user_pks))
+        return results
+
 
 # ---------------------------------------------------------------
 # User Role Relation
@@ -59,23 +85,28 @@ class UserRoleRelationQuerySet(models.QuerySet):
         results = super().bulk_create(objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts, update_conflicts=update_conflicts, update_fields=update_fields, unique_fields=unique_fields)
         if results:
             user_pks = [rel.user_id for rel in results]
+            record_changes(User, user_pks)
             signals.user_change_rights.send(sender=self.__class__, user_qs=User.objects.filter(pk__in=user_pks))
         return results
 
     def update(self, **kwargs):
         user_pks = None
-        if 'role' in kwargs:
+        if 'role' in kwargs or is_tracked(User):
             if (
                 self._result_cache is None
             ):  # queryset not evaluated, fetch only required fields
-                user_pks = self.values_list('user_id', flat=True)
+                user_pks = list(self.values_list('user_id', flat=True))
             else:  # queryset already evaluated
                 user_pks = [rel.user_id for rel in self]
+            if 'user' in kwargs:  # moved relations
+                user_pks.append(getattr(kwargs['user'], 'pk', kwargs['user']))
 
         results = super().update(**kwargs)
 
         if user_pks:
-            signals.user_change_rights.send(sender=self.__class__, user_qs=User.objects.filter(pk__in=user_pks))
+            record_changes(User, user_pks)
+            if 'role' in kwargs:
+                signals.user_change_rights.send(sender=self.__class__, user_qs=User.objects.filter(pk__in=user_pks))
 
         return results
 
@@ -83,6 +114,7 @@ class UserRoleRelationQuerySet(models.QuerySet):
         user_pks = [rel.user_id for rel in self]
         results = super().delete()
         if user_pks:
+            record_changes(User, user_pks)
             signals.user_change_rights.send(sender=self.__class__, user_qs=User.objects.filter(pk__in=user_pks))
         return results
 
@@ -109,10 +141,12 @@ class UserRoleRelation(models.Model):
     def save(self, *args, **kwargs):
         update_fields = kwargs.get('update_fields')
         super().save(*args, **kwargs)
+        record_changes(User, [self.user_id])
         if update_fields is None or 'role' in update_fields:
             signals.user_change_rights.send(sender=self.__class__, user_qs=User.objects.filter(pk=self.user_id))
 
     def delete(self, using=None, keep_parents=False):
         user_id = self.user_id
         super().delete(using=using, keep_parents=keep_parents)
+        record_changes(User, [user_id])
         signals.user_change_rights.send(sender=self.__class__, user_qs=User.objects.filter(pk=user_id))
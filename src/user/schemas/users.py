@@ -4,9 +4,8 @@ from ninja import FilterSchema, Schema
 from pydantic import UUID4, Field
 
 from core.schemas import ModelSchema
-from user.models import User
-
-from .user_roles import UserRoleDisplayNameSchema
+from core.schemas.relations import create_queryset_field
+from user.models import User, UserRole
 
 # ----------------------------------------------------
 # Path Schemas
@@ -27,9 +26,6 @@ class UserDisplayNameSchema(ModelSchema):
 
 
 class UserSchema(ModelSchema):
-
-    roles: List[UserRoleDisplayNameSchema]
-
     class Meta:
         model = User
         fields = [
@@ -62,7 +58,13 @@ class UserCreateSchema(ModelSchema):
         ]
 
 
+# the roles of the partial updates can be given as changes: {"add": [...], "remove": [...]}
+UserRolesChanges = create_queryset_field(UserRole, optional=True, changes=True)
+
+
 class UserUpdateSchema(ModelSchema):
+    roles: UserRolesChanges = Field(None, title="Roles")
+
     class Meta:
         model = User
         fields = [
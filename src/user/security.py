@@ -65,6 +65,7 @@ class UserManageAllUserRule(BaseRule):
     name: str = "Manage All User Profile"
     description: str = "Create, read, edit and delete All User Profile."
     operations = ["read", "create", "update", "delete"]
+    user_dependent: bool = False
 
     def scope_filter(self, context) -> Q:
         return ~Q(pk__in=[])  # always true
@@ -88,6 +89,38 @@ class TokenHasScopePermissionModelControllerMixin:
             decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
         return decorators
 
+    @classmethod
+    def _export_function_decorators(cls):
+        decorators = super()._export_function_decorators()
+        permissions = cls._get_action_permissions("read")
+        if permissions:
+            decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
+        return decorators
+
+    @classmethod
+    def _stats_function_decorators(cls):
+        decorators = super()._stats_function_decorators()
+        permissions = cls._get_action_permissions("read")
+        if permissions:
+            decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
+        return decorators
+
+    @classmethod
+    def _changes_function_decorators(cls):
+        decorators = super()._changes_function_decorators()
+        permissions = cls._get_action_permissions("read")
+        if permissions:
+            decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
+        return decorators
+
+    @classmethod
+    def _events_function_decorators(cls):
+        decorators = super()._events_function_decorators()
+        permissions = cls._get_action_permissions("read")
+        if permissions:
+            decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
+        return decorators
+
     @classmethod
     def _retrieve_function_decorators(cls):
         decorators = super()._retrieve_function_decorators()
@@ -120,6 +153,30 @@ class TokenHasScopePermissionModelControllerMixin:
             decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
         return decorators
 
+    @classmethod
+    def _bulk_create_function_decorators(cls):
+        decorators = super()._bulk_create_function_decorators()
+        permissions = cls._get_action_permissions("create")
+        if permissions:
+            decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
+        return decorators
+
+    @classmethod
+    def _bulk_update_function_decorators(cls):
+        decorators = super()._bulk_update_function_decorators()
+        permissions = cls._get_action_permissions("update")
+        if permissions:
+            decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
+        return decorators
+
+    @classmethod
+    def _bulk_delete_function_decorators(cls):
+        decorators = super()._bulk_delete_function_decorators()
+        permissions = cls._get_action_permissions("delete")
+        if permissions:
+            decorators.append(check_permissions([TokenHasScopePermission(permissions)]))
+        return decorators
+
     @classmethod
     def _get_action_permissions(cls, action):
         permission_map = getattr(cls, "permission_map", {})
@@ -1,3 +1,42 @@
+import functools
+import operator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.dispatch import Signal
 
-user_change_rights = Signal() # args: user_qs
+# rights changes sent in a `coalesce_user_change_rights` context: list of (sender, user_qs)
+_pending_rights_changes = ContextVar("pending_rights_changes", default=None)
+
+
+class CoalescingSignal(Signal):
+    """Signal sent once for all the sends done in a `coalesce_user_change_rights` context."""
+
+    def send(self, sender, **named):
+        pending = _pending_rights_changes.get()
+        if pending is not None:
+            pending.append((sender, named["user_qs"]))
+            return []
+        return super().send(sender, **named)
+
+
+user_change_rights = CoalescingSignal() # args: user_qs
+
+
+@contextmanager
+def coalesce_user_change_rights():
+    """Send `user_change_rights` once, with all the users whose rights changed in the context
+    (e.g. roles removed, then added), instead of once per write.
+    """
+    if _pending_rights_changes.get() is not None:  # already coalescing
+        yield
+        return
+    pending = []
+    token = _pending_rights_changes.set(pending)
+    try:
+        yield
+    finally:
+        _pending_rights_changes.reset(token)
+    if pending:
+        user_qs = functools.reduce(operator.or_, [user_qs for dummy, user_qs in pending])
+        user_change_rights.send(sender=pending[0][0], user_qs=user_qs)
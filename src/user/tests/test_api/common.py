@@ -3,6 +3,7 @@ from datetime import timedelta
 from django.utils import timezone
 from oauth2_provider.scopes import get_scopes_backend
 
+from core.api.cache import clear_response_cache
 from oauth.models import AccessToken, OAuthApp
 from user import choices as user_choices
 from user.models import User, UserRole
@@ -16,6 +17,10 @@ OAUTH_APP_ID = "87940016-4354-40cb-ac7d-7434f59d0f94"
 
 class CommonTestMixin:
 
+    def setUp(self):
+        super().setUp()
+        clear_response_cache()
+
     @classmethod
     def setUpTestData(cls):
         super().setUpTestData()
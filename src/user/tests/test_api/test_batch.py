@@ -0,0 +1,190 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from freezegun import freeze_time
+
+from core.testing import APITestCaseMixin
+from user.models import User
+
+from .common import USER_ID1, USER_ID2, CommonTestMixin
+
+
+@freeze_time("2024-11-18 11:12:13")
+@override_settings(API_BATCH_MAX_WORKERS=1)
+class BatchAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.url = "/api/v1/batch/"
+
+    def test_batch_response(self):
+        payload = [
+            {"method": "GET", "path": "users/me/"},
+            {"method": "GET", "path": "/api/v1/users/?page_size=1&ordering=username"},
+            {
+                "method": "POST",
+                "path": "users/",
+                "body": {
+                    "username": "pipin",
+                    "email": "pipin@lacomte.com",
+                    "user_type": "PORTAL",
+                    "roles": [],
+                },
+            },
+            {"method": "GET", "path": "users/?search=pipin"},
+        ]
+
+        response = self.do_api_request(
+            self.url, "POST", self.user_access_token_frodon.token, data=payload
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["status"] for item in data], [200, 200, 201, 200])
+        self.assertEqual(data[0]["body"]["id"], USER_ID1)
+        self.assertEqual(len(data[1]["body"]["results"]), 1)
+        self.assertEqual(data[1]["body"]["results"][0]["username"], "frodon@lacomte.com")
+        self.assertTrue(data[1]["body"]["next"].startswith("http://testserver/api/v1/users/"))
+        self.assertTrue(User.objects.filter(pk=data[2]["body"]["id"]).exists())
+        self.assertEqual(data[3]["body"]["count"], 1)
+        self.assertEqual(data[3]["headers"]["Content-Type"], "application/json; charset=utf-8")
+
+    def test_batch_errors(self):
+        self.user_access_token_frodon.scope = "totem.user.read"
+        self.user_access_token_frodon.save(update_fields=["scope"])
+        payload = [
+            {"method": "GET", "path": "not-found/"},
+            {"method": "GET", "path": "/admin/"},
+            {"method": "POST", "path": "batch/", "body": []},
+            {
+                "method": "POST",
+                "path": "users/",
+                "body": {"username": "pipin", "email": "pipin@lacomte.com", "roles": []},
+            },
+            {"method": "DELETE", "path": f"users/{USER_ID1}/"},
+        ]
+
+        response = self.do_api_request(
+            self.url, "POST", self.user_access_token_frodon.token, data=payload
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["status"] for item in data], [404, 404, 400, 403, 403])
+        self.assertTrue(User.objects.filter(pk=USER_ID1).exists())
+
+    def test_batch_authenticate_once(self):
+        payload = [{"method": "GET", "path": "users/me/"}] * 3
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.do_api_request(
+                self.url, "POST", self.user_access_token_frodon.token, data=payload
+            )
+
+        self.assertEqual(response.status_code, 200)
+        token_queries = [
+            query
+            for query in context.captured_queries
+            if "oauth_accesstoken" in query["sql"]
+        ]
+        self.assertEqual(len(token_queries), 1)
+
+    @override_settings(API_BATCH_MAX_WORKERS=4)
+    def test_batch_concurrent_get(self):
+        payload = [
+            {"method": "GET", "path": "users/me/"},
+            {"method": "GET", "path": "users/me/?first"},
+            {"method": "GET", "path": "users/me/?second"},
+        ]
+
+        response = self.do_api_request(
+            self.url, "POST", self.user_access_token_frodon.token, data=payload
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["status"] for item in data], [200, 200, 200])
+        self.assertEqual([item["body"]["id"] for item in data], [USER_ID1] * 3)
+
+    def test_batch_request_headers(self):
+        payload = [
+            {
+                "method": "POST",
+                "path": "users/",
+                "body": {
+                    "username": username,
+                    "email": username,
+                    "user_type": "PORTAL",
+                    "roles": [],
+                },
+            }
+            for username in ("pipin@lacomte.com", "merry@lacomte.com")
+        ]
+        payload.append(
+            {"method": "PATCH", "path": f"users/{USER_ID2}/", "body": {"first_name": "Smeagol"}}
+        )
+
+        # the headers specific to a request are not given to the items
+        response = self.do_api_request(
+            self.url,
+            "POST",
+            self.user_access_token_frodon.token,
+            data=payload,
+            HTTP_IDEMPOTENCY_KEY="batch",
+            HTTP_IF_MATCH='"999-json"',
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["status"] for item in data], [201, 201, 200])
+        self.assertEqual(User.objects.filter(username__endswith="@lacomte.com").count(), 3)
+
+    def test_batch_item_headers(self):
+        etag = self.do_api_request(
+            f"/api/v1/users/{USER_ID2}/", "GET", self.user_access_token_frodon.token
+        )["ETag"]
+        payload = [
+            {"method": "GET", "path": f"users/{USER_ID2}/", "headers": {"If-None-Match": etag}},
+            {
+                "method": "PATCH",
+                "path": f"users/{USER_ID2}/",
+                "body": {"first_name": "Smeagol"},
+                "headers": {"If-Match": '"999-json"'},
+            },
+        ]
+
+        response = self.do_api_request(
+            self.url, "POST", self.user_access_token_frodon.token, data=payload
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["status"] for item in response.json()], [304, 412])
+
+    def test_batch_item_headers_validation(self):
+        payload = [
+            {"method": "GET", "path": "users/me/", "headers": {"Authorization": "Bearer x"}}
+        ]
+
+        response = self.do_api_request(
+            self.url, "POST", self.user_access_token_frodon.token, data=payload
+        )
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_batch_max_items(self):
+        payload = [{"method": "GET", "path": "users/me/"}] * 21
+
+        response = self.do_api_request(
+            self.url, "POST", self.user_access_token_frodon.token, data=payload
+        )
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_batch_unauthenticated(self):
+        response = self.do_api_request(
+            self.url, "POST", "invalid_token", data=[{"method": "GET", "path": "users/me/"}]
+        )
+
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+
+import psycopg
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from parameterized import parameterized
+
+from core.events import RESET, ChangeEvent, ChangeListener, get_listener
+from core.testing import APITestCaseMixin
+from user.choices import UserType
+from user.models import User
+
+from .common import USER_ID1, USER_ID2, USER_ID3, CommonTestMixin
+
+USER_ID4 = "49c7b4f5-b436-4c47-bea1-d3e60b9ab492"
+
+
+# Not frozen in time: the event loop timers rely on `time.monotonic`
+class UserEventsAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.user_pipin = User.objects.create(
+            id=USER_ID3,
+            username="pipin@lacomte.com",
+            email="pipin@lacomte.com",
+            user_type=UserType.INTERNAL,
+        )
+        cls.user_galadriel = User.objects.create(
+            id=USER_ID4,
+            username="galadriel@elfe.com",
+            email="galadriel@elfe.com",
+            user_type=UserType.INTERNAL,
+            is_active=False,
+        )
+
+        cls.url = "/api/v1/users/events/"
+
+    async def _open_events(self, **params):
+        response = await self.async_client.get(
+            self.url,
+            params,
+            headers={"Authorization": f"Bearer {self.user_access_token_frodon.token}"},
+        )
+        return response, aiter(response.streaming_content)
+
+    async def _read_event(self, stream):
+        return await asyncio.wait_for(anext(stream), 10)
+
+    async def _close_events(self, stream):
+        # as done by the ASGI handler when the client disconnects
+        read = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        read.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await read
+
+    async def test_events_response(self):
+        response, stream = await self._open_events(is_active=True)
+        try:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            self.assertEqual(await self._read_event(stream), b"event: ready\ndata: {}\n\n")
+
+            listener = get_listener()
+            listener.dispatch(
+                json.dumps({"model": "user.user", "pks": [USER_ID3, USER_ID4], "deleted": False})
+            )
+            listener.dispatch(
+                json.dumps({"model": "user.user", "pks": [USER_ID1], "deleted": True})
+            )
+            listener.dispatch(
+                json.dumps({"model": "user.userrole", "pks": ["TEST"], "deleted": True})
+            )
+
+            # inactive users are not readable with the filters
+            self.assertEqual(
+                await self._read_event(stream),
+                b'event: changes\ndata: {"changed": ["%s"], "deleted": ["%s"]}\n\n'
+                % (USER_ID3.encode(), USER_ID1.encode()),
+            )
+
+            listener.reset()
+
+            self.assertEqual(await self._read_event(stream), b"event: reset\ndata: {}\n\n")
+        finally:
+            await self._close_events(stream)
+
+        self.assertFalse(get_listener().subscriptions)
+
+    async def test_events_not_readable(self):
+        response, stream = await self._open_events(is_active=True)
+        try:
+            await self._read_event(stream)
+
+            get_listener().dispatch(
+                json.dumps({"model": "user.user", "pks": [USER_ID4], "deleted": False})
+            )
+            get_listener().dispatch(
+                json.dumps({"model": "user.user", "pks": [USER_ID2], "deleted": False})
+            )
+
+            # no event for the first change
+            self.assertEqual(
+                await self._read_event(stream),
+                b'event: changes\ndata: {"changed": ["%s"], "deleted": []}\n\n'
+                % USER_ID2.encode(),
+            )
+        finally:
+            await self._close_events(stream)
+
+    async def test_events_deleted_readable_only(self):
+        response, stream = await self._open_events(is_active=True)
+        try:
+            await self._read_event(stream)
+            listener = get_listener()
+
+            # never readable by the client: not reported
+            listener.dispatch(
+                json.dumps({"model": "user.user", "pks": [USER_ID4], "deleted": True})
+            )
+            # no longer readable: reported as deleted
+            await User.objects.filter(pk=USER_ID3).aupdate(is_active=False)
+            listener.dispatch(
+                json.dumps({"model": "user.user", "pks": [USER_ID3], "deleted": False})
+            )
+
+            self.assertEqual(
+                await self._read_event(stream),
+                b'event: changes\ndata: {"changed": [], "deleted": ["%s"]}\n\n'
+                % USER_ID3.encode(),
+            )
+
+            # already reported
+            listener.dispatch(
+                json.dumps({"model": "user.user", "pks": [USER_ID3], "deleted": True})
+            )
+            listener.dispatch(
+                json.dumps({"model": "user.user", "pks": [USER_ID2], "deleted": True})
+            )
+
+            self.assertEqual(
+                await self._read_event(stream),
+                b'event: changes\ndata: {"changed": [], "deleted": ["%s"]}\n\n'
+                % USER_ID2.encode(),
+            )
+        finally:
+            await self._close_events(stream)
+
+    async def test_events_keepalive(self):
+        with override_settings(API_EVENTS_KEEPALIVE=0.01):
+            response, stream = await self._open_events()
+            try:
+                await self._read_event(stream)
+
+                self.assertEqual(await self._read_event(stream), b": keep-alive\n\n")
+            finally:
+                await self._close_events(stream)
+
+    async def test_events_listen(self):
+        listener = ChangeListener("test_changes")
+        subscription = listener.subscribe(User)
+        try:
+            await asyncio.wait_for(subscription.wait_listening(), 10)
+            # notification committed by another process
+            async with await psycopg.AsyncConnection.connect(
+                **listener._get_connection_params(), autocommit=True
+            ) as conn:
+                await conn.execute(
+                    "SELECT pg_notify('test_changes', %s)",
+                    [json.dumps({"model": "user.user", "pks": [USER_ID3], "deleted": False})],
+                )
+            items = await subscription.get(timeout=10)
+        finally:
+            subscription.close()
+
+        self.assertEqual(items, [ChangeEvent("user.user", [USER_ID3], False)])
+        self.assertIsNone(listener._task)
+
+    async def test_events_overflow(self):
+        listener = ChangeListener("test_changes")
+        subscription = listener.subscribe(User, max_size=2)
+        try:
+            for pk in [USER_ID1, USER_ID2, USER_ID3]:
+                listener.dispatch(
+                    json.dumps({"model": "user.user", "pks": [pk], "deleted": False})
+                )
+            items = await subscription.get(timeout=10)
+        finally:
+            subscription.close()
+
+        self.assertEqual(items, [RESET])
+
+    def test_events_notified(self):
+        with CaptureQueriesContext(connection) as context:
+            self.user_pipin.save()
+
+        notify_queries = [
+            query for query in context.captured_queries if "pg_notify" in query["sql"]
+        ]
+        self.assertEqual(len(notify_queries), 1)
+        self.assertIn(USER_ID3, notify_queries[0]["sql"])
+
+    @parameterized.expand(
+        [
+            ("totem.user.create", 403),
+            ("totem.user.read", 501),  # not served by ASGI
+            ("totem.user.update", 403),
+            ("totem.user.delete", 403),
+        ]
+    )
+    def test_events_access_rights(self, scope, status_code):
+        self.user_access_token_frodon.scope = scope
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self.do_api_request(self.url, "GET", self.user_access_token_frodon.token)
+
+        self.assertEqual(response.status_code, status_code)
@@ -1,15 +1,35 @@
+import csv
+import io
+import json
+import threading
+from unittest import mock
+
+import msgpack
+from django.db import connection, connections
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from freezegun import freeze_time
 from parameterized import parameterized
 
+from core.api import idempotency
+from core.changes import compact_changes, get_record_marker
+from core.choices import JobStatus
+from core.jobs import Worker
+from core.models import ChangeLog, IdempotencyKey, Job
 from core.testing import APITestCaseMixin
+from totem.api import api_v1
+from user import signals
+from user.api.users import UserController
 from user.choices import UserType
-from user.models import User
+from user.models import User, UserRole, UserRoleRelation
+from user.schemas import UserSchema
 
 from .common import USER_ID1, USER_ID2, USER_ID3, CommonTestMixin
 
 USER_ID4 = "49c7b4f5-b436-4c47-bea1-d3e60b9ab492"
 USER_ID5 = "5263de93-e694-11ef-b873-34610551afcd"
+USER_ID_UNKNOWN = "0d6e3c43-6f8b-4f3c-9d6a-2a3e4b5c6d7e"
 
 
 @freeze_time("2024-11-18 11:12:13")
@@ -36,6 +56,10 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
         cls.url = "/api/v1/users/"
         cls.url_detail = f"/api/v1/users/{USER_ID2}/"
         cls.url_profile = "/api/v1/users/me/"
+        cls.url_export = "/api/v1/users/export/"
+        cls.url_stats = "/api/v1/users/stats/"
+        cls.url_changes = "/api/v1/users/changes/"
+        cls.url_bulk = "/api/v1/users/bulk/"
         cls.payload_create = {
             "username": "pipin",
             "email": "pipin@lacomte.com",
@@ -220,6 +244,165 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
                 ],
             )
 
+    def test_list_query_count(self):
+        self.user_pipin.roles.set([self.role])
+        self.user_galadriel.roles.set([self.role])
+
+        query_counts = []
+        for page_size in [1, 4]:
+            with CaptureQueriesContext(connection) as context:
+                response = self.do_api_request(
+                    self.url,
+                    "GET",
+                    self.user_access_token_frodon.token,
+                    params={"page_size": page_size},
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["results"]), page_size)
+            query_counts.append(len(context.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_list_values_serialization(self):
+        self.user_pipin.roles.set([self.role])
+        User.objects.filter(pk=self.user_pipin.pk).update(avatar="avatars/pipin.png")
+
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        for item in data["results"]:
+            obj = User.objects.get(pk=item["id"])
+            self.assertEqual(item, UserSchema.model_validate(obj).model_dump(mode="json"))
+
+    def test_list_expand(self):
+        self.user_pipin.roles.set([self.role])
+
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token, params={"expand": "roles"}
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["count"], User.objects.count())
+        for item in data["results"]:
+            obj = User.objects.get(pk=item["id"])
+            self._assert_api_format(item, obj, None, expand=True)
+
+    def test_list_expand_queries(self):
+        self.user_pipin.roles.set([self.role])
+
+        with CaptureQueriesContext(connection) as context_one:
+            self.do_api_request(
+                self.url,
+                "GET",
+                self.user_access_token_frodon.token,
+                params={"expand": "roles", "page_size": 1},
+            )
+        with CaptureQueriesContext(connection) as context_all:
+            response = self.do_api_request(
+                self.url, "GET", self.user_access_token_frodon.token, params={"expand": "roles"}
+            )
+
+        self.assertEqual(len(response.json()["results"]), User.objects.count())
+        self.assertEqual(len(context_one.captured_queries), len(context_all.captured_queries))
+
+    def test_list_expand_unknown(self):
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token, params={"expand": "roles,password"}
+        )
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_retrieve_expand(self):
+        User.objects.get(pk=USER_ID2).roles.set([self.role])
+
+        response = self.do_api_request(
+            self.url_detail, "GET", self.user_access_token_frodon.token, params={"expand": "roles"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self._assert_api_format(response.json(), User.objects.get(pk=USER_ID2), None, expand=True)
+
+        response = self.do_api_request(
+            self.url_detail, "GET", self.user_access_token_frodon.token
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["roles"], [self.role.pk])
+
+    def test_list_conditional(self):
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        etag = response["ETag"]
+
+        self.assertEqual(response.status_code, 200)
+
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+        self.user_pipin.first_name = "Peregrin"
+        self.user_pipin.save(update_fields=["first_name"])
+
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_conditional_marker_bounded(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.do_api_request(
+                self.url, "GET", self.user_access_token_frodon.token
+            )
+
+        self.assertEqual(response.status_code, 200)
+        # only the entries of the transactions not finished at the oldest running one are
+        # aggregated, not the whole log
+        aggregates = [
+            query["sql"]
+            for query in context.captured_queries
+            if 'FROM "core_changelog"' in query["sql"] and "COUNT(" in query["sql"]
+        ]
+        self.assertEqual(len(aggregates), 2)  # users and roles
+        for sql in aggregates:
+            self.assertIn('"core_changelog"."txid" >= ', sql)
+
+    def test_list_conditional_relations(self):
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        etag = response["ETag"]
+
+        # not modified: the users are not serialized
+        with mock.patch.object(UserController, "get_list_values_serializer") as serializer:
+            response = self.do_api_request(
+                self.url, "GET", self.user_access_token_frodon.token, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        serializer.assert_not_called()
+
+        # only a many-to-many relation changed
+        self.user_pipin.roles.add(self.role)
+
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        pipin = next(item for item in response.json()["results"] if item["id"] == USER_ID3)
+        self.assertEqual(pipin["roles"], [self.role.pk])
+
     @parameterized.expand(
         [
             ("totem.user.create", 403),
@@ -243,6 +426,400 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
                 data, {"message": "You do not have permission to perform this action."}
             )
 
+    # ------------------------------------------
+    # Content Negotiation
+    # ------------------------------------------
+
+    @parameterized.expand(
+        [
+            ({}, None),
+            ({"expand": "roles"}, None),
+            ({}, USER_ID2),
+            ({"expand": "roles"}, USER_ID2),
+        ]
+    )
+    def test_msgpack_response(self, params, pk):
+        url = f"{self.url}{pk}/" if pk else self.url
+        response = self.do_api_request(
+            url, "GET", self.user_access_token_frodon.token, params=params
+        )
+        data = response.json()
+
+        response = self.do_api_request(
+            url,
+            "GET",
+            self.user_access_token_frodon.token,
+            params=params,
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertIn("Accept", response["Vary"])
+        self.assertEqual(msgpack.unpackb(response.content), data)
+
+    @parameterized.expand(
+        [
+            ("application/msgpack", "application/msgpack"),
+            ("application/x-msgpack", "application/msgpack"),
+            ("application/json, application/msgpack", "application/msgpack"),
+            ("application/json, application/msgpack;q=0.5", "application/json; charset=utf-8"),
+            ("application/msgpack;q=0", "application/json; charset=utf-8"),
+            ("*/*", "application/json; charset=utf-8"),
+            ("text/html", "application/json; charset=utf-8"),
+        ]
+    )
+    def test_msgpack_negotiation(self, accept, content_type):
+        response = self.do_api_request(
+            self.url_detail,
+            "GET",
+            self.user_access_token_frodon.token,
+            HTTP_ACCEPT=accept,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], content_type)
+
+    def test_msgpack_error_response(self):
+        response = self.do_api_request(
+            f"{self.url}{USER_ID_UNKNOWN}/",
+            "GET",
+            self.user_access_token_frodon.token,
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(msgpack.unpackb(response.content), {"message": "Object not found"})
+
+    def test_msgpack_request(self):
+        response = self.do_api_request(
+            self.url,
+            "POST",
+            self.user_access_token_frodon.token,
+            data=msgpack.packb(self.payload_create),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        data = msgpack.unpackb(response.content)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(data["username"], self.payload_create["username"])
+        self.assertTrue(User.objects.filter(pk=data["id"]).exists())
+
+    def test_msgpack_request_invalid(self):
+        response = self.do_api_request(
+            self.url,
+            "POST",
+            self.user_access_token_frodon.token,
+            data=b"\xc1",
+            content_type="application/msgpack",
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    # ------------------------------------------
+    # Export Operation
+    # ------------------------------------------
+
+    def test_export_ndjson(self):
+        self.user_pipin.roles.set([self.role])
+
+        response = self.do_api_request(
+            self.url_export,
+            "GET",
+            self.user_access_token_frodon.token,
+            params={"is_active": True, "ordering": "-username"},
+        )
+        content = b"".join(response.streaming_content).decode()
+        items = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        queryset = User.objects.filter(is_active=True).order_by("-username")
+        self.assertEqual([item["id"] for item in items], [str(u.pk) for u in queryset])
+        for item in items:
+            obj = User.objects.get(pk=item["id"])
+            self.assertEqual(item, UserSchema.model_validate(obj).model_dump(mode="json"))
+
+    def test_export_csv(self):
+        self.user_pipin.roles.set([self.role])
+
+        response = self.do_api_request(
+            self.url_export,
+            "GET",
+            self.user_access_token_frodon.token,
+            params={"format": "csv"},
+        )
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="users.csv"', response["Content-Disposition"])
+        self.assertEqual(len(rows), User.objects.count())
+        self.assertEqual(list(rows[0]), list(UserSchema.model_fields))
+        row = next(row for row in rows if row["id"] == str(self.user_pipin.pk))
+        self.assertEqual(json.loads(row["roles"]), [self.role.pk])
+        self.assertEqual(row["is_active"], "true")
+
+    async def test_export_asgi(self):
+        response = await self.async_client.get(
+            self.url_export,
+            {"ordering": "username"},
+            headers={"Authorization": f"Bearer {self.user_access_token_frodon.token}"},
+        )
+
+        # streamed chunk by chunk, not read entirely before being sent
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        usernames = [json.loads(line)["username"] for line in content.splitlines()]
+        self.assertEqual(
+            usernames,
+            [user.username async for user in User.objects.order_by("username")],
+        )
+
+    @parameterized.expand(
+        [
+            ("totem.user.create", 403),
+            ("totem.user.read", 200),
+            ("totem.user.update", 403),
+            ("totem.user.delete", 403),
+        ]
+    )
+    def test_export_access_rights(self, scope, status_code):
+        self.user_access_token_frodon.scope = scope
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self.do_api_request(
+            self.url_export, "GET", self.user_access_token_frodon.token
+        )
+
+        self.assertEqual(response.status_code, status_code)
+
+    def test_stats_response(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.do_api_request(
+                self.url_stats,
+                "GET",
+                self.user_access_token_frodon.token,
+                params={
+                    "group_by": "user_type,is_active",
+                    "aggregates": "count,max_date_joined",
+                },
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "user_type": "INTERNAL",
+                    "is_active": False,
+                    "count": 1,
+                    "max_date_joined": "2024-11-18T11:12:13Z",
+                },
+                {
+                    "user_type": "INTERNAL",
+                    "is_active": True,
+                    "count": 2,
+                    "max_date_joined": "2024-11-18T11:12:13Z",
+                },
+                {
+                    "user_type": "PORTAL",
+                    "is_active": True,
+                    "count": 1,
+                    "max_date_joined": "2024-11-18T11:12:13Z",
+                },
+            ],
+        )
+        stats_queries = [
+            query for query in context.captured_queries if "GROUP BY" in query["sql"]
+        ]
+        self.assertEqual(len(stats_queries), 1)
+
+    def test_stats_filters(self):
+        response = self.do_api_request(
+            self.url_stats,
+            "GET",
+            self.user_access_token_frodon.token,
+            params={"is_active": True},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{"count": 3}])
+
+    @parameterized.expand(
+        [
+            ({"group_by": "password"}, 422),
+            ({"aggregates": "max_password"}, 422),
+            ({"aggregates": ""}, 422),
+            ({"group_by": "language", "aggregates": "min_last_login"}, 200),
+        ]
+    )
+    def test_stats_validation(self, params, status_code):
+        response = self.do_api_request(
+            self.url_stats, "GET", self.user_access_token_frodon.token, params=params
+        )
+
+        self.assertEqual(response.status_code, status_code)
+
+    @parameterized.expand(
+        [
+            ("totem.user.create", 403),
+            ("totem.user.read", 200),
+            ("totem.user.update", 403),
+            ("totem.user.delete", 403),
+        ]
+    )
+    def test_stats_access_rights(self, scope, status_code):
+        self.user_access_token_frodon.scope = scope
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self.do_api_request(
+            self.url_stats, "GET", self.user_access_token_frodon.token
+        )
+
+        self.assertEqual(response.status_code, status_code)
+
+    # ------------------------------------------
+    # Changes Operation
+    # ------------------------------------------
+
+    def _get_changes(self, cursor=None, **params):
+        if cursor is not None:
+            params["changed_since"] = cursor
+        return self.do_api_request(
+            self.url_changes, "GET", self.user_access_token_frodon.token, params=params
+        )
+
+    def _get_last_cursor(self):
+        """Cursor after all the changes done so far (test data included)."""
+        cursor = self._get_changes().json()["cursor"]
+        while True:
+            data = self._get_changes(cursor).json()
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                return cursor
+
+    def test_changes_without_cursor(self):
+        response = self._get_changes()
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data["cursor"])
+        self.assertEqual(data["changed"], [])
+        self.assertEqual(data["deleted"], [])
+        self.assertFalse(data["has_more"])
+
+    def test_changes_response(self):
+        cursor = self._get_last_cursor()
+
+        self.user_pipin.first_name = "Peregrin"
+        self.user_pipin.save()
+        User.objects.filter(pk=USER_ID4).update(user_type=UserType.PORTAL)
+        self.user_gollum.roles.clear()
+        self.user_galadriel.delete()
+
+        response = self._get_changes(cursor)
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [user["id"] for user in data["changed"]], [USER_ID3, USER_ID2]
+        )
+        self.assertEqual(data["changed"][0]["first_name"], "Peregrin")
+        self.assertEqual(data["changed"][1]["roles"], [])
+        self.assertEqual(data["deleted"], [USER_ID4])
+        self.assertFalse(data["has_more"])
+
+        # nothing changed since
+        data = self._get_changes(data["cursor"]).json()
+
+        self.assertEqual(data["changed"], [])
+        self.assertEqual(data["deleted"], [])
+
+    def test_changes_role_relation(self):
+        cursor = self._get_last_cursor()
+
+        UserRoleRelation.objects.filter(user_id=USER_ID2).delete()
+
+        data = self._get_changes(cursor).json()
+
+        self.assertEqual([user["id"] for user in data["changed"]], [USER_ID2])
+        self.assertEqual(data["changed"][0]["roles"], [])
+
+    def test_changes_filtered(self):
+        cursor = self._get_last_cursor()
+
+        User.objects.filter(pk=USER_ID3).update(is_active=False)
+
+        # not matching the filters anymore: deleted for the client
+        data = self._get_changes(cursor, is_active=True).json()
+
+        self.assertEqual(data["changed"], [])
+        self.assertEqual(data["deleted"], [USER_ID3])
+
+    def test_changes_pagination(self):
+        cursor = self._get_last_cursor()
+
+        for user in [self.user_pipin, self.user_galadriel, self.user_gollum]:
+            user.save()
+
+        data = self._get_changes(cursor, limit=2).json()
+
+        self.assertEqual([user["id"] for user in data["changed"]], [USER_ID3, USER_ID4])
+        self.assertTrue(data["has_more"])
+
+        data = self._get_changes(data["cursor"], limit=2).json()
+
+        self.assertEqual([user["id"] for user in data["changed"]], [USER_ID2])
+        self.assertFalse(data["has_more"])
+
+    def test_changes_compaction(self):
+        cursor = self._get_last_cursor()
+
+        for dummy in range(3):
+            self.user_pipin.save()
+        outdated = (
+            ChangeLog.objects.count()
+            - ChangeLog.objects.values("model", "object_id").distinct().count()
+        )
+
+        self.assertEqual(compact_changes(), outdated)
+        self.assertEqual(ChangeLog.objects.filter(object_id=USER_ID3).count(), 1)
+
+        data = self._get_changes(cursor).json()
+
+        self.assertEqual([user["id"] for user in data["changed"]], [USER_ID3])
+
+    @parameterized.expand(
+        [
+            ("invalid",),
+            ("1.a",),
+        ]
+    )
+    def test_changes_validation(self, cursor):
+        response = self._get_changes(cursor)
+
+        self.assertEqual(response.status_code, 422)
+
+    @parameterized.expand(
+        [
+            ("totem.user.create", 403),
+            ("totem.user.read", 200),
+            ("totem.user.update", 403),
+            ("totem.user.delete", 403),
+        ]
+    )
+    def test_changes_access_rights(self, scope, status_code):
+        self.user_access_token_frodon.scope = scope
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self._get_changes()
+
+        self.assertEqual(response.status_code, status_code)
+
     # ------------------------------------------
     # Create Operation
     # ------------------------------------------
@@ -258,6 +835,8 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
             ({"last_name": None}, 201),
             ({"language": "not supported language"}, 422),
             ({"language": None}, 422),
+            # the changes of the relation are only accepted by the updates
+            ({"roles": {"add": ["TEST_BASEUSER"]}}, 422),
         ]
     )
     def test_create_request_field_validation(self, extra_body, status_code):
@@ -298,118 +877,686 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
                 "avatar",
                 "roles",
             ],
-            expand=True,
         )
 
+    def test_create_query_count_roles(self):
+        counts = []
+
+        def create_postprocess(controller, request, instance):
+            # the prefetched relation is still usable as a manager
+            counts.append(instance.roles.count())
+
+        with CaptureQueriesContext(connection) as context, mock.patch.object(
+            UserController, "_create_postprocess", create_postprocess
+        ):
+            response = self.do_api_request(
+                self.url,
+                "POST",
+                self.user_access_token_frodon.token,
+                data={**self.payload_create, "roles": [self.role.pk]},
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["roles"], [self.role.pk])
+        # roles are read once, when validating the request, and serialized from it
+        self.assertEqual(len(self._get_role_selects(context)), 1)
+        self.assertEqual(counts, [1])
+
+    def test_update_roles_prefetched(self):
+        results = []
+
+        def update_postprocess(controller, request, instance):
+            results.append(
+                (
+                    instance.roles.count(),
+                    instance.roles.exists(),
+                    list(instance.roles.filter(pk=self.role.pk)),
+                    list(instance.roles.values_list("pk", flat=True)),
+                )
+            )
+
+        with mock.patch.object(UserController, "_update_postprocess", update_postprocess):
+            response = self.do_api_request(
+                self.url_detail,
+                "PATCH",
+                self.user_access_token_frodon.token,
+                data={"roles": [self.role.pk]},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(results, [(1, True, [self.role], [self.role.pk])])
+
+    @parameterized.expand(
+        [
+            ("totem.user.create", 201),
+            ("totem.user.read", 403),
+            ("totem.user.update", 403),
+            ("totem.user.delete", 403),
+        ]
+    )
+    def test_create_access_rights(self, scope, status_code):
+        self.user_access_token_frodon.scope = scope
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self.do_api_request(
+            self.url,
+            "POST",
+            self.user_access_token_frodon.token,
+            data=self.payload_create,
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, status_code)
+        if status_code != 201:
+            self.assertEqual(
+                data, {"message": "You do not have permission to perform this action."}
+            )
+
+    # ------------------------------------------
+    # Update Operation
+    # ------------------------------------------
+
+    @parameterized.expand(
+        [
+            ({"email": None}, 422),
+            ({"email": "not an email"}, 422),
+            ({"user_type": None}, 422),
+            ({"user_type": "not correct user_type"}, 422),
+            ({"first_name": None}, 200),
+            ({"last_name": None}, 200),
+            ({"language": "not supported language"}, 422),
+            ({"language": None}, 422),
+        ]
+    )
+    def test_update_request_field_validation(self, extra_body, status_code):
+        data = self.payload_update
+        data.update(extra_body)
+
+        response = self.do_api_request(
+            self.url_detail, "PATCH", self.user_access_token_frodon.token, data=data
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, status_code)
+
+    def test_update_response(self):
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data=self.payload_update,
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+
+        obj = User.objects.get(id=USER_ID2)
+        self._assert_api_format(
+            data,
+            obj,
+            [
+                "id",
+                "username",
+                "email",
+                "first_name",
+                "last_name",
+                "language",
+                "is_active",
+                "user_type",
+                "avatar",
+                "roles",
+            ],
+        )
+
+    def test_update_query_count_roles(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.do_api_request(
+                self.url_detail,
+                "PATCH",
+                self.user_access_token_frodon.token,
+                data={**self.payload_update, "roles": [self.role.pk]},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["roles"], [self.role.pk])
+        self.assertEqual(list(User.objects.get(pk=USER_ID2).roles.all()), [self.role])
+        # roles are read once, when validating the request, and serialized from it
+        self.assertEqual(len(self._get_role_selects(context)), 1)
+
+    def test_update_unchanged(self):
+        payload = {
+            "username": "gollum@precious.com",
+            "email": "gollum@precious.com",
+            "user_type": UserType.PORTAL,
+            "roles": [self.role.pk],
+        }
+        calls = self._capture_rights_signals()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.do_api_request(
+                self.url_detail, "PATCH", self.user_access_token_frodon.token, data=payload
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user_type"], UserType.PORTAL)
+        # nothing written, no rights change
+        self.assertFalse(
+            [
+                query
+                for query in context.captured_queries
+                if query["sql"].startswith(("UPDATE", "INSERT", "DELETE"))
+            ]
+        )
+        self.assertEqual(calls, [])
+
+    def test_update_changed_fields(self):
+        payload = {"user_type": UserType.PORTAL, "first_name": "Smeagol"}
+        calls = self._capture_rights_signals()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.do_api_request(
+                self.url_detail, "PATCH", self.user_access_token_frodon.token, data=payload
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(User.objects.get(pk=USER_ID2).first_name, "Smeagol")
+        updates = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('UPDATE "user_user"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"first_name" = ', updates[0])
+        self.assertNotIn("user_type", updates[0])
+        # the user type is unchanged
+        self.assertEqual(calls, [])
+
+    def test_update_if_match(self):
+        response = self.do_api_request(self.url_detail, "GET", self.user_access_token_frodon.token)
+        etag = response["ETag"]
+        self.assertEqual(etag, self._get_etag(1))
+
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"first_name": "Smeagol"},
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], self._get_etag(2))
+
+        # outdated version
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"first_name": "Gollum"},
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(
+            response.json(), {"detail": "The object was modified since you read it."}
+        )
+        self.assertEqual(User.objects.get(pk=USER_ID2).first_name, "Smeagol")
+
+    @parameterized.expand(
+        [
+            ("{current}", 200),
+            ("{current_msgpack}", 200),  # read as MessagePack
+            ("{current}, {next}", 200),
+            ("*", 200),
+            ("W/{current}", 412),  # weak comparison not allowed
+            ("{next}", 412),
+            ('"1"', 412),
+            ('"1-json"', 412),  # the changes of the record are part of the version
+        ]
+    )
+    def test_update_if_match_header(self, header, status_code):
+        header = header.format(
+            current=self._get_etag(1),
+            current_msgpack=self._get_etag(1, "msgpack"),
+            next=self._get_etag(2),
+        )
+
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"first_name": "Smeagol"},
+            HTTP_IF_MATCH=header,
+        )
+
+        self.assertEqual(response.status_code, status_code)
+
+    def test_update_roles_version(self):
+        role_other = UserRole.objects.create(id="OTHER_BASEUSER", name="Role Other")
+        response = self.do_api_request(self.url_detail, "GET", self.user_access_token_frodon.token)
+        etag = response["ETag"]
+
+        # only the relation is written
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"roles": [role_other.pk]},
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], self._get_etag(2))
+        self.assertEqual(User.objects.get(pk=USER_ID2).version, 2)
+
+        response = self.do_api_request(
+            self.url_detail, "GET", self.user_access_token_frodon.token, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["roles"], [role_other.pk])
+
+        # outdated version
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"roles": {"add": [self.role.pk]}},
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(list(User.objects.get(pk=USER_ID2).roles.all()), [role_other])
+
+    def test_update_roles_version_conflict(self):
+        # modified between the read and the write of the request
+        original_check = UserController.check_precondition
+
+        def check_precondition(controller, instance):
+            original_check(controller, instance)
+            User.objects.filter(pk=instance.pk).update(first_name="Gollum")
+
+        with mock.patch.object(UserController, "check_precondition", check_precondition):
+            response = self.do_api_request(
+                self.url_detail,
+                "PATCH",
+                self.user_access_token_frodon.token,
+                data={"roles": []},
+            )
+
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(list(User.objects.get(pk=USER_ID2).roles.all()), [self.role])
+
+    def test_retrieve_etag_media_type(self):
+        response = self.do_api_request(self.url_detail, "GET", self.user_access_token_frodon.token)
+        etag = response["ETag"]
+
+        response = self.do_api_request(
+            self.url_detail,
+            "GET",
+            self.user_access_token_frodon.token,
+            HTTP_ACCEPT="application/msgpack",
+            HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], self._get_etag(1, "msgpack"))
+        self.assertEqual(msgpack.unpackb(response.content)["id"], USER_ID2)
+
+    def test_retrieve_etag_relation_written(self):
+        role_other = UserRole.objects.create(id="OTHER_BASEUSER", name="Role Other")
+        response = self.do_api_request(self.url_detail, "GET", self.user_access_token_frodon.token)
+        etag = response["ETag"]
+
+        # written without the API: the version of the user is unchanged
+        UserRoleRelation.objects.create(user=self.user_gollum, role=role_other)
+
+        response = self.do_api_request(
+            self.url_detail, "GET", self.user_access_token_frodon.token, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()["roles"]), [role_other.pk, self.role.pk])
+        self.assertNotEqual(response["ETag"], etag)
+
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"first_name": "Smeagol"},
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 412)
+
+    @parameterized.expand([("instance",), ("queryset",)])
+    def test_retrieve_etag_role_deleted(self, method):
+        role_other = UserRole.objects.create(id="OTHER_BASEUSER", name="Role Other")
+        UserRoleRelation.objects.create(user=self.user_gollum, role=role_other)
+        response = self.do_api_request(self.url_detail, "GET", self.user_access_token_frodon.token)
+        etag = response["ETag"]
+
+        # the relations are deleted in cascade
+        if method == "instance":
+            role_other.delete()
+        else:
+            UserRole.objects.filter(pk=role_other.pk).delete()
+
+        response = self.do_api_request(
+            self.url_detail, "GET", self.user_access_token_frodon.token, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["roles"], [self.role.pk])
+
+    def test_update_version_conflict(self):
+        # modified between the read and the write of the request
+        original_save = User.save
+
+        def concurrent_save(instance, *args, **kwargs):
+            User.objects.filter(pk=instance.pk).update(last_name="Smeagol")
+            return original_save(instance, *args, **kwargs)
+
+        with mock.patch.object(User, "save", concurrent_save):
+            response = self.do_api_request(
+                self.url_detail,
+                "PATCH",
+                self.user_access_token_frodon.token,
+                data={"first_name": "Gollum"},
+            )
+
+        self.assertEqual(response.status_code, 412)
+        # the request is rolled back (including the simulated concurrent write here)
+        self.assertIsNone(User.objects.get(pk=USER_ID2).first_name)
+
+    def test_update_roles_delta(self):
+        role_admin = UserRole.objects.create(id="TEST_ADMIN", name="Role Test (Admin)")
+        role_other = UserRole.objects.create(id="OTHER_BASEUSER", name="Role Other")
+        calls = self._capture_rights_signals()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.do_api_request(
+                self.url_detail,
+                "PATCH",
+                self.user_access_token_frodon.token,
+                data={"roles": {"add": [role_admin.pk, role_other.pk], "remove": [self.role.pk]}},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()["roles"]), [role_other.pk, role_admin.pk])
+        self.assertEqual(
+            set(User.objects.get(pk=USER_ID2).roles.all()), {role_admin, role_other}
+        )
+        # the current relation is not read to be compared
+        self.assertFalse(
+            [
+                query
+                for query in context.captured_queries
+                if query["sql"].startswith('SELECT "user_userrole"."id" FROM')
+            ]
+        )
+        self.assertEqual(calls, [{USER_ID2}])
+
+    def test_update_roles_delta_openapi(self):
+        schemas = api_v1.get_openapi_schema()["components"]["schemas"]
+
+        update_roles = schemas["UserUpdateSchema"]["properties"]["roles"]["anyOf"][0]
+        self.assertEqual(
+            [schema["type"] for schema in update_roles["anyOf"]], ["array", "object"]
+        )
+        self.assertEqual(
+            set(update_roles["anyOf"][1]["properties"]), {"add", "remove"}
+        )
+        self.assertEqual(schemas["UserCreateSchema"]["properties"]["roles"]["type"], "array")
+
+    def test_update_roles_delta_partial(self):
+        role_other = UserRole.objects.create(id="OTHER_BASEUSER", name="Role Other")
+
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"roles": {"add": [role_other.pk]}},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()["roles"]), [role_other.pk, self.role.pk])
+
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"roles": {"remove": [self.role.pk, "UNKNOWN_ROLE"]}},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["roles"], [role_other.pk])
+
+    @parameterized.expand(
+        [
+            ({"add": ["UNKNOWN_ROLE"]}, 422),
+            ({"add": ["TEST_BASEUSER"], "remove": ["TEST_BASEUSER"]}, 422),
+            ({"replace": ["TEST_BASEUSER"]}, 422),
+            ({"add": "TEST_BASEUSER"}, 422),
+            ({}, 200),
+        ]
+    )
+    def test_update_roles_delta_validation(self, roles, status_code):
+        response = self.do_api_request(
+            self.url_detail,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data={"roles": roles},
+        )
+
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(list(User.objects.get(pk=USER_ID2).roles.all()), [self.role])
+
     @parameterized.expand(
         [
-            ("totem.user.create", 201),
+            ("totem.user.create", 403),
             ("totem.user.read", 403),
-            ("totem.user.update", 403),
+            ("totem.user.update", 200),
             ("totem.user.delete", 403),
         ]
     )
-    def test_create_access_rights(self, scope, status_code):
+    def test_update_access_rights(self, scope, status_code):
         self.user_access_token_frodon.scope = scope
         self.user_access_token_frodon.save(update_fields=["scope"])
 
         response = self.do_api_request(
-            self.url,
-            "POST",
+            self.url_detail,
+            "PATCH",
             self.user_access_token_frodon.token,
-            data=self.payload_create,
+            data=self.payload_update,
         )
         data = response.json()
 
         self.assertEqual(response.status_code, status_code)
-        if status_code != 201:
+        if status_code != 200:
             self.assertEqual(
                 data, {"message": "You do not have permission to perform this action."}
             )
 
     # ------------------------------------------
-    # Update Operation
+    # Idempotency
     # ------------------------------------------
 
-    @parameterized.expand(
-        [
-            ({"email": None}, 422),
-            ({"email": "not an email"}, 422),
-            ({"user_type": None}, 422),
-            ({"user_type": "not correct user_type"}, 422),
-            ({"first_name": None}, 200),
-            ({"last_name": None}, 200),
-            ({"language": "not supported language"}, 422),
-            ({"language": None}, 422),
+    def test_create_idempotent_replay(self):
+        responses = [
+            self.do_api_request(
+                self.url,
+                "POST",
+                self.user_access_token_frodon.token,
+                data=self.payload_create,
+                HTTP_IDEMPOTENCY_KEY="create-replay",
+            )
+            for dummy in range(2)
         ]
-    )
-    def test_update_request_field_validation(self, extra_body, status_code):
-        data = self.payload_update
-        data.update(extra_body)
 
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[0].content, responses[1].content)
+        self.assertNotIn("Idempotent-Replayed", responses[0])
+        self.assertEqual(responses[1]["Idempotent-Replayed"], "true")
+        self.assertEqual(User.objects.filter(username="pipin").count(), 1)
+
+    def test_create_idempotent_expired(self):
         response = self.do_api_request(
-            self.url_detail, "PATCH", self.user_access_token_frodon.token, data=data
+            self.url,
+            "POST",
+            self.user_access_token_frodon.token,
+            data=self.payload_create,
+            HTTP_IDEMPOTENCY_KEY="create-expired",
         )
-        data = response.json()
+        self.assertEqual(response.status_code, 201)
 
-        self.assertEqual(response.status_code, status_code)
+        # stored in the database, shared by the processes
+        entry = IdempotencyKey.objects.get()
+        self.assertIsNone(entry.pending)
+        self.assertEqual(entry.status_code, 201)
+        self.assertEqual(bytes(entry.content), response.content)
+
+        IdempotencyKey.objects.update(expire_date=timezone.now())
+        User.objects.filter(username="pipin").delete()
 
-    def test_update_response(self):
         response = self.do_api_request(
-            self.url_detail,
-            "PATCH",
+            self.url,
+            "POST",
             self.user_access_token_frodon.token,
-            data=self.payload_update,
+            data=self.payload_create,
+            HTTP_IDEMPOTENCY_KEY="create-expired",
         )
-        data = response.json()
 
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(User.objects.filter(username="pipin").count(), 1)
+        self.assertEqual(IdempotencyKey.objects.clear_expired(), 0)
+
+    def test_create_idempotent_lease(self):
+        results = []
+
+        def create_postprocess(controller, request, instance):
+            entry = IdempotencyKey.objects.get()
+            # processed for longer than the wait of the retries: still pending
+            with freeze_time("2024-11-18 11:14:13"):
+                retry = idempotency._Attempt(entry.key, entry.request_hash)
+                results.append(idempotency._check_entry(retry))
+            # the lease expired: taken over by the retry
+            with freeze_time("2024-11-18 12:14:13"):
+                retry = idempotency._Attempt(entry.key, entry.request_hash)
+                results.append(idempotency._check_entry(retry))
+            results.append(retry.token)
+
+        with mock.patch.object(UserController, "_create_postprocess", create_postprocess):
+            response = self.do_api_request(
+                self.url,
+                "POST",
+                self.user_access_token_frodon.token,
+                data=self.payload_create,
+                HTTP_IDEMPOTENCY_KEY="create-lease",
+            )
 
-        obj = User.objects.get(id=USER_ID2)
-        self._assert_api_format(
-            data,
-            obj,
-            [
-                "id",
-                "username",
-                "email",
-                "first_name",
-                "last_name",
-                "language",
-                "is_active",
-                "user_type",
-                "avatar",
-                "roles",
-            ],
-            expand=True,
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(results[:2], [False, True])
+        # the first attempt does not release the entry of the retry
+        entry = IdempotencyKey.objects.get()
+        self.assertEqual(entry.pending, results[2])
+        self.assertIsNone(entry.status_code)
+
+    def test_create_idempotent_other_request(self):
+        response = self.do_api_request(
+            self.url,
+            "POST",
+            self.user_access_token_frodon.token,
+            data=self.payload_create,
+            HTTP_IDEMPOTENCY_KEY="create-other",
         )
+        self.assertEqual(response.status_code, 201)
 
-    @parameterized.expand(
-        [
-            ("totem.user.create", 403),
-            ("totem.user.read", 403),
-            ("totem.user.update", 200),
-            ("totem.user.delete", 403),
-        ]
-    )
-    def test_update_access_rights(self, scope, status_code):
-        self.user_access_token_frodon.scope = scope
-        self.user_access_token_frodon.save(update_fields=["scope"])
+        response = self.do_api_request(
+            self.url,
+            "POST",
+            self.user_access_token_frodon.token,
+            data={**self.payload_create, "username": "merry"},
+            HTTP_IDEMPOTENCY_KEY="create-other",
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(
+            response.json(),
+            {"message": "The idempotency key was already used for another request."},
+        )
+        self.assertFalse(User.objects.filter(username="merry").exists())
+
+    def test_update_idempotent_not_found(self):
+        url = f"/api/v1/users/{USER_ID_UNKNOWN}/"
+        for dummy in range(2):
+            response = self.do_api_request(
+                url,
+                "PATCH",
+                self.user_access_token_frodon.token,
+                data=self.payload_update,
+                HTTP_IDEMPOTENCY_KEY="update-unknown",
+            )
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(response["Idempotent-Replayed"], "true")
 
+        # keys are unique per user
         response = self.do_api_request(
             self.url_detail,
             "PATCH",
             self.user_access_token_frodon.token,
             data=self.payload_update,
+            HTTP_IDEMPOTENCY_KEY="update-other-user",
         )
-        data = response.json()
+        self.assertEqual(response.status_code, 200)
 
-        self.assertEqual(response.status_code, status_code)
-        if status_code != 200:
-            self.assertEqual(
-                data, {"message": "You do not have permission to perform this action."}
+    def test_create_idempotent_concurrent(self):
+        create_postprocess = UserController._create_postprocess
+        processing, waiting, release = (threading.Event() for dummy in range(3))
+
+        def slow_create_postprocess(controller, request, instance):
+            processing.set()
+            release.wait(5)
+            return create_postprocess(controller, request, instance)
+
+        def check_entry(attempt):
+            result = check_entry.original(attempt)
+            if result is False:
+                waiting.set()
+            return result
+
+        check_entry.original = idempotency._check_entry
+
+        # requests of the threads see the data of the test transaction
+        shared_connection = connections["default"]
+        shared_connection.inc_thread_sharing()
+        responses = []
+
+        def do_request():
+            connections["default"] = shared_connection
+            responses.append(
+                self.do_api_request(
+                    self.url,
+                    "POST",
+                    self.user_access_token_frodon.token,
+                    data=self.payload_create,
+                    HTTP_IDEMPOTENCY_KEY="create-concurrent",
+                )
             )
 
+        with mock.patch.object(
+            UserController,
+            "_create_postprocess",
+            autospec=True,
+            side_effect=slow_create_postprocess,
+        ) as mocked, mock.patch.object(idempotency, "_check_entry", check_entry):
+            threads = [threading.Thread(target=do_request) for dummy in range(2)]
+            threads[0].start()
+            self.assertTrue(processing.wait(5))
+            threads[1].start()
+            self.assertTrue(waiting.wait(5))
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        shared_connection.dec_thread_sharing()
+
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[0].content, responses[1].content)
+        self.assertEqual(responses[1]["Idempotent-Replayed"], "true")
+        self.assertEqual(User.objects.filter(username="pipin").count(), 1)
+
     # ------------------------------------------
     # Delete Operation
     # ------------------------------------------
@@ -422,6 +1569,53 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
         self.assertEqual(response.status_code, 204)
         self.assertEqual(response.content, b"")
 
+    @parameterized.expand([(1, 204), (2, 412)])
+    def test_delete_if_match(self, version, status_code):
+        response = self.do_api_request(
+            self.url_detail,
+            "DELETE",
+            self.user_access_token_frodon.token,
+            HTTP_IF_MATCH=self._get_etag(version),
+        )
+
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(User.objects.filter(pk=USER_ID2).exists(), status_code == 412)
+
+    def test_delete_if_match_guarded(self):
+        etag = self._get_etag(1)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.do_api_request(
+                self.url_detail, "DELETE", self.user_access_token_frodon.token, HTTP_IF_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, 204)
+        deletes = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('DELETE FROM "user_user" WHERE')
+        ]
+        self.assertIn('"user_user"."version" = 1', deletes[0])
+        # the relations are deleted in cascade
+        self.assertFalse(UserRoleRelation.objects.filter(user_id=USER_ID2).exists())
+
+    def test_delete_if_match_conflict(self):
+        # modified between the read and the write of the request
+        etag = self._get_etag(1)
+        original_check = UserController.check_precondition
+
+        def check_precondition(controller, instance):
+            original_check(controller, instance)
+            User.objects.filter(pk=instance.pk).update(first_name="Gollum")
+
+        with mock.patch.object(UserController, "check_precondition", check_precondition):
+            response = self.do_api_request(
+                self.url_detail, "DELETE", self.user_access_token_frodon.token, HTTP_IF_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(User.objects.filter(pk=USER_ID2).exists())
+
     @parameterized.expand(
         [
             ("totem.user.create", 403),
@@ -485,13 +1679,273 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
                 data, {"message": "You do not have permission to perform this action."}
             )
 
+    # ------------------------------------------
+    # Bulk Operations
+    # ------------------------------------------
+
+    def _get_etag(self, version, media_type="json"):
+        count, last = get_record_marker(User, USER_ID2)
+        return f'"{version}.{count}.{last or 0}-{media_type}"'
+
+    def _capture_rights_signals(self):
+        calls = []
+
+        def receiver(sender, user_qs, **kwargs):
+            calls.append(set(str(pk) for pk in user_qs.values_list("pk", flat=True)))
+
+        signals.user_change_rights.connect(receiver, weak=False)
+        self.addCleanup(signals.user_change_rights.disconnect, receiver)
+        return calls
+
+    def test_bulk_create_response(self):
+        payload = [
+            {**self.payload_create, "username": f"hobbit{i}", "roles": [self.role.pk]}
+            for i in range(3)
+        ]
+        calls = self._capture_rights_signals()
+
+        response = self.do_api_request(
+            self.url_bulk, "POST", self.user_access_token_frodon.token, data=payload
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item["username"] for item in data], ["hobbit0", "hobbit1", "hobbit2"])
+        for item in data:
+            obj = User.objects.get(id=item["id"])
+            self._assert_api_format(item, obj, None)
+            self.assertEqual(list(obj.roles.all()), [self.role])
+        self.assertEqual(calls, [set(item["id"] for item in data)])
+
+    def test_bulk_create_validation(self):
+        payload = [
+            {**self.payload_create, "username": "hobbit0"},
+            {**self.payload_create, "username": "hobbit1", "email": "not an email"},
+        ]
+
+        response = self.do_api_request(
+            self.url_bulk, "POST", self.user_access_token_frodon.token, data=payload
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(data["detail"][0]["loc"][:4], ["body", "request_body", 1, "email"])
+        self.assertFalse(User.objects.filter(username__startswith="hobbit").exists())
+
+    def test_bulk_create_roles_delta(self):
+        payload = [{**self.payload_create, "roles": {"add": [self.role.pk], "remove": []}}]
+
+        response = self.do_api_request(
+            self.url_bulk, "POST", self.user_access_token_frodon.token, data=payload
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(
+            response.json()["detail"][0]["loc"][:4], ["body", "request_body", 0, "roles"]
+        )
+        self.assertFalse(User.objects.filter(username="pipin").exists())
+
+    def test_bulk_create_batch_size(self):
+        payload = [
+            {**self.payload_create, "username": f"hobbit{i}"} for i in range(101)
+        ]
+
+        response = self.do_api_request(
+            self.url_bulk, "POST", self.user_access_token_frodon.token, data=payload
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(User.objects.filter(username__startswith="hobbit").exists())
+
+    def test_bulk_create_integrity_error(self):
+        payload = [
+            {**self.payload_create, "username": "hobbit"},
+            {**self.payload_create, "username": "hobbit"},
+        ]
+
+        response = self.do_api_request(
+            self.url_bulk, "POST", self.user_access_token_frodon.token, data=payload
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(User.objects.filter(username="hobbit").exists())
+
+    @parameterized.expand(
+        [
+            ("totem.user.create", 201),
+            ("totem.user.read", 403),
+            ("totem.user.update", 403),
+            ("totem.user.delete", 403),
+        ]
+    )
+    def test_bulk_create_access_rights(self, scope, status_code):
+        self.user_access_token_frodon.scope = scope
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self.do_api_request(
+            self.url_bulk,
+            "POST",
+            self.user_access_token_frodon.token,
+            data=[self.payload_create],
+        )
+
+        self.assertEqual(response.status_code, status_code)
+
+    def test_bulk_update_response(self):
+        self.user_galadriel.roles.set([self.role])
+        payload = [
+            {"id": USER_ID4, "first_name": "Galadriel", "roles": []},
+            {"id": USER_ID3, "first_name": "Peregrin", "roles": [self.role.pk]},
+        ]
+        calls = self._capture_rights_signals()
+
+        response = self.do_api_request(
+            self.url_bulk, "PATCH", self.user_access_token_frodon.token, data=payload
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in data], [USER_ID4, USER_ID3])
+        for item in data:
+            obj = User.objects.get(id=item["id"])
+            self._assert_api_format(item, obj, None)
+        self.assertEqual(self.user_galadriel.roles.count(), 0)
+        self.assertEqual(list(self.user_pipin.roles.all()), [self.role])
+        self.assertEqual(User.objects.get(pk=USER_ID3).first_name, "Peregrin")
+        # roles removed and added: a single rights change
+        self.assertEqual(calls, [{USER_ID4, USER_ID3}])
+
+    def test_bulk_update_roles_delta(self):
+        role_other = UserRole.objects.create(id="OTHER_BASEUSER", name="Role Other")
+        self.user_galadriel.roles.set([self.role])
+        payload = [
+            {"id": USER_ID4, "roles": {"add": [role_other.pk], "remove": [self.role.pk]}},
+            {"id": USER_ID3, "roles": {"add": [role_other.pk]}},
+        ]
+
+        response = self.do_api_request(
+            self.url_bulk, "PATCH", self.user_access_token_frodon.token, data=payload
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["roles"] for item in response.json()], [[role_other.pk]] * 2)
+        self.assertEqual(list(self.user_galadriel.roles.all()), [role_other])
+        self.assertEqual(list(self.user_pipin.roles.all()), [role_other])
+        # the relations are part of the version
+        self.assertEqual(
+            list(User.objects.filter(pk__in=[USER_ID3, USER_ID4]).values_list("version", flat=True)),
+            [2, 2],
+        )
+
+    def test_bulk_update_not_found(self):
+        payload = [
+            {"id": USER_ID3, "first_name": "Peregrin"},
+            {"id": USER_ID_UNKNOWN, "first_name": "Nobody"},
+        ]
+
+        response = self.do_api_request(
+            self.url_bulk, "PATCH", self.user_access_token_frodon.token, data=payload
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(data["detail"][0]["loc"], ["body", "request_body", 1, "id"])
+        self.assertNotEqual(User.objects.get(pk=USER_ID3).first_name, "Peregrin")
+
+    @parameterized.expand(
+        [
+            ("totem.user.create", 403),
+            ("totem.user.read", 403),
+            ("totem.user.update", 200),
+            ("totem.user.delete", 403),
+        ]
+    )
+    def test_bulk_update_access_rights(self, scope, status_code):
+        self.user_access_token_frodon.scope = scope
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self.do_api_request(
+            self.url_bulk,
+            "PATCH",
+            self.user_access_token_frodon.token,
+            data=[{"id": USER_ID3, "first_name": "Peregrin"}],
+        )
+
+        self.assertEqual(response.status_code, status_code)
+
+    def test_bulk_delete_response(self):
+        response = self.do_api_request(
+            self.url_bulk,
+            "DELETE",
+            self.user_access_token_frodon.token,
+            params={"id": [USER_ID3, USER_ID4]},
+        )
+        data = response.json()
+
+        # run in the background
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(data["name"], "UserController.bulk_delete")
+        self.assertEqual(data["status"], JobStatus.PENDING)
+        self.assertEqual(User.objects.filter(pk__in=[USER_ID3, USER_ID4]).count(), 2)
+
+        self.assertEqual(Worker(burst=True).run(), 1)
+
+        job = Job.objects.get(pk=data["id"])
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, [USER_ID3, USER_ID4])
+        self.assertFalse(User.objects.filter(pk__in=[USER_ID3, USER_ID4]).exists())
+
+    def test_bulk_delete_not_found(self):
+        response = self.do_api_request(
+            self.url_bulk,
+            "DELETE",
+            self.user_access_token_frodon.token,
+            params={"id": [USER_ID3, USER_ID_UNKNOWN]},
+        )
+        self.assertEqual(response.status_code, 202)
+
+        Worker(burst=True).run()
+
+        job = Job.objects.get(pk=response.json()["id"])
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.error, "query.query_parameters.id.1: No user found.")
+        self.assertTrue(User.objects.filter(pk=USER_ID3).exists())
+
+    @parameterized.expand(
+        [
+            ("totem.user.create", 403),
+            ("totem.user.read", 403),
+            ("totem.user.update", 403),
+            ("totem.user.delete", 202),
+        ]
+    )
+    def test_bulk_delete_access_rights(self, scope, status_code):
+        self.user_access_token_frodon.scope = scope
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self.do_api_request(
+            self.url_bulk,
+            "DELETE",
+            self.user_access_token_frodon.token,
+            params={"id": [USER_ID3]},
+        )
+
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(Job.objects.exists(), status_code == 202)
+
     # ------------------------------------------
     # Utils
     # ------------------------------------------
 
-    def _assert_api_format(
-        self, api_data, obj, fields, expand=True
-    ):  # pylint: disable=unused-argument
+    def _get_role_selects(self, context):
+        # rows of roles read (not the role relations)
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('SELECT "user_userrole"."id", "user_userrole"."name"')
+        ]
+
+    def _assert_api_format(self, api_data, obj, fields, expand=False):
         if not fields:
             fields = [
                 "id",
@@ -526,7 +1980,7 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
 
         if "roles" in fields:
             for role in obj.roles.all():
-                role_api_val = {"id": role.pk, "name": role.name}
+                role_api_val = {"id": role.pk, "name": role.name} if expand else role.pk
                 self.assertIn(role_api_val, api_data["roles"])
             self.assertEqual(len(api_data["roles"]), len(obj.roles.all()))
 
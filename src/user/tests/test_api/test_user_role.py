@@ -1,8 +1,16 @@
+import threading
+import time
+from unittest import mock
+
+import msgpack
+from django.db import connections
 from django.test import TestCase
 from freezegun import freeze_time
 from parameterized import parameterized
 
+from core.api.coalesce import clear_coalesce_stats, get_coalesce_stats
 from core.testing import APITestCaseMixin
+from user.api.user_roles import UserRoleController
 from user.choices import UserType
 from user.models import User, UserRole
 
@@ -223,6 +231,121 @@ class UserAPITest(CommonTestMixin, APITestCaseMixin, TestCase):
                 data, {"message": "You do not have permission to perform this action."}
             )
 
+    def test_list_response_cache(self):
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        data = response.json()
+
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json(), data)
+
+        # entries are dropped on change
+        role = UserRole.objects.get(pk=ROLE_ID1)
+        role.name = "Newbie"
+        role.save()
+
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+        names = [item["name"] for item in response.json()["results"]]
+        self.assertIn("Newbie", names)
+
+    def test_list_response_cache_media_type(self):
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+        data = response.json()
+
+        # entries are kept by media type
+        response = self.do_api_request(
+            self.url,
+            "GET",
+            self.user_access_token_frodon.token,
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), data)
+
+        response = self.do_api_request(
+            self.url,
+            "GET",
+            self.user_access_token_frodon.token,
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+
+    def test_list_response_cache_access_rights(self):
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.user_access_token_frodon.scope = "totem.userrole.create"
+        self.user_access_token_frodon.save(update_fields=["scope"])
+
+        response = self.do_api_request(
+            self.url, "GET", self.user_access_token_frodon.token
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_list_coalesce(self):
+        clear_coalesce_stats()
+        get_queryset = UserRoleController.get_queryset
+        leading, release = threading.Event(), threading.Event()
+
+        def slow_get_queryset(controller):
+            leading.set()
+            release.wait(5)
+            return get_queryset(controller)
+
+        # requests of the threads see the data of the test transaction
+        connection = connections["default"]
+        connection.inc_thread_sharing()
+        responses = []
+
+        def do_request():
+            connections["default"] = connection
+            responses.append(
+                self.do_api_request(self.url, "GET", self.user_access_token_frodon.token)
+            )
+
+        with mock.patch.object(
+            UserRoleController, "get_queryset", autospec=True, side_effect=slow_get_queryset
+        ) as mocked:
+            threads = [threading.Thread(target=do_request) for dummy in range(4)]
+            threads[0].start()
+            self.assertTrue(leading.wait(5))
+            for thread in threads[1:]:
+                thread.start()
+            for dummy in range(500):  # followers are waiting
+                stats = get_coalesce_stats().get("UserRoleController.list", {})
+                if stats.get("followers") == 3:
+                    break
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        connection.dec_thread_sharing()
+
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual([response.status_code for response in responses], [200] * 4)
+        self.assertEqual(len({response.content for response in responses}), 1)
+        self.assertEqual(
+            get_coalesce_stats()["UserRoleController.list"],
+            {"leaders": 1, "followers": 3, "ratio": 0.75},
+        )
+
     # ------------------------------------------
     # Utils
     # ------------------------------------------
@@ -1,7 +1,9 @@
 from unittest.mock import patch
 
+from django.db import transaction
 from django.test import TestCase
 
+from base.models.mixins import VersionConflict
 from user import choices
 from user.models import User
 
@@ -100,3 +102,39 @@ class TestUserModel(TestCase):
         users.delete()
 
         self.assertEqual(mock.call_count, 0)
+
+    # ------------------------------------------
+    # Tests version
+    # ------------------------------------------
+
+    def test_version_instance_update(self):
+        self.assertEqual(self.user_1.version, 1)
+
+        self.user_1.first_name = "Tintin"
+        self.user_1.save(update_fields=['first_name'])
+
+        self.assertEqual(self.user_1.version, 2)
+        self.assertEqual(User.objects.get(pk=USER_ID1).version, 2)
+
+    def test_version_instance_conflict(self):
+        user = User.objects.get(pk=USER_ID1)
+        # concurrent modification
+        other = User.objects.get(pk=USER_ID1)
+        other.last_name = "Reporter"
+        other.save()
+
+        user.first_name = "Tintin"
+        with self.assertRaises(VersionConflict), transaction.atomic():
+            user.save(update_fields=['first_name'])
+
+        self.assertEqual(user.version, 1)
+        user = User.objects.get(pk=USER_ID1)
+        self.assertEqual((user.first_name, user.last_name, user.version), (None, "Reporter", 2))
+
+    def test_version_queryset_update(self):
+        User.objects.filter(pk__in=[USER_ID1, USER_ID2]).update(first_name="Moulinsart")
+
+        self.assertEqual(
+            dict(User.objects.values_list('username', 'version')),
+            {"Tintin": 2, "Haddock": 2, "proftournesol": 1},
+        )
@@ -59,6 +59,7 @@ admin.site.register(Media, MediaAdmin)
 
 class PageAdmin(admin.ModelAdmin):
     list_display = ("title", "slug", "is_published")
+    search_fields = ("title", "content_excerpt")
 
 
 admin.site.register(Page, PageAdmin)
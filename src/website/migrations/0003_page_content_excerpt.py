@@ -0,0 +1,96 @@
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+from core.utils.html import Cleaner, html_to_text, sanitize_html
+
+# Rules of `core.fields.HtmlField(sanitize=True)` when this migration was written, frozen: the
+# later changes of the field do not change what this migration does
+ALLOWED_TAGS = frozenset([
+    'a', 'abbr', 'acronym', 'address', 'area', 'article', 'aside', 'audio', 'b', 'big',
+    'blockquote', 'br', 'button', 'canvas', 'caption', 'code', 'col', 'colgroup', 'command',
+    'datalist', 'dd', 'del', 'details', 'div', 'dl', 'dt', 'em', 'embed', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hgroup', 'hr', 'i', 'iframe', 'img', 'input', 'ins', 'keygen', 'label', 'legend', 'li',
+    'math', 'meter', 'nav', 'noscript', 'object', 'ol', 'optgroup', 'option', 'output', 'p',
+    'param', 'pre', 'progress', 'q', 'rt', 'section', 'select', 'small', 'source', 'span',
+    'strong', 'sub', 'summary', 'sup', 'svg', 'table', 'tbody', 'td', 'textarea', 'tfoot', 'th',
+    'thead', 'time', 'tr', 'track', 'tt', 'ul', 'var', 'video', 'wbr',
+])
+SAFE_ATTRS = frozenset([
+    'abbr', 'accept', 'accept-charset', 'accesskey', 'action', 'align', 'alt', 'axis',
+    'border', 'cellpadding', 'cellspacing', 'char', 'charoff', 'charset', 'checked', 'cite',
+    'class', 'clear', 'color', 'cols', 'colspan', 'compact', 'coords', 'datetime', 'dir',
+    'disabled', 'enctype', 'for', 'frame', 'headers', 'height', 'href', 'hreflang', 'hspace',
+    'id', 'ismap', 'label', 'lang', 'longdesc', 'maxlength', 'media', 'method', 'multiple',
+    'name', 'nohref', 'noshade', 'nowrap', 'prompt', 'readonly', 'rel', 'rev', 'rows',
+    'rowspan', 'rules', 'scope', 'selected', 'shape', 'size', 'span', 'src', 'start', 'style',
+    'summary', 'tabindex', 'target', 'title', 'type', 'usemap', 'valign', 'value', 'vspace',
+    'width',
+])
+KILL_TAGS = frozenset(['base', 'frame', 'head', 'link', 'meta', 'script', 'style', 'title'])
+REMOVE_TAGS = ['html', 'body']
+EXCERPT_LENGTH = 300
+
+
+def get_cleaner():
+    return Cleaner(
+        scripts=True,
+        javascript=True,
+        style=False,
+        inline_style=False,
+        sanitize_style=True,
+        strip_classes=False,
+        safe_attrs_only=True,
+        safe_attrs=SAFE_ATTRS,
+        allow_tags=ALLOWED_TAGS,
+        remove_unknown_tags=False,
+        kill_tags=KILL_TAGS,
+        remove_tags=REMOVE_TAGS,
+        embedded=False,
+        frames=False,
+        forms=False,
+        annoying_tags=False,
+    )
+
+
+def sanitize_html_contents(apps, schema_editor):
+    """The contents saved before are cleaned once, as they will be when saved."""
+    cleaner = get_cleaner()
+
+    def sanitize(value):
+        return sanitize_html(value, cleaner) if value else value
+
+    Page = apps.get_model('website', 'Page')
+    pages = list(Page.objects.only('content'))
+    for page in pages:
+        page.content = sanitize(page.content)
+        page.content_excerpt = Truncator(html_to_text(page.content)).chars(EXCERPT_LENGTH)
+    Page.objects.bulk_update(pages, ['content', 'content_excerpt'], batch_size=500)
+
+    Website = apps.get_model('website', 'Website')
+    websites = list(Website.objects.only('footer'))
+    for website in websites:
+        website.footer = sanitize(website.footer)
+    Website.objects.bulk_update(websites, ['footer'], batch_size=500)
+
+    Widget = apps.get_model('website', 'Widget')
+    widgets = list(Widget.objects.exclude(param_content=None).only('param_content'))
+    for widget in widgets:
+        widget.param_content = sanitize(widget.param_content)
+    Widget.objects.bulk_update(widgets, ['param_content'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0002_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='content_excerpt',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Plain text of the content, for listings and search.', max_length=300, verbose_name='Content Excerpt'),
+        ),
+        migrations.RunPython(sanitize_html_contents, migrations.RunPython.noop),
+    ]
@@ -8,7 +8,9 @@ class Page(WebsitePublishedMixin):
     title = models.CharField(
         "Title", max_length=256, null=False, blank=False)
     content = fields.HtmlField(
-        "Content", null=False, blank=False, help_text="HTML content")
+        "Content", null=False, blank=False, help_text="HTML content", sanitize=True, excerpt_field="content_excerpt")
+    content_excerpt = models.CharField(
+        "Content Excerpt", max_length=300, blank=True, default="", editable=False, help_text="Plain text of the content, for listings and search.")
     update_date = models.DateTimeField("Update Date", auto_now=True)
     user = models.ForeignKey('user.User', verbose_name="Author", null=True, blank=True, on_delete=models.SET_NULL, help_text="Author of the web page.")
 
@@ -23,3 +25,10 @@ class Page(WebsitePublishedMixin):
 
     def __str__(self):  # pylint: disable=E0307
         return self.title
+
+    def save(self, *args, **kwargs):
+        # the excerpt is computed from the content when saved
+        update_fields = kwargs.get('update_fields')
+        if update_fields and 'content' in update_fields and 'content_excerpt' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'content_excerpt']
+        return super().save(*args, **kwargs)
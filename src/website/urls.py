@@ -1,9 +1,11 @@
 from django.urls import path
 
+from core.api.coalesce import coalesce_view
+
 from . import views
 
 
 urlpatterns = [
-    path('', views.HomePageView.as_view(), name='homepage'),
-    path('page/<slug:slug>/', views.PageView.as_view(), name='page'),
+    path('', coalesce_view('website.homepage')(views.HomePageView.as_view()), name='homepage'),
+    path('page/<slug:slug>/', coalesce_view('website.page')(views.PageView.as_view()), name='page'),
 ]
@@ -116,5 +116,5 @@ class LastUpdatePageWidget(AbstractWebsiteWidget):
         from website.models import Page
         return {
             "title": widget_instance.title,
-            "pages": Page.objects.filter(is_published=True).order_by('-update_date')[0:widget_instance.param_limit_item],
+            "pages": Page.objects.filter(is_published=True).defer('content').order_by('-update_date')[0:widget_instance.param_limit_item],
         }